@@ -0,0 +1,250 @@
+"""
+Async concurrent page fetcher for the HTTP scraper engine.
+
+Once page 1 is loaded (and the disclaimer accepted), the page URL pattern is
+derived from its "Next" link. Later pages are then fetched concurrently with
+httpx, under a concurrency cap and a token-bucket rate limit, with jittered
+exponential backoff on transient errors. Each page is handed to a worker pool
+for parsing as soon as it arrives, so parsing overlaps the remaining
+downloads.
+
+If no page-number pattern can be found, the fetcher falls back to following
+"Next" links one page at a time (still async).
+"""
+
+import os
+import re
+import time
+import random
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+from http_scraper import (
+    CLEARRECON_URL, USER_AGENT, HttpEngineUnavailable,
+    parse_navigation, find_disclaimer_request, find_next_page_url,
+)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+TABLE_RE = re.compile(r'<table\b', re.IGNORECASE)
+
+# parse_page(page_source, page_number) -> parsed result for that page
+PageParseFunc = Callable[[str, int], Any]
+
+
+class TokenBucket:
+    """Async token bucket: at most `rate` acquisitions per second, bursting to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return  # Unlimited
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncPageFetcher:
+    """Bounded, rate-limited, retrying GETs over a shared httpx.AsyncClient."""
+
+    def __init__(self, client: "httpx.AsyncClient", concurrency: int = 4, rate: float = 5.0,
+                 retries: int = 3, backoff: float = 0.5):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, capacity=concurrency)
+        self.retries = retries
+        self.backoff = backoff
+
+    def _retry_delay(self, attempt: int, response: Optional["httpx.Response"] = None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        # Exponential backoff with +/-50% jitter so parallel retries don't align
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        """Send a request, retrying transient failures. 4xx (other than 429) is returned as-is."""
+        attempt = 0
+        while True:
+            async with self.semaphore:
+                await self.bucket.acquire()
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    if attempt >= self.retries:
+                        raise
+                    print(f"Fetch error for {url}: {e} - retrying")
+                    response = None
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+            if response is not None and attempt >= self.retries:
+                return response
+            await asyncio.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+
+    async def fetch_page(self, url: str) -> Optional[str]:
+        """Return the page HTML, or None if the page doesn't exist."""
+        response = await self.request("GET", url)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.text
+
+
+def page_url_template(next_url: str) -> Optional[Callable[[int], str]]:
+    """Derive a page-number URL builder from page 1's link to page 2.
+
+    Supports a numeric query parameter (?pg=2, ?paged=2) and a numeric path
+    segment (/page/2/). Returns None if the link has neither.
+    """
+    split = urlsplit(next_url)
+    query = parse_qsl(split.query, keep_blank_values=True)
+    for i, (key, value) in enumerate(query):
+        if value == "2":
+            def build(page: int, i=i, key=key) -> str:
+                params = query[:i] + [(key, str(page))] + query[i + 1:]
+                return urlunsplit(split._replace(query=urlencode(params)))
+            return build
+
+    segments = split.path.split("/")
+    for i in range(len(segments) - 1, -1, -1):
+        if segments[i] == "2":
+            def build(page: int, i=i) -> str:
+                path = "/".join(segments[:i] + [str(page)] + segments[i + 1:])
+                return urlunsplit(split._replace(path=path))
+            return build
+    return None
+
+
+async def fetch_and_parse_pages(parse_page: PageParseFunc, start_url: str = None, max_pages: int = 50,
+                                concurrency: int = 4, rate: float = 5.0, retries: int = 3,
+                                executor: Optional[Executor] = None,
+                                timeout: float = 30) -> List[Tuple[int, Any]]:
+    """Fetch every listings page concurrently and parse each on the executor.
+
+    Returns [(page_number, parse_page(...) result)] in page order.
+    """
+    if not HTTPX_AVAILABLE:
+        raise HttpEngineUnavailable("httpx is not installed")
+
+    loop = asyncio.get_running_loop()
+    start_url = start_url or CLEARRECON_URL
+    parse_tasks: List[Tuple[int, "asyncio.Future"]] = []
+
+    def schedule_parse(page_source: str, page_number: int):
+        parse_tasks.append((page_number, loop.run_in_executor(executor, parse_page, page_source, page_number)))
+
+    async with httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT},
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        timeout=timeout,
+        follow_redirects=True,
+    ) as client:
+        fetcher = AsyncPageFetcher(client, concurrency=concurrency, rate=rate, retries=retries)
+
+        response = await fetcher.request("GET", start_url)
+        response.raise_for_status()
+        nav = parse_navigation(response.text)
+
+        if nav.table_count == 0:
+            disclaimer = find_disclaimer_request(nav, str(response.url))
+            if disclaimer is None:
+                raise HttpEngineUnavailable("No listing tables and no disclaimer link or form to follow")
+            method, url, data = disclaimer
+            print(f"Accepting disclaimer via HTTP {method.upper()} {url}")
+            if method == "post":
+                response = await fetcher.request("POST", url, data=data)
+            else:
+                response = await fetcher.request("GET", url, params=data or None)
+            response.raise_for_status()
+            nav = parse_navigation(response.text)
+            if nav.table_count == 0:
+                raise HttpEngineUnavailable("Listing tables not served over plain HTTP after the disclaimer")
+
+        schedule_parse(response.text, 1)
+        next_url = find_next_page_url(nav, str(response.url)) if max_pages > 1 else None
+        build_url = page_url_template(next_url) if next_url else None
+
+        if build_url:
+            # Known page URLs: fetch in windows of `concurrency` pages until a
+            # window runs past the last page (404, no table or a repeated page)
+            page_number = 2
+            last_source = response.text
+            while page_number <= max_pages:
+                window = list(range(page_number, min(page_number + concurrency, max_pages + 1)))
+                sources = await asyncio.gather(*(fetcher.fetch_page(build_url(n)) for n in window))
+                finished = False
+                for number, page_source in zip(window, sources):
+                    if page_source is None or not TABLE_RE.search(page_source) or page_source == last_source:
+                        finished = True
+                        break
+                    schedule_parse(page_source, number)
+                    last_source = page_source
+                if finished:
+                    break
+                page_number += len(window)
+        else:
+            # Unknown URL pattern: follow Next links one page at a time
+            page_number = 1
+            seen_urls = {str(response.url)}
+            while next_url and next_url not in seen_urls and page_number < max_pages:
+                seen_urls.add(next_url)
+                page_source = await fetcher.fetch_page(next_url)
+                if page_source is None:
+                    break
+                page_number += 1
+                schedule_parse(page_source, page_number)
+                nav = parse_navigation(page_source)
+                next_url = find_next_page_url(nav, next_url)
+
+    print(f"Fetched {len(parse_tasks)} pages, waiting for parsers...")
+    results = []
+    for page_number, task in parse_tasks:
+        results.append((page_number, await task))
+    return results
+
+
+def scrape_pages_concurrently(parse_page: PageParseFunc, start_url: str = None, max_pages: int = 50,
+                              executor: Optional[Executor] = None) -> List[Tuple[int, Any]]:
+    """Synchronous wrapper configured from the environment.
+
+    SCRAPER_CONCURRENCY (default 4), SCRAPER_RATE_LIMIT requests/second
+    (default 5, 0 = unlimited) and SCRAPER_RETRIES (default 3). Pages are
+    parsed on `executor` (e.g. a process pool) or, without one, on a thread
+    pool of SCRAPER_PARSE_WORKERS threads (default 2).
+    """
+    concurrency = int(os.environ.get("SCRAPER_CONCURRENCY", "4"))
+    rate = float(os.environ.get("SCRAPER_RATE_LIMIT", "5"))
+    retries = int(os.environ.get("SCRAPER_RETRIES", "3"))
+    parse_workers = int(os.environ.get("SCRAPER_PARSE_WORKERS", "2"))
+
+    if executor is not None:
+        return asyncio.run(fetch_and_parse_pages(
+            parse_page, start_url, max_pages,
+            concurrency=concurrency, rate=rate, retries=retries, executor=executor,
+        ))
+    with ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix="page-parse") as executor:
+        return asyncio.run(fetch_and_parse_pages(
+            parse_page, start_url, max_pages,
+            concurrency=concurrency, rate=rate, retries=retries, executor=executor,
+        ))
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the ClearRecon scraper hot paths.
+
+Usage:
+    python benchmark.py parse [--csv PATH] [--repeat N]
+    python benchmark.py html [--html GLOB] [--pages N] [--repeat N]
+    python benchmark.py fetch [--pages N] [--latency S] [--concurrency N]
+    python benchmark.py memory [--rows N [N ...]]
+    python benchmark.py load [--rows N [N ...]] [--repeat N]
+    python benchmark.py filter [--rows N [N ...]] [--repeat N]
+
+Saved page fixtures for the html benchmark can be captured by running the
+scraper with SAVE_PAGE_HTML=1 (pages are written to debug/).
+"""
+
+import io
+import os
+import re
+import csv
+import sys
+import glob
+import time
+import argparse
+import tempfile
+import tracemalloc
+from typing import Dict, List
+
+from listing_extraction import extract_listing_fields
+from fake_clearrecon_server import build_fixture_pages
+
+DEFAULT_CSV = "csv_data/clearrecon_listings_enhanced_20250811_020245.csv"
+
+
+def load_raw_rows(csv_path: str) -> List[str]:
+    """Return the raw_data text of every row in a scraped CSV."""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        return [row.get('raw_data', '') for row in csv.DictReader(f)]
+
+
+def legacy_extract_fields(combined_text: str) -> Dict[str, str]:
+    """Field extraction as parse_listing_data_enhanced did it before the
+    precompiled engine: pattern strings rebuilt and searched on every call.
+    (The per-row print and the unreachable second TS pass are left out.)"""
+    listing = {"ts_number": "", "address": "", "city": "", "price": "", "date": ""}
+
+    city_patterns = [
+        r'\b(Los Angeles|San Francisco|San Diego|Sacramento|Oakland|Fresno|Long Beach|Bakersfield|Anaheim|Riverside|Santa Ana|Stockton|Irvine|Chula Vista|Fremont|San Bernardino|Modesto|Fontana|Oxnard|Moreno Valley|Huntington Beach|Glendale|Santa Clarita|Garden Grove|Oceanside|Rancho Cucamonga|Santa Rosa|Ontario|Lancaster|Elk Grove|Corona|Palmdale|Salinas|Pomona|Hayward|Escondido|Torrance|Sunnyvale|Orange|Fullerton|Pasadena|Thousand Oaks|Visalia|Simi Valley|Concord|Roseville|Rocklin|Victorville|Santa Clara|Vallejo|Berkeley|El Monte|Downey|Costa Mesa|Inglewood|Carlsbad|San Buenaventura|Fairfield|West Covina|Murrieta|Richmond|Norwalk|Antioch|Temecula|Burbank|Daly City|Rialto|Santa Maria|El Cajon|San Mateo|Clovis|Compton|Jurupa Valley|Vista|South Gate|Mission Viejo|Vacaville|Carson|Hesperia|Santa Monica|Westminster|Redding|Santa Barbara|Chico|Newport Beach|San Leandro|San Marcos|Whittier|Hawthorne|Citrus Heights|Tracy|Alhambra|Livermore|Buena Park|Lakewood|Merced|Hemet|Chino|Menifee|Lake Forest|Napa|Redwood City|Bellflower|Indio|Tustin|Baldwin Park|Chino Hills|Mountain View|Alameda|Upland|Folsom|San Ramon|Pleasanton|Union City|Perris|Manteca|Lynwood|Apple Valley|Redlands|Turlock|Milpitas|Redondo Beach|Rancho Cordova|Yorba Linda|Palo Alto|Davis|Camarillo|Walnut Creek|Pittsburg|South San Francisco|Yuba City|San Clemente|Laguna Niguel|Pico Rivera|Montebello|Lodi|Madera|Santa Cruz|La Habra|Encinitas|Monterey Park|Tulare|Cupertino|Gardena|National City|Petaluma|Huntington Park|San Rafael|Porterville|Hanford|Waterford|Delano|Diamond Bar|Glendora|Cerritos|Azusa|Rancho Palos Verdes|Fountain Valley|Placentia|Monrovia|Santee|Eastvale|Rosemead|San Gabriel|Gilroy|Stanton|Paramount|Brea|Covina|San Bruno|Arcadia|Culver City|Benicia|Colton|Beaumont|Morgan Hill|San Luis Obispo|Los Altos|Brentwood|Aliso Viejo|La Mesa|West Sacramento|Agoura Hills|La Mirada|Rowland Heights|Cypress|Newark|Desert Hot Springs|Duarte|Lomita|Barstow|Adelanto|Twentynine Palms|Yucca Valley|Joshua Tree|Ridgecrest|California City|Tehachapi|Mojave)\b',
+        r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*),?\s+CA\b',
+        r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*),?\s+California\b',
+        r'(?:in|at|located in)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
+        r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+\d{5}(?:-\d{4})?\b'
+    ]
+    for pattern in city_patterns:
+        match = re.search(pattern, combined_text, re.IGNORECASE)
+        if match:
+            city_name = match.group(1).strip()
+            city_name = re.sub(r'[,\.]$', '', city_name)
+            listing["city"] = city_name.title()
+            break
+
+    address_patterns = [
+        r'\d+\s+[A-Za-z\s]+(Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Boulevard|Blvd|Way|Lane|Ln|Circle|Cir|Court|Ct|Place|Pl)\b',
+        r'\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Boulevard|Blvd|Way|Lane|Ln|Circle|Cir|Court|Ct|Place|Pl)',
+        r'\d+\s+[A-Za-z0-9\s\-]+(?=,|\s+[A-Z][a-z]+,?\s+CA)'
+    ]
+    for pattern in address_patterns:
+        address_match = re.search(pattern, combined_text, re.IGNORECASE)
+        if address_match:
+            listing["address"] = address_match.group().strip()
+            break
+
+    price_match = re.search(r'\$[\d,]+(?:\.\d{2})?', combined_text)
+    if price_match:
+        listing["price"] = price_match.group().strip()
+
+    for pattern in [r'\b\d{1,2}/\d{1,2}/\d{4}\b', r'\b\d{4}-\d{1,2}-\d{1,2}\b', r'\b\d{1,2}-\d{1,2}-\d{4}\b']:
+        date_match = re.search(pattern, combined_text)
+        if date_match:
+            listing["date"] = date_match.group().strip()
+            break
+
+    ts_patterns = [
+        r'^\s*(\d{5,}-[A-Z]{2})\b',
+        r'TS[#\s]*\s*([A-Z0-9-]{5,})',
+        r'TRUSTEE[\'S]*\s*SALE[\s-]*#?[\s-]*([A-Z0-9-]{5,})',
+        r'Sale[\s-]*#?[\s-]*([A-Z0-9-]{5,})',
+        r'\b(\d{5,}-[A-Z]{2})\b',
+        r'\b(\d{5,})\b'
+    ]
+    for pattern in ts_patterns:
+        ts_match = re.search(pattern, combined_text, re.IGNORECASE)
+        if ts_match:
+            ts_num = next((g for g in ts_match.groups() if g), '').strip().upper()
+            ts_num = re.sub(r'[^A-Z0-9-]', '', ts_num)
+            if len(ts_num) >= 5:
+                if ts_num.isdigit() and len(ts_num) >= 5 and not ts_num.endswith(('-CA', '-AZ')):
+                    ts_num = f"{ts_num}-CA"
+                listing["ts_number"] = ts_num
+                break
+
+    return listing
+
+
+def time_rows_per_second(func, rows: List[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in rows:
+            func(text)
+    elapsed = time.perf_counter() - start
+    return (len(rows) * repeat) / elapsed if elapsed else float('inf')
+
+
+def bench_parse(args):
+    rows = load_raw_rows(args.csv)
+    print(f"Benchmarking field extraction on {len(rows)} rows from {args.csv} (x{args.repeat})")
+
+    mismatches = sum(1 for text in rows if legacy_extract_fields(text) != extract_listing_fields(text))
+    print(f"Output mismatches between legacy and engine: {mismatches}")
+
+    before = time_rows_per_second(legacy_extract_fields, rows, args.repeat)
+    after = time_rows_per_second(extract_listing_fields, rows, args.repeat)
+    print(f"Before (per-call regex):   {before:10.0f} rows/s")
+    print(f"After  (compiled engine):  {after:10.0f} rows/s")
+    print(f"Speedup: {after / before:.2f}x")
+
+
+def bench_html(args):
+    from page_parsers import PAGE_PARSERS, LXML_AVAILABLE
+
+    if args.html:
+        page_sources = []
+        for path in sorted(glob.glob(args.html)):
+            with open(path, 'r', encoding='utf-8') as f:
+                page_sources.append(f.read())
+        source = args.html
+    else:
+        page_sources = build_fixture_pages(args.csv, args.pages)
+        source = f"{args.pages} fixture pages built from {args.csv}"
+    if not page_sources:
+        print("No page HTML found")
+        return
+    print(f"Benchmarking page parsing on {source} (x{args.repeat})")
+
+    results = {}
+    for name, parser_cls in PAGE_PARSERS.items():
+        if name == "lxml" and not LXML_AVAILABLE:
+            print(f"{name:>5}: skipped (not installed)")
+            continue
+        parser = parser_cls()
+        try:
+            results[name] = [parser.extract_tables(page) for page in page_sources]
+        except ImportError as e:
+            print(f"{name:>5}: skipped ({e})")
+            continue
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for page in page_sources:
+                parser.extract_tables(page)
+        elapsed = time.perf_counter() - start
+        pages_per_second = len(page_sources) * args.repeat / elapsed
+        print(f"{name:>5}: {pages_per_second:10.1f} pages/s ({elapsed / args.repeat * 1000:.1f} ms per {len(page_sources)}-page scrape)")
+
+    if len(results) == 2:
+        same = results["lxml"] == results["bs4"]
+        print(f"Backends produce identical tables: {same}")
+
+
+def parse_page_fields(page_source: str, page_number: int) -> List[Dict[str, str]]:
+    """Table extraction plus field extraction for one page, as the scraper does it."""
+    from page_parsers import get_page_parser
+
+    listings = []
+    for headers, rows in get_page_parser().extract_tables(page_source):
+        listings.extend(extract_listing_fields(" ".join(cells).strip()) for cells in rows if any(cells))
+    return listings
+
+
+def bench_fetch(args):
+    from fake_clearrecon_server import start_server, server_url
+    from http_scraper import create_session, fetch_listing_pages
+    from async_fetcher import scrape_pages_concurrently
+
+    server = start_server(build_fixture_pages(args.csv, args.pages, link_pages=True), latency=args.latency)
+    url = server_url(server)
+    print(f"Fake ClearRecon at {url}: {args.pages} pages, {args.latency * 1000:.0f} ms latency per response")
+
+    saved_env = {name: os.environ.get(name) for name in ("SCRAPER_CONCURRENCY", "SCRAPER_RATE_LIMIT")}
+    try:
+        start = time.perf_counter()
+        session = create_session()
+        sequential = [len(parse_page_fields(source, number)) for number, _, source in fetch_listing_pages(session, url)]
+        session.close()
+        sequential_time = time.perf_counter() - start
+
+        os.environ["SCRAPER_CONCURRENCY"] = str(args.concurrency)
+        os.environ["SCRAPER_RATE_LIMIT"] = str(args.rate)
+        start = time.perf_counter()
+        concurrent = [len(listings) for _, listings in scrape_pages_concurrently(parse_page_fields, url)]
+        concurrent_time = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    print(f"Sequential HTTP engine:  {sequential_time:6.2f} s ({len(sequential)} pages, {sum(sequential)} listings)")
+    print(f"Async pipeline (x{args.concurrency}):    {concurrent_time:6.2f} s ({len(concurrent)} pages, {sum(concurrent)} listings)")
+    print(f"Speedup: {sequential_time / concurrent_time:.2f}x")
+
+
+def synthetic_csv(csv_path: str, rows: int, quoting: int = csv.QUOTE_MINIMAL) -> str:
+    """CSV text of `rows` listings cycled from a scraped CSV, each with a unique TS number."""
+    from listing_record import LISTING_FIELDS, derive_details
+
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        seeds = list(csv.DictReader(f))
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=LISTING_FIELDS, extrasaction='ignore', quoting=quoting)
+    writer.writeheader()
+    for i in range(rows):
+        row = dict(seeds[i % len(seeds)])
+        ts_number = f"{i:07d}-CA"
+        row["raw_data"] = ts_number + row.get("raw_data", "")[len(row.get("ts_number", "")):]
+        row["ts_number"] = ts_number
+        row["details"] = derive_details(row["raw_data"])
+        writer.writerow(row)
+    return buffer.getvalue()
+
+
+def retained_bytes(build) -> int:
+    """Python heap still allocated by build()'s result once it returns."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def resident_bytes() -> int:
+    """Resident set size of this process (its peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def build_listings(kind: str, text: str):
+    """The listings of a CSV text held as dicts, Listing records or a columnar snapshot."""
+    from listing_record import Listing
+    from listings_store import ListingsSnapshot
+
+    reader = csv.DictReader(io.StringIO(text))
+    if kind == "dict per row":
+        return list(reader)
+    if kind == "Listing (__slots__)":
+        return [Listing.from_row(r) for r in reader]
+    snapshot = ListingsSnapshot("benchmark", None, list(reader.fieldnames))
+    for row in reader:
+        snapshot.append(row)
+    snapshot.finalize()
+    return snapshot
+
+
+def resident_delta(kind: str, text: str) -> int:
+    """RSS growth while holding build_listings(kind, text); run in a fresh process."""
+    before = resident_bytes()
+    result = build_listings(kind, text)
+    size = resident_bytes() - before
+    del result
+    return size
+
+
+def bench_memory(args):
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    kinds = ("dict per row", "Listing (__slots__)", "columnar snapshot")
+    print(f"Memory held by synthetic listings cycled from {args.csv}: Python heap (tracemalloc) "
+          f"and resident size growth including allocator overhead (RSS, measured in a fresh process)")
+    for rows in args.rows:
+        text = synthetic_csv(args.csv, rows)
+        heap = {kind: retained_bytes(lambda: build_listings(kind, text)) for kind in kinds}
+        resident = {}
+        for kind in kinds:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                resident[kind] = pool.submit(resident_delta, kind, text).result()
+        print(f"{rows:>9,} rows:")
+        for kind in kinds:
+            print(f"  {kind:<20} heap {heap[kind] / 2**20:8.1f} MiB {heap[kind] / rows:6.0f} B/row "
+                  f"{heap[kind] / heap[kinds[0]]:5.2f}x   RSS {resident[kind] / 2**20:8.1f} MiB "
+                  f"{resident[kind] / rows:6.0f} B/row {resident[kind] / resident[kinds[0]]:5.2f}x")
+
+
+def bench_load(args):
+    from listings_store import parse_snapshot, map_snapshot, save_snapshot_file, file_signature
+
+    def best_of(func):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    def first_page(snapshot):
+        # What the first /filter request then does: every city, 100 rows
+        row_ids, _ = snapshot.filter("all", 0, 10 ** 7)
+        return snapshot.rows(row_ids[:100])
+
+    print(f"Dataset load time: parsing the QUOTE_ALL CSV vs mapping its column file (best of {args.repeat})")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            csv_path = os.path.join(tmp, f"listings_{rows}.csv")
+            with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(synthetic_csv(args.csv, rows, quoting=csv.QUOTE_ALL))
+            parse_time, parsed = best_of(lambda: parse_snapshot(csv_path))
+            save_snapshot_file(parsed)
+            signature = file_signature(csv_path)
+            map_time, mapped = best_of(lambda: map_snapshot(csv_path, signature))
+            parsed_page, parsed_page_result = best_of(lambda: first_page(parsed))
+            mapped_page, mapped_page_result = best_of(lambda: first_page(mapped))
+            same = parsed_page_result == mapped_page_result
+            print(f"{rows:>9,} rows ({os.path.getsize(csv_path) / 2**20:.1f} MiB CSV, "
+                  f"{os.path.getsize(csv_path + '.cols') / 2**20:.1f} MiB column file):")
+            print(f"  CSV parse      {parse_time * 1000:9.1f} ms   first 100-row page {parsed_page * 1000:6.2f} ms")
+            print(f"  mmap columns   {map_time * 1000:9.1f} ms   first 100-row page {mapped_page * 1000:6.2f} ms"
+                  f"   ({parse_time / map_time:.0f}x faster load, same rows: {same})")
+
+
+# Counties and price range given to synthetic rows (the scraped seed CSV has neither)
+SYNTHETIC_COUNTIES = ["Los Angeles", "Orange", "Riverside", "San Bernardino", "San Diego", "Sacramento"]
+
+
+def synthetic_snapshot(csv_path: str, rows: int):
+    """Finalized ListingsSnapshot of `rows` listings cycled from a scraped CSV, with counties and prices."""
+    from listings_store import ListingsSnapshot
+
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        seeds = list(csv.DictReader(f))
+    fieldnames = list(seeds[0])
+    snapshot = ListingsSnapshot("benchmark", None, fieldnames)
+    for i in range(rows):
+        row = dict(seeds[i % len(seeds)])
+        row["county"] = SYNTHETIC_COUNTIES[(i // len(seeds) + i) % len(SYNTHETIC_COUNTIES)]
+        # Every 10th row has no price
+        row["price"] = "" if i % 10 == 0 else f"${100_000 + (i * 7919) % 900_000:,}.00"
+        snapshot.append(row)
+    snapshot.finalize()
+    return snapshot
+
+
+def bench_filter(args):
+    from datetime import date
+    from vector_filter import NUMPY_AVAILABLE, vector_index
+
+    if not NUMPY_AVAILABLE:
+        sys.exit("The filter benchmark needs numpy (pip install numpy)")
+    start, end = date(2025, 1, 1).toordinal(), date(2025, 12, 31).toordinal()
+    queries = [
+        ("all cities", dict(city="all")),
+        ("city 'Los Angeles'", dict(city="Los Angeles")),
+        ("substring 'an'", dict(city="an")),
+        ("'an' + county + price", dict(city="an", county="san", min_price=200_000, max_price=600_000)),
+    ]
+
+    def best_of(func):
+        times = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - started)
+        return min(times), result
+
+    print(f"/filter engines: index + row loop vs NumPy masks (best of {args.repeat}; 2025 date window)")
+    for rows in args.rows:
+        snapshot = synthetic_snapshot(args.csv, rows)
+        # Built once per dataset and reused by every request
+        started = time.perf_counter()
+        index = vector_index(snapshot)
+        index_time = time.perf_counter() - started
+        print(f"{rows:>9,} rows (vector index built in {index_time * 1000:.2f} ms):")
+        for name, query in queries:
+            loop_time, (loop_ids, loop_undated) = best_of(lambda: snapshot.filter(start_ordinal=start, end_ordinal=end, **query))
+            # The first county query builds the county categories; time a warm engine
+            index.filter(start_ordinal=start, end_ordinal=end, **query)
+            vector_time, (vector_ids, vector_undated) = best_of(lambda: index.filter(start_ordinal=start, end_ordinal=end, **query))
+            same = list(loop_ids) == vector_ids.tolist() and list(loop_undated) == vector_undated.tolist()
+            print(f"  {name:<24} {len(loop_ids):>9,} matches   loop {loop_time * 1000:9.2f} ms   "
+                  f"numpy {vector_time * 1000:8.2f} ms   {loop_time / vector_time:6.1f}x   same rows: {same}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ClearRecon scraper micro-benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parse_cmd = subparsers.add_parser("parse", help="Row field extraction rows/second")
+    parse_cmd.add_argument("--csv", default=DEFAULT_CSV)
+    parse_cmd.add_argument("--repeat", type=int, default=5)
+    parse_cmd.set_defaults(func=bench_parse)
+
+    html_cmd = subparsers.add_parser("html", help="Page HTML parsing, lxml vs BeautifulSoup")
+    html_cmd.add_argument("--html", help="Glob of saved page HTML files (default: generated fixtures)")
+    html_cmd.add_argument("--csv", default=DEFAULT_CSV)
+    html_cmd.add_argument("--pages", type=int, default=50)
+    html_cmd.add_argument("--repeat", type=int, default=3)
+    html_cmd.set_defaults(func=bench_html)
+
+    fetch_cmd = subparsers.add_parser("fetch", help="Sequential vs concurrent page fetching against a local fake server")
+    fetch_cmd.add_argument("--csv", default=DEFAULT_CSV)
+    fetch_cmd.add_argument("--pages", type=int, default=27)
+    fetch_cmd.add_argument("--latency", type=float, default=0.2, help="Fake server latency in seconds")
+    fetch_cmd.add_argument("--concurrency", type=int, default=8)
+    fetch_cmd.add_argument("--rate", type=float, default=0, help="Requests/second limit (0 = unlimited)")
+    fetch_cmd.set_defaults(func=bench_fetch)
+
+    memory_cmd = subparsers.add_parser("memory", help="Heap and resident memory per listing: dicts vs Listing records vs columnar snapshot")
+    memory_cmd.add_argument("--csv", default=DEFAULT_CSV)
+    memory_cmd.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    memory_cmd.set_defaults(func=bench_memory)
+
+    load_cmd = subparsers.add_parser("load", help="Dataset load time: CSV parse vs memory-mapped column file")
+    load_cmd.add_argument("--csv", default=DEFAULT_CSV)
+    load_cmd.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    load_cmd.add_argument("--repeat", type=int, default=3)
+    load_cmd.set_defaults(func=bench_load)
+
+    filter_cmd = subparsers.add_parser("filter", help="/filter query time: index + row loop vs NumPy boolean masks")
+    filter_cmd.add_argument("--csv", default=DEFAULT_CSV)
+    filter_cmd.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    filter_cmd.add_argument("--repeat", type=int, default=5)
+    filter_cmd.set_defaults(func=bench_filter)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Binary column file format for listings snapshots.
+
+A file holds typed arrays (array module typecodes) and string columns
+(UTF-8 bytes plus int64 offsets), each 8-byte aligned after a JSON header:
+
+    b"CRCOLS01" | uint64 header length | header JSON | padding | sections...
+
+Files are opened with mmap. Typed arrays come back as memoryviews of the
+mapping and string values are decoded only when a row is read, so loading
+copies almost nothing. Several processes mapping the same file share its
+pages through the OS page cache.
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+MAGIC = b"CRCOLS01"
+_LENGTH = struct.Struct("<Q")
+ALIGNMENT = 8
+
+
+class MappedStrings:
+    """A read-only string column backed by a mapped file."""
+
+    def __init__(self, buffer: memoryview, offsets: memoryview, nulls: Optional[memoryview]):
+        self._buffer = buffer
+        self._offsets = offsets
+        self._nulls = nulls
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        if index < 0:
+            index += len(self)
+        if self._nulls is not None and self._nulls[index]:
+            return None
+        return str(self._buffer[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        return (self[i] for i in range(len(self)))
+
+
+class MappedColumns:
+    """The contents of a column file: header metadata, typed arrays and string columns."""
+
+    def __init__(self, meta: Dict[str, Any], arrays: Dict[str, memoryview],
+                 strings: Dict[str, MappedStrings], mapping: mmap.mmap):
+        self.meta = meta
+        self.arrays = arrays
+        self.strings = strings
+        # Keeps the mapping open for as long as the columns are in use
+        self._mapping = mapping
+
+
+def _pad(size: int) -> int:
+    return -size % ALIGNMENT
+
+
+def write_columns(path: str, meta: Dict[str, Any], arrays: Dict[str, array],
+                  strings: Dict[str, Sequence[Optional[str]]]):
+    """Write a column file via a temp file and rename. None string values are stored as nulls."""
+    sections: List[bytes] = []
+    header: Dict[str, Any] = {"meta": meta, "byteorder": sys.byteorder, "arrays": {}, "strings": {}}
+    position = 0
+
+    def add(data: bytes) -> int:
+        nonlocal position
+        start = position
+        sections.append(data + b"\0" * _pad(len(data)))
+        position += len(data) + _pad(len(data))
+        return start
+
+    for name, values in arrays.items():
+        header["arrays"][name] = {"typecode": values.typecode, "offset": add(values.tobytes()), "count": len(values)}
+    for name, values in strings.items():
+        offsets = array("q", [0])
+        nulls = bytearray(len(values))
+        blob = bytearray()
+        for i, value in enumerate(values):
+            if value is None:
+                nulls[i] = 1
+            else:
+                blob += value.encode("utf-8")
+            offsets.append(len(blob))
+        header["strings"][name] = {
+            "count": len(values),
+            "offsets": add(offsets.tobytes()),
+            "data": add(bytes(blob)),
+            "nulls": add(bytes(nulls)) if any(nulls) else None,
+        }
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    preamble = MAGIC + _LENGTH.pack(len(header_bytes)) + header_bytes
+    preamble += b"\0" * _pad(len(preamble))
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(preamble)
+            for section in sections:
+                f.write(section)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def map_columns(path: str) -> Optional[MappedColumns]:
+    """Map a column file read-only; None if it is missing, foreign or written with another byte order."""
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    view = memoryview(mapping)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        return None
+    (header_length,) = _LENGTH.unpack_from(view, len(MAGIC))
+    header_start = len(MAGIC) + _LENGTH.size
+    header = json.loads(bytes(view[header_start:header_start + header_length]))
+    if header["byteorder"] != sys.byteorder:
+        return None
+    base = header_start + header_length + _pad(header_start + header_length)
+
+    def section(offset: int, nbytes: int) -> memoryview:
+        return view[base + offset:base + offset + nbytes]
+
+    arrays = {}
+    for name, info in header["arrays"].items():
+        itemsize = array(info["typecode"]).itemsize
+        arrays[name] = section(info["offset"], info["count"] * itemsize).cast(info["typecode"])
+    strings = {}
+    for name, info in header["strings"].items():
+        offsets = section(info["offsets"], (info["count"] + 1) * 8).cast("q")
+        data = section(info["data"], offsets[-1])
+        nulls = section(info["nulls"], info["count"]) if info["nulls"] is not None else None
+        strings[name] = MappedStrings(data, offsets, nulls)
+    return MappedColumns(header["meta"], arrays, strings, mapping)
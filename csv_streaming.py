@@ -0,0 +1,180 @@
+"""
+Streaming CSV responses for /csv and /csvdata.
+
+Files are sent from disk in fixed-size chunks, so memory per download stays
+constant however large the dataset grows. Responses carry ETag and
+Last-Modified validators and answer conditional requests with 304. Single
+byte ranges are served as 206. The body is gzip-compressed on the fly when
+the client accepts it (CSV_GZIP=0 turns this off). A dataset whose CSV export
+is missing is streamed straight from the listings database instead.
+
+CSV_CHUNK_SIZE sets the chunk size in bytes (default 64 KiB).
+"""
+
+import io
+import os
+import csv
+import zlib
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+CSV_CHUNK_SIZE = int(os.environ.get("CSV_CHUNK_SIZE", str(64 * 1024)))
+CSV_GZIP = os.environ.get("CSV_GZIP", "1").lower() not in ("0", "false", "no")
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip()[2:] if t.strip().startswith("W/") else t.strip() for t in header.split(",")}
+    # The gzip-encoded variant carries its own tag; either validates the resource
+    return "*" in tags or etag in tags or etag[:-1] + '-gzip"' in tags
+
+
+def _not_modified_since(request: Request, last_modified: float) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header or request.headers.get("if-none-match"):
+        return False
+    try:
+        return int(last_modified) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """True when the client's cached copy (If-None-Match / If-Modified-Since) is current."""
+    return _etag_matches(request, etag) or _not_modified_since(request, last_modified)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into inclusive (start, end).
+
+    Returns None when there is no usable single range (the full body is sent).
+    Raises ValueError when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            length = int(last)
+            if length == 0:
+                raise ValueError("empty suffix range")
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        if first or last:
+            raise
+        return None
+    if start > end or start >= size:
+        raise ValueError(f"range {header} not satisfiable for {size} bytes")
+    return start, min(end, size - 1)
+
+
+def read_chunks(path: str, start: int = 0, length: Optional[int] = None,
+                chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a file (or a byte range of it) in chunk_size pieces."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def csv_row_chunks(fieldnames: List[str], rows: Iterable[Dict],
+                   chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encode rows in the scraper's CSV format, yielding roughly chunk_size bytes at a time."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _accepts_gzip(request: Request) -> bool:
+    return CSV_GZIP and "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+def _stream(request: Request, chunks: Iterable[bytes], media_type: str, headers: Dict[str, str],
+            status_code: int = 200, length: Optional[int] = None) -> StreamingResponse:
+    headers = dict(headers, **{"Vary": "Accept-Encoding"})
+    if status_code == 200 and _accepts_gzip(request):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["ETag"] = headers["ETag"][:-1] + '-gzip"'
+    elif length is not None:
+        headers["Content-Length"] = str(length)
+    return StreamingResponse(chunks, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def stream_csv_file(request: Request, path: str, media_type: str = "text/csv",
+                    headers: Optional[Dict[str, str]] = None) -> Response:
+    """Stream a CSV file with conditional, range and gzip support."""
+    st = os.stat(path)
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    base_headers = dict(headers or {})
+    base_headers.update({
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+    })
+
+    if is_not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=base_headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), st.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{st.st_size}"})
+
+    if byte_range is None:
+        return _stream(request, read_chunks(path), media_type, base_headers, length=st.st_size)
+
+    start, end = byte_range
+    base_headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+    return _stream(request, read_chunks(path, start, end - start + 1), media_type, base_headers,
+                   status_code=206, length=end - start + 1)
+
+
+def stream_csv_rows(request: Request, fieldnames: List[str], rows: Iterable[Dict], version: str,
+                    created_at: str, media_type: str = "text/csv",
+                    headers: Optional[Dict[str, str]] = None) -> Response:
+    """Stream rows as CSV, validated by a dataset version instead of a file."""
+    last_modified = datetime.fromisoformat(created_at).timestamp()
+    etag = f'"dataset-{version}"'
+    base_headers = dict(headers or {})
+    base_headers.update({"ETag": etag, "Last-Modified": formatdate(last_modified, usegmt=True)})
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=base_headers)
+    return _stream(request, csv_row_chunks(fieldnames, rows), media_type, base_headers)
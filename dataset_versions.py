@@ -0,0 +1,164 @@
+"""
+Versioned, atomically published listings datasets.
+
+Each saved scrape is a numbered version recorded in csv_data/manifest.json.
+The manifest's "current" field is the pointer to the version the API
+serves. Dataset CSVs and the manifest are written to a temp file and renamed
+into place, so a reader never sees a half-written file. The process holds
+its view of the current version in one reference, which is swapped when the
+manifest changes. A request that reads that reference once keeps a
+consistent version while a new one is published. Old versions beyond the
+retention count are pruned from csv_data/.
+
+Configuration:
+    DATASET_MANIFEST_PATH  manifest location (default csv_data/manifest.json)
+    DATASET_RETENTION      versions to keep, including the current one (default 5)
+"""
+
+import os
+import csv
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from file_lock import FileLock
+from listings_store import file_signature, snapshot_path
+
+DATASET_MANIFEST_PATH = os.environ.get("DATASET_MANIFEST_PATH", "csv_data/manifest.json")
+
+
+def write_csv_atomic(csv_path: str, fieldnames: List[str], rows: Iterable[Dict]):
+    """Write rows to csv_path via a temp file and rename, so readers see all or nothing."""
+    tmp_path = f"{csv_path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            writer.writerows(rows)
+            csvfile.flush()
+            os.fsync(csvfile.fileno())
+        os.replace(tmp_path, csv_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class DatasetVersions:
+    """The manifest of dataset versions plus this process's current-version reference."""
+
+    def __init__(self, manifest_path: str = DATASET_MANIFEST_PATH, seed_csv: Optional[str] = None,
+                 retention: Optional[int] = None):
+        self.manifest_path = manifest_path
+        self.seed_csv = seed_csv
+        self.retention = retention or int(os.environ.get("DATASET_RETENTION", "5"))
+        self._lock = threading.Lock()
+        self._signature = None
+        self._manifest: Dict = {"current": None, "versions": []}
+        # The current version entry; replaced as a whole, never mutated
+        self._current: Optional[Dict] = None
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialize manifest updates across threads and processes."""
+        with self._lock, FileLock(f"{self.manifest_path}.lock"):
+            yield
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"current": None, "versions": []}
+
+    def _write(self, manifest: Dict):
+        tmp_path = f"{self.manifest_path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def _adopt(self, manifest: Dict):
+        self._manifest = manifest
+        self._signature = file_signature(self.manifest_path)
+        current = next((v for v in manifest["versions"] if v["version"] == manifest["current"]), None)
+        self._current = current
+
+    def refresh(self) -> Optional[Dict]:
+        """Re-read the manifest if another process published; returns the current version."""
+        signature = file_signature(self.manifest_path)
+        if signature is not None and signature == self._signature:
+            return self._current
+        with self._exclusive():
+            manifest = self._read()
+            if self._bootstrap(manifest):
+                self._write(manifest)
+            self._adopt(manifest)
+        return self._current
+
+    def _bootstrap(self, manifest: Dict) -> bool:
+        """First run: the bundled CSV becomes version 1 and is never pruned."""
+        if manifest["versions"] or not self.seed_csv or not os.path.exists(self.seed_csv):
+            return False
+        manifest["current"] = 1
+        manifest["versions"] = [self._entry(1, self.seed_csv, None, pinned=True)]
+        return True
+
+    def _entry(self, version: int, csv_path: str, row_count: Optional[int], pinned: bool = False,
+               dataset_id: Optional[int] = None) -> Dict:
+        return {
+            "version": version,
+            "csv_path": csv_path,
+            "row_count": row_count,
+            "dataset_id": dataset_id,
+            "published_at": datetime.now().isoformat(timespec="seconds"),
+            "pinned": pinned,
+        }
+
+    def current(self) -> Optional[Dict]:
+        """The version requests should read: one reference, consistent for the whole request."""
+        return self.refresh()
+
+    def current_csv_path(self) -> Optional[str]:
+        current = self.current()
+        return current["csv_path"] if current else None
+
+    def versions(self) -> List[Dict]:
+        self.refresh()
+        return list(self._manifest["versions"])
+
+    def publish(self, csv_path: str, row_count: Optional[int] = None, dataset_id: Optional[int] = None,
+                on_pruned: Optional[Callable[[List[Dict]], None]] = None) -> Dict:
+        """Record a fully written CSV (and its database dataset) as the newest version and point "current" at it.
+
+        Versions pruned past the retention count lose their files here, and
+        are passed to on_pruned so their database datasets can be deleted too.
+        """
+        with self._exclusive():
+            manifest = self._read()
+            self._bootstrap(manifest)
+            version = max((v["version"] for v in manifest["versions"]), default=0) + 1
+            entry = self._entry(version, csv_path, row_count, dataset_id=dataset_id)
+            manifest["versions"].append(entry)
+            manifest["current"] = version
+            pruned = self._prune(manifest)
+            self._write(manifest)
+            self._adopt(manifest)
+        for removed in pruned:
+            for path in (removed["csv_path"], snapshot_path(removed["csv_path"])):
+                if os.path.exists(path):
+                    os.remove(path)
+                    print(f"Pruned dataset version file {path}")
+        if pruned and on_pruned is not None:
+            on_pruned(pruned)
+        print(f"Published dataset version {version}: {csv_path}")
+        return entry
+
+    def _prune(self, manifest: Dict) -> List[Dict]:
+        """Drop versions beyond the retention count (never the current or pinned ones); returns them."""
+        keep = {v["version"] for v in manifest["versions"][-self.retention:]} | {manifest["current"]}
+        removed = [v for v in manifest["versions"] if v["version"] not in keep and not v.get("pinned")]
+        manifest["versions"] = [v for v in manifest["versions"] if v not in removed]
+        return removed
@@ -0,0 +1,282 @@
+"""
+Warm headless Chrome pool for the Selenium scraper engine.
+
+The ChromeDriver binary is resolved once and its path is cached on disk, so
+later scrapes skip the webdriver-manager download and the fallback path
+probing. Browsers are kept warm between scrapes, health-checked when they
+are leased, and recycled after a configurable number of pages.
+
+Configuration:
+    DRIVER_POOL_SIZE         warm browsers to keep (default 1)
+    DRIVER_MAX_PAGES         pages a browser may load before it is recycled (default 200)
+    DRIVER_POOL_WARM         start the pool's browsers when the scrape worker process starts,
+                             instead of on its first scrape (default off)
+    CHROMEDRIVER_CACHE_FILE  where the resolved driver path is cached
+"""
+
+import os
+import json
+import stat
+import time
+import threading
+from typing import List, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+CHROMEDRIVER_CACHE_FILE = os.environ.get(
+    "CHROMEDRIVER_CACHE_FILE", os.path.expanduser("~/.cache/clearrecon/chromedriver.json")
+)
+
+# Common system locations, checked when webdriver-manager can't provide a binary
+COMMON_CHROMEDRIVER_PATHS = [
+    '/usr/bin/chromedriver',
+    '/usr/local/bin/chromedriver',
+    '/opt/google/chrome/chromedriver',
+    '/snap/bin/chromium.chromedriver',
+    '/usr/lib/chromium-browser/chromedriver',
+    # Azure-specific paths
+    '/home/site/wwwroot/chromedriver',
+    '/tmp/chromedriver'
+]
+
+DRIVER_POOL_WARM = os.environ.get("DRIVER_POOL_WARM", "").lower() in ("1", "true", "yes")
+
+# Sentinel cached when Selenium's own driver discovery is what works
+SYSTEM_DRIVER = "system"
+
+
+def create_chrome_options() -> Options:
+    """Chrome options for headless scraping on Azure."""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Run in headless mode
+    chrome_options.add_argument("--no-sandbox")  # Required for Azure
+    chrome_options.add_argument("--disable-dev-shm-usage")  # Required for Azure
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    return chrome_options
+
+
+def _is_executable(path: str) -> bool:
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def _make_executable(path: str):
+    os.chmod(path, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
+
+
+def _read_cached_driver_path() -> Optional[str]:
+    try:
+        with open(CHROMEDRIVER_CACHE_FILE, 'r', encoding='utf-8') as f:
+            path = json.load(f).get("path")
+    except (OSError, ValueError):
+        return None
+    if path == SYSTEM_DRIVER or _is_executable(path):
+        return path
+    return None
+
+
+def _write_cached_driver_path(path: str):
+    try:
+        os.makedirs(os.path.dirname(CHROMEDRIVER_CACHE_FILE), exist_ok=True)
+        tmp_path = f"{CHROMEDRIVER_CACHE_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"path": path, "resolved_at": time.time()}, f)
+        os.replace(tmp_path, CHROMEDRIVER_CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️ Could not cache ChromeDriver path: {e}")
+
+
+def _webdriver_manager_path() -> Optional[str]:
+    """Install (or reuse) ChromeDriver via webdriver-manager, fixing the
+    THIRD_PARTY_NOTICES bug where it returns the wrong file."""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    chromedriver_path = ChromeDriverManager().install()
+    print(f"ChromeDriver from webdriver-manager: {chromedriver_path}")
+
+    if chromedriver_path.endswith('THIRD_PARTY_NOTICES.chromedriver'):
+        print("Got THIRD_PARTY_NOTICES file - finding actual ChromeDriver binary...")
+        driver_dir = os.path.dirname(chromedriver_path)
+        for name in ['chromedriver', 'chromedriver.exe', 'chromedriver-linux64']:
+            candidate = os.path.join(driver_dir, name)
+            if os.path.exists(candidate):
+                chromedriver_path = candidate
+                break
+        else:
+            return None
+
+    if not os.path.exists(chromedriver_path):
+        return None
+    _make_executable(chromedriver_path)
+    return chromedriver_path
+
+
+_resolve_lock = threading.Lock()
+_resolved_path: Optional[str] = None
+
+
+def resolve_chromedriver_path(refresh: bool = False) -> str:
+    """Return the ChromeDriver binary path (or SYSTEM_DRIVER), resolving it at most once.
+
+    Resolution order: in-process cache, on-disk cache, webdriver-manager,
+    common system paths, then Selenium's own discovery.
+    """
+    global _resolved_path
+    with _resolve_lock:
+        if _resolved_path and not refresh:
+            return _resolved_path
+
+        path = None if refresh else _read_cached_driver_path()
+        if path:
+            print(f"Using cached ChromeDriver: {path}")
+        else:
+            try:
+                path = _webdriver_manager_path()
+            except Exception as wdm_error:
+                print(f"webdriver-manager failed: {wdm_error}")
+            if not path:
+                path = next((p for p in COMMON_CHROMEDRIVER_PATHS if os.path.exists(p)), None)
+                if path:
+                    _make_executable(path)
+            path = path or SYSTEM_DRIVER
+            print(f"Resolved ChromeDriver: {path}")
+            _write_cached_driver_path(path)
+
+        _resolved_path = path
+        return path
+
+
+def _launch_chrome(path: str) -> webdriver.Chrome:
+    if path == SYSTEM_DRIVER:
+        return webdriver.Chrome(options=create_chrome_options())
+    return webdriver.Chrome(service=Service(path), options=create_chrome_options())
+
+
+def start_chrome() -> webdriver.Chrome:
+    """Launch a headless Chrome using the resolved driver binary."""
+    path = resolve_chromedriver_path()
+    try:
+        driver = _launch_chrome(path)
+    except Exception as e:
+        # The cached binary may be stale (e.g. Chrome was upgraded): resolve again once
+        print(f"ChromeDriver launch failed with {path}: {e} - re-resolving driver")
+        driver = _launch_chrome(resolve_chromedriver_path(refresh=True))
+    driver.set_page_load_timeout(30)
+    return driver
+
+
+class PooledDriver:
+    """A warm browser plus the bookkeeping the pool needs to recycle it."""
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.pages_loaded = 0
+        self.created_at = time.time()
+
+    def is_healthy(self) -> bool:
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"⚠️ Could not close WebDriver properly: {e}")
+
+
+class DriverPool:
+    """Keeps up to `size` warm headless browsers and leases them to scrapes."""
+
+    def __init__(self, size: int = 1, max_pages: int = 200):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self._idle: List[PooledDriver] = []
+        self._leased = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def warm(self):
+        """Start browsers until the pool holds `size` idle ones."""
+        with self._condition:
+            missing = self.size - len(self._idle) - self._leased
+        for _ in range(missing):
+            pooled = PooledDriver(start_chrome())
+            with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledDriver:
+        """Lease a healthy browser, starting one if the pool has room."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Driver pool is closed")
+            if not self._idle and self._leased >= self.size:
+                if not self._condition.wait_for(lambda: self._idle or self._leased < self.size, timeout):
+                    raise TimeoutError("No WebDriver available in the pool")
+            pooled = self._idle.pop() if self._idle else None
+            self._leased += 1
+
+        try:
+            if pooled is not None and not pooled.is_healthy():
+                print("Pooled WebDriver failed health check - replacing it")
+                pooled.quit()
+                pooled = None
+            if pooled is None:
+                print("Starting a new pooled Chrome WebDriver...")
+                pooled = PooledDriver(start_chrome())
+            return pooled
+        except Exception:
+            with self._condition:
+                self._leased -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, pooled: PooledDriver, pages: int = 0, discard: bool = False):
+        """Return a browser to the pool, recycling it if it's worn out or broken."""
+        pooled.pages_loaded += pages
+        recycle = discard or self._closed or pooled.pages_loaded >= self.max_pages
+        if recycle:
+            reason = "closed pool" if self._closed else ("error" if discard else f"{pooled.pages_loaded} pages")
+            print(f"Recycling WebDriver ({reason})")
+            pooled.quit()
+        with self._condition:
+            self._leased -= 1
+            if not recycle:
+                self._idle.append(pooled)
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            pooled.quit()
+
+
+_pool: Optional[DriverPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> DriverPool:
+    """Process-wide driver pool configured from the environment."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(
+                size=int(os.environ.get("DRIVER_POOL_SIZE", "1")),
+                max_pages=int(os.environ.get("DRIVER_MAX_PAGES", "200")),
+            )
+        return _pool
+
+
+def close_driver_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
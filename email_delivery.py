@@ -0,0 +1,369 @@
+"""
+Background delivery of filtered-results emails.
+
+/filter queues a delivery and returns its id straight away. Worker threads
+build the CSV attachment in memory and send it over an authenticated SMTP
+connection that each worker keeps open between emails. The connection is
+closed after SMTP_IDLE_TIMEOUT seconds without work. Transient failures
+(dropped connections, 4xx replies) are retried with exponential backoff.
+Delivery status is kept for GET /email_status/{delivery_id} in a SQLite file
+shared by the API workers, so any worker can report an email another one
+queued and sends.
+
+Configuration:
+    SMTP_SERVER, SMTP_PORT          mail server (default smtp.gmail.com:587)
+    SENDER_EMAIL, SENDER_PASSWORD   sender account; login is skipped without a password
+    SMTP_STARTTLS                   upgrade the connection with STARTTLS (default on)
+    EMAIL_WORKERS                   delivery threads (default 1)
+    EMAIL_MAX_ATTEMPTS              attempts per email (default 3)
+    EMAIL_RETRY_BACKOFF             seconds before the first retry, doubled each time (default 2)
+    SMTP_IDLE_TIMEOUT               seconds an idle connection is kept open (default 60)
+    EMAIL_DELIVERIES_PATH           delivery status database (default csv_data/email_deliveries.db)
+
+A local stand-in server for testing:
+    python -m aiosmtpd -n -l 127.0.0.1:8025
+    SMTP_SERVER=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=0 SENDER_EMAIL=test@example.com ...
+"""
+
+import io
+import os
+import csv
+import time
+import uuid
+import queue
+import sqlite3
+import smtplib
+import threading
+from datetime import datetime
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+
+EMAIL_DELIVERIES_PATH = os.environ.get("EMAIL_DELIVERIES_PATH", "csv_data/email_deliveries.db")
+
+# Deliveries whose status is remembered for the status endpoint
+MAX_TRACKED_DELIVERIES = 1000
+
+
+class SmtpSettings:
+    """SMTP server and sender account, read from the environment."""
+
+    def __init__(self):
+        self.server = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
+        self.port = int(os.environ.get("SMTP_PORT", "587"))
+        self.sender_email = os.environ.get("SENDER_EMAIL", "")
+        self.sender_password = os.environ.get("SENDER_PASSWORD", "")
+        self.starttls = os.environ.get("SMTP_STARTTLS", "1").lower() not in ("0", "false", "no")
+        self.timeout = float(os.environ.get("SMTP_TIMEOUT", "30"))
+
+    @property
+    def configured(self) -> bool:
+        # Authenticated servers need both; a local relay only needs a sender
+        return bool(self.sender_email) and (bool(self.sender_password) or not self.starttls)
+
+
+def build_results_message(sender_email: str, email_address: str, filtered_results: List[Dict],
+                          filter_info: Dict) -> MIMEMultipart:
+    """Email with the filtered results attached as a CSV built in memory."""
+    msg = MIMEMultipart()
+    msg['From'] = sender_email
+    msg['To'] = email_address
+    msg['Subject'] = f"ClearRecon Filtered Listings - {len(filtered_results)} Results"
+
+    body = f"""
+Hello,
+
+Your filtered ClearRecon California foreclosure listings are attached.
+
+Filter Details:
+- City: {filter_info.get('city', 'All Cities')}
+- Date Range: {filter_info.get('start_date', 'N/A')} to {filter_info.get('end_date', 'N/A')}
+- Results Found: {len(filtered_results)} listings
+
+The results are attached as a CSV file for easy viewing in Excel or other spreadsheet applications.
+
+Best regards,
+ClearRecon Scraper System
+        """
+    msg.attach(MIMEText(body, 'plain'))
+
+    if filtered_results:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(filtered_results[0].keys()))
+        writer.writeheader()
+        writer.writerows(filtered_results)
+
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(buffer.getvalue().encode('utf-8'))
+        encoders.encode_base64(part)
+        filename = f"clearrecon_filtered_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        part.add_header('Content-Disposition', f'attachment; filename= {filename}')
+        msg.attach(part)
+
+    return msg
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed send is worth retrying."""
+    if isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused,
+                          smtplib.SMTPSenderRefused, smtplib.SMTPNotSupportedError)):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # Dropped connections, timeouts and other socket errors (SMTPException is an OSError)
+    return isinstance(error, OSError)
+
+
+class SmtpConnection:
+    """One SMTP session that stays open and logged in between emails."""
+
+    def __init__(self, settings: SmtpSettings):
+        self.settings = settings
+        self._server: Optional[smtplib.SMTP] = None
+        self.connects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.settings.server, self.settings.port, timeout=self.settings.timeout)
+        try:
+            if self.settings.starttls:
+                server.starttls()
+            if self.settings.sender_password:
+                server.login(self.settings.sender_email, self.settings.sender_password)
+        except Exception:
+            server.close()
+            raise
+        self.connects += 1
+        return server
+
+    def send(self, msg: MIMEMultipart, recipient: str):
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.sendmail(self.settings.sender_email, recipient, msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle session: reconnect and send once more
+            self.close()
+            self._server = self._connect()
+            self._server.sendmail(self.settings.sender_email, recipient, msg.as_string())
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                self._server.close()
+            self._server = None
+
+
+class Delivery:
+    """Status of one queued email."""
+
+    def __init__(self, email_address: str, filtered_results: List[Dict], filter_info: Dict):
+        self.id = uuid.uuid4().hex
+        self.email_address = email_address
+        self.filtered_results = filtered_results
+        self.filter_info = filter_info
+        self.result_count = len(filtered_results)
+        self.status = "queued"
+        self.attempts = 0
+        self.error = ""
+        self.created_at = datetime.now().isoformat(timespec="seconds")
+        self.sent_at = ""
+        self.worker_pid = os.getpid()
+
+    def to_dict(self) -> Dict:
+        return {
+            "delivery_id": self.id,
+            "email": self.email_address,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "result_count": self.result_count,
+            "created_at": self.created_at,
+            "sent_at": self.sent_at,
+            "worker_pid": self.worker_pid,
+        }
+
+
+class DeliveryLog:
+    """Status of recent deliveries in a SQLite file, one connection per thread."""
+
+    COLUMNS = ["delivery_id", "email", "status", "attempts", "error", "result_count",
+               "created_at", "sent_at", "worker_pid"]
+
+    def __init__(self, path: str = EMAIL_DELIVERIES_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS deliveries (delivery_id TEXT PRIMARY KEY, email TEXT, status TEXT, "
+                "attempts INTEGER, error TEXT, result_count INTEGER, created_at TEXT, sent_at TEXT, worker_pid INTEGER)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, delivery: Delivery):
+        record = delivery.to_dict()
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO deliveries ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+                [record[column] for column in self.COLUMNS],
+            )
+
+    def add(self, delivery: Delivery):
+        """Record a new delivery, forgetting the oldest beyond MAX_TRACKED_DELIVERIES."""
+        self.save(delivery)
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM deliveries WHERE rowid NOT IN (SELECT rowid FROM deliveries ORDER BY rowid DESC LIMIT ?)",
+                (MAX_TRACKED_DELIVERIES,),
+            )
+
+    def get(self, delivery_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT * FROM deliveries WHERE delivery_id = ?", (delivery_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        """Tracked deliveries of every worker by status."""
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM deliveries GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+class EmailDeliveryQueue:
+    """Queue of deliveries drained by worker threads, each with its own SMTP connection."""
+
+    def __init__(self, settings: Optional[SmtpSettings] = None, workers: int = 1,
+                 max_attempts: int = 3, retry_backoff: float = 2.0, idle_timeout: float = 60.0,
+                 log: Optional[DeliveryLog] = None):
+        self.settings = settings or SmtpSettings()
+        self.log = log or DeliveryLog()
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self._queue: "queue.Queue[Optional[Delivery]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._connections: List[SmtpConnection] = []
+        self._workers = [
+            threading.Thread(target=self._run, name=f"email-worker-{i + 1}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, email_address: str, filtered_results: List[Dict], filter_info: Dict) -> Optional[Delivery]:
+        """Queue an email; returns None when SMTP isn't configured."""
+        if not self.settings.configured:
+            print("Email configuration missing. Set SENDER_EMAIL and SENDER_PASSWORD environment variables.")
+            return None
+        delivery = Delivery(email_address, filtered_results, filter_info)
+        self.log.add(delivery)
+        self._queue.put(delivery)
+        return delivery
+
+    def get(self, delivery_id: str) -> Optional[Dict]:
+        """Status of a delivery queued by any API worker."""
+        return self.log.get(delivery_id)
+
+    def stats(self) -> Dict:
+        """This worker's queue and SMTP connections, and the deliveries of every worker by status."""
+        with self._lock:
+            smtp_connects = sum(c.connects for c in self._connections)
+        return {
+            "pid": os.getpid(),
+            "queue_depth": self._queue.qsize(),
+            "workers": len(self._workers),
+            "smtp_connects": smtp_connects,
+            "deliveries": self.log.counts(),
+        }
+
+    def _run(self):
+        connection = SmtpConnection(self.settings)
+        with self._lock:
+            self._connections.append(connection)
+        while True:
+            try:
+                delivery = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                connection.close()
+                continue
+            if delivery is None:
+                connection.close()
+                return
+            self._deliver(connection, delivery)
+
+    def _deliver(self, connection: SmtpConnection, delivery: Delivery):
+        delivery.status = "sending"
+        self.log.save(delivery)
+        msg = build_results_message(self.settings.sender_email, delivery.email_address,
+                                    delivery.filtered_results, delivery.filter_info)
+        while True:
+            delivery.attempts += 1
+            try:
+                connection.send(msg, delivery.email_address)
+            except Exception as e:
+                connection.close()
+                delivery.error = str(e)
+                if delivery.attempts >= self.max_attempts or not is_transient(e):
+                    delivery.status = "failed"
+                    print(f"Failed to send email to {delivery.email_address} after {delivery.attempts} attempt(s): {e}")
+                    break
+                delay = self.retry_backoff * (2 ** (delivery.attempts - 1))
+                print(f"Email to {delivery.email_address} failed ({e}) - retrying in {delay:.1f}s")
+                delivery.status = "retrying"
+                self.log.save(delivery)
+                time.sleep(delay)
+            else:
+                delivery.status = "sent"
+                delivery.error = ""
+                delivery.sent_at = datetime.now().isoformat(timespec="seconds")
+                print(f"Email sent successfully to {delivery.email_address}")
+                break
+        self.log.save(delivery)
+        # The results are only needed until the email is out
+        delivery.filtered_results = []
+
+    def close(self, timeout: float = 5.0):
+        """Stop the workers once queued emails are sent."""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+
+
+_email_queue: Optional[EmailDeliveryQueue] = None
+_email_queue_lock = threading.Lock()
+
+
+def get_email_queue() -> EmailDeliveryQueue:
+    """Process-wide delivery queue configured from the environment."""
+    global _email_queue
+    with _email_queue_lock:
+        if _email_queue is None:
+            _email_queue = EmailDeliveryQueue(
+                workers=int(os.environ.get("EMAIL_WORKERS", "1")),
+                max_attempts=int(os.environ.get("EMAIL_MAX_ATTEMPTS", "3")),
+                retry_backoff=float(os.environ.get("EMAIL_RETRY_BACKOFF", "2")),
+                idle_timeout=float(os.environ.get("SMTP_IDLE_TIMEOUT", "60")),
+            )
+        return _email_queue
+
+
+def close_email_queue():
+    global _email_queue
+    with _email_queue_lock:
+        if _email_queue is not None:
+            _email_queue.close()
+            _email_queue = None
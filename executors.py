@@ -0,0 +1,120 @@
+"""
+Managed thread pools for blocking work done by request handlers.
+
+The API's routes are `async def`, so anything that blocks (SQLite queries,
+CSV loading, file stats, launching Chrome for diagnostics) would otherwise
+stall every other request on the worker. Handlers hand that work to a named
+pool with `await run_blocking(...)`. Each pool tracks queue depth, active
+threads and how long work waited for a thread.
+
+Pools and their sizes:
+    io     dataset queries and file access           (API_IO_WORKERS, default 8)
+    slow   long-running jobs such as /diagnostics     (API_SLOW_WORKERS, default 1)
+
+Slow jobs get their own pool so they can never take every thread and starve
+queries.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+
+class InstrumentedExecutor:
+    """A ThreadPoolExecutor that counts queued, running and finished work."""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"api-{name}")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _track(self, fn: Callable, submitted_at: float) -> Any:
+        started_at = time.perf_counter()
+        with self._lock:
+            self.started += 1
+            self.total_wait += started_at - submitted_at
+        ok = False
+        try:
+            result = fn()
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self.completed += 1
+                self.failed += not ok
+                self.total_run += time.perf_counter() - started_at
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool and await its result."""
+        with self._lock:
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.submitted - self.started)
+        call = partial(fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._track, call, time.perf_counter())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self.submitted - self.started,
+                "active": self.started - self.completed,
+                "max_queue_depth": self.max_queue_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.total_wait / self.started * 1000, 3) if self.started else 0.0,
+                "avg_run_ms": round(self.total_run / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait)
+
+
+POOL_SIZES = {
+    "io": lambda: int(os.environ.get("API_IO_WORKERS", "8")),
+    "slow": lambda: int(os.environ.get("API_SLOW_WORKERS", "1")),
+}
+
+_pools: Dict[str, InstrumentedExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def get_executor(name: str = "io") -> InstrumentedExecutor:
+    """Process-wide pool by name, created on first use."""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = _pools[name] = InstrumentedExecutor(name, POOL_SIZES[name]())
+        return pool
+
+
+async def run_blocking(fn: Callable, *args, pool: str = "io", **kwargs) -> Any:
+    """Await a blocking call on one of the managed pools."""
+    return await get_executor(pool).run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    with _pools_lock:
+        pools = dict(_pools)
+    return {name: pool.stats() for name, pool in pools.items()}
+
+
+def shutdown_executors(wait: bool = False):
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait)
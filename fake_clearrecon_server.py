@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the ClearRecon California listings site.
+
+Serves recorded listing pages (e.g. captured with SAVE_PAGE_HTML=1) or
+fixture pages rendered from a scraped CSV, behind the same disclaimer gate
+and "Next" pagination the real site uses. Used to exercise and benchmark the
+HTTP scraper engine without touching the live site.
+
+Usage:
+    python fake_clearrecon_server.py [--port 8765] [--pages-dir debug] [--latency 0.2]
+    CLEARRECON_URL=http://127.0.0.1:8765/california-listings/ SCRAPER_ENGINE=http python selenium_main_final.py --test
+"""
+
+import csv
+import glob
+import html
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+DEFAULT_CSV = "csv_data/clearrecon_listings_enhanced_20250811_020245.csv"
+LISTINGS_PATH = "/california-listings/"
+DISCLAIMER_COOKIE = "clearrecon_disclaimer=accepted"
+
+DISCLAIMER_PAGE = """<html><head><title>Disclaimer</title></head><body>
+<p>The information on this site is provided as a courtesy.</p>
+<form method="post" action="/california-listings/accept">
+<input type="hidden" name="disclaimer" value="1">
+<input type="submit" value="Agree">
+</form></body></html>"""
+
+
+def build_fixture_pages(csv_path: str = DEFAULT_CSV, pages: int = 27, rows_per_page: int = 25,
+                        link_pages: bool = False) -> List[str]:
+    """Render scraped rows into ClearRecon-style listing tables.
+
+    With link_pages=True each page gets a "Next" link to the following page.
+    """
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+
+    page_sources = []
+    for page in range(pages):
+        chunk = [rows[(page * rows_per_page + i) % len(rows)] for i in range(rows_per_page)]
+        body = "".join(
+            "<tr>" + "".join(f"<td>{html.escape(row.get(key, ''))}</td>" for key in ("ts_number", "address", "city", "date", "details")) + "</tr>\n"
+            for row in chunk
+        )
+        next_link = ""
+        if link_pages and page + 1 < pages:
+            next_link = f"<a class=\"next\" href=\"{LISTINGS_PATH}?pg={page + 2}\">Next</a>"
+        page_sources.append(
+            "<html><head><title>California Listings</title><script>var x = 1;</script></head><body>"
+            "<table class=\"listings\"><tr><th>TS #</th><th>Address</th><th>City</th><th>Sale Date</th><th>Details</th></tr>\n"
+            f"{body}</table><div class=\"nav\">{next_link}</div></body></html>"
+        )
+    return page_sources
+
+
+def load_recorded_pages(pages_dir: str) -> List[str]:
+    pages = []
+    for path in sorted(glob.glob(f"{pages_dir}/*.html")):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+
+class FakeClearReconHandler(BaseHTTPRequestHandler):
+    pages: List[str] = []
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _send(self, status: int, body: str = "", headers: Optional[dict] = None):
+        if self.latency:
+            time.sleep(self.latency)
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != LISTINGS_PATH:
+            return self._send(404, "Not found")
+        if DISCLAIMER_COOKIE not in (self.headers.get("Cookie") or ""):
+            return self._send(200, DISCLAIMER_PAGE)
+
+        page = int(parse_qs(url.query).get("pg", ["1"])[0])
+        if not 1 <= page <= len(self.pages):
+            return self._send(404, "No such page")
+        self._send(200, self.pages[page - 1])
+
+    def do_POST(self):
+        if urlsplit(self.path).path != LISTINGS_PATH + "accept":
+            return self._send(404, "Not found")
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._send(302, headers={"Location": LISTINGS_PATH, "Set-Cookie": f"{DISCLAIMER_COOKIE}; Path=/"})
+
+
+def start_server(pages: List[str], port: int = 0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stand-in server on a background thread; port 0 picks a free port."""
+    handler = type("Handler", (FakeClearReconHandler,), {"pages": pages, "latency": latency})
+    server_cls = type("Server", (ThreadingHTTPServer,), {"request_queue_size": 128})
+    server = server_cls(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{LISTINGS_PATH}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in ClearRecon server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages-dir", help="Directory of recorded page HTML (default: CSV fixtures)")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--pages", type=int, default=27)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to delay every response")
+    args = parser.parse_args()
+
+    pages = load_recorded_pages(args.pages_dir) if args.pages_dir else build_fixture_pages(args.csv, args.pages, link_pages=True)
+    server = start_server(pages, args.port, args.latency)
+    print(f"Serving {len(pages)} pages at {server_url(server)} (latency {args.latency}s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
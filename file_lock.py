@@ -0,0 +1,68 @@
+"""
+Advisory file locks shared by the API's worker processes.
+
+With several gunicorn/uvicorn workers, anything that must happen once per
+deployment (manifest updates, seeding the database, running a scrape job,
+owning the scrape schedule) is guarded by an flock on a file next to the
+data it protects. flock locks belong to an open file, so two FileLock
+objects on one path exclude each other even inside one process, and the OS
+drops a lock when the process holding it dies.
+"""
+
+import os
+from typing import Optional, TextIO
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: single worker, no locking
+    fcntl = None
+
+
+class FileLock:
+    """Exclusive flock on `path`, held from acquire() until release()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[TextIO] = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock; without blocking, returns False if another holder has it."""
+        if self._file is not None:
+            raise RuntimeError(f"{self.path} is already locked by this FileLock")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        lock_file = open(self.path, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        lock_file, self._file = self._file, None
+        if lock_file is not None:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def is_locked(path: str) -> bool:
+    """Whether some process (this one included) holds the lock on path."""
+    probe = FileLock(path)
+    if probe.acquire(blocking=False):
+        probe.release()
+        return False
+    return True
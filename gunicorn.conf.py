@@ -0,0 +1,41 @@
+"""
+Gunicorn settings for running the API on every core.
+
+    gunicorn selenium_main_final:app -c gunicorn.conf.py
+
+Each worker is a separate uvicorn process. They serve the same published
+dataset: the current version is read from csv_data/manifest.json (memory
+backend: its memory-mapped column file, shared through the page cache) or
+from the shared SQLite database. Scrape jobs and the scrape schedule run
+in one worker at a time, coordinated by file locks (see scrape_jobs.py).
+Workers write their metrics to METRICS_DIR, so /metrics on any worker
+reports totals for all of them (see metrics.py).
+
+Configuration:
+    PORT              port to listen on (default 8000)
+    WEB_CONCURRENCY   worker processes (default: one per CPU)
+    WORKER_TIMEOUT    seconds before a silent worker is restarted (default 120)
+    METRICS_DIR       shared metrics directory (default csv_data/metrics)
+"""
+
+import os
+import multiprocessing
+
+# Set before anything imports metrics.py: workers are forked from this process
+os.environ.setdefault("METRICS_DIR", "csv_data/metrics")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.environ.get("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+# Workers import the app themselves: the executors, email queue and driver
+# pool start threads, which must not be created before the fork
+preload_app = False
+accesslog = "-"
+
+
+def on_starting(server):
+    """Drop the metric files of the previous run before any worker starts."""
+    from metrics import clear_shared_metrics
+    clear_shared_metrics(os.environ["METRICS_DIR"])
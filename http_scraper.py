@@ -0,0 +1,205 @@
+"""
+HTTP-only ClearRecon scraper engine.
+
+Reproduces what the Selenium engine does in the browser - accept the
+disclaimer, then follow "Next" links - over plain HTTP with a pooled
+requests.Session. When the site can't be driven this way (no disclaimer
+link/form to follow, JavaScript-only pagination, no listing tables) it raises
+HttpEngineUnavailable so the caller can fall back to Selenium.
+"""
+
+import os
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urldefrag
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CLEARRECON_URL = os.environ.get("CLEARRECON_URL", "https://clearrecon-ca.com/california-listings/")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+DISCLAIMER_WORDS = ("agree", "accept")
+
+
+class HttpEngineUnavailable(Exception):
+    """The listings can't be reached without a real browser."""
+
+
+class _NavigationParser(HTMLParser):
+    """Collects links, forms and tables - just enough to navigate the site."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[Dict] = []
+        self.forms: List[Dict] = []
+        self.buttons: List[str] = []
+        self.table_count = 0
+        self._link = None
+        self._form = None
+        self._button = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'a':
+            self._link = {"href": attrs.get('href') or "", "class": attrs.get('class') or "",
+                          "title": attrs.get('title') or "", "text": ""}
+        elif tag == 'form':
+            self._form = {"action": attrs.get('action') or "", "method": (attrs.get('method') or "get").lower(),
+                          "inputs": {}, "labels": []}
+        elif tag == 'input' and self._form is not None:
+            name = attrs.get('name')
+            input_type = (attrs.get('type') or "text").lower()
+            if input_type in ("submit", "button"):
+                self._form["labels"].append(attrs.get('value') or "")
+                if name:
+                    self._form.setdefault("submit", (name, attrs.get('value') or ""))
+            elif name and (input_type not in ("checkbox", "radio") or 'checked' in attrs):
+                self._form["inputs"][name] = attrs.get('value') or ""
+        elif tag == 'button':
+            self._button = ""
+        elif tag == 'table':
+            self.table_count += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'a' and self._link is not None:
+            self._link["text"] = self._link["text"].strip()
+            self.links.append(self._link)
+            self._link = None
+        elif tag == 'button' and self._button is not None:
+            self.buttons.append(self._button.strip())
+            if self._form is not None:
+                self._form["labels"].append(self._button.strip())
+            self._button = None
+        elif tag == 'form' and self._form is not None:
+            self.forms.append(self._form)
+            self._form = None
+
+    def handle_data(self, data):
+        if self._link is not None:
+            self._link["text"] += data
+        if self._button is not None:
+            self._button += data
+
+
+def parse_navigation(page_source: str) -> _NavigationParser:
+    parser = _NavigationParser()
+    parser.feed(page_source)
+    parser.close()
+    return parser
+
+
+def _is_followable(href: str) -> bool:
+    href = href.strip()
+    return bool(href) and not href.startswith(("#", "javascript:"))
+
+
+def find_disclaimer_request(nav: _NavigationParser, page_url: str) -> Optional[Tuple[str, str, Dict]]:
+    """Return (method, url, data) that accepts the disclaimer, if there is one."""
+    for link in nav.links:
+        if any(word in link["text"].lower() for word in DISCLAIMER_WORDS) and _is_followable(link["href"]):
+            return "get", urljoin(page_url, link["href"]), {}
+
+    for form in nav.forms:
+        if any(word in label.lower() for label in form["labels"] for word in DISCLAIMER_WORDS):
+            data = dict(form["inputs"])
+            if "submit" in form:
+                name, value = form["submit"]
+                data[name] = value
+            return form["method"], urljoin(page_url, form["action"] or page_url), data
+    return None
+
+
+def _is_next_link(link: Dict) -> bool:
+    return "Next" in link["text"] or ">" in link["text"] or "next" in link["class"] or "Next" in link["title"]
+
+
+def find_next_page_url(nav: _NavigationParser, page_url: str) -> Optional[str]:
+    """Return the URL of the next listings page, mirroring the Selenium selectors.
+
+    Raises HttpEngineUnavailable when there is a "Next" control but it is
+    driven by JavaScript rather than a followable link.
+    """
+    script_driven = any("Next" in text or ">" in text for text in nav.buttons)
+    for link in nav.links:
+        if not _is_next_link(link):
+            continue
+        if not _is_followable(link["href"]):
+            script_driven = True
+            continue
+        next_url = urldefrag(urljoin(page_url, link["href"]))[0]
+        if next_url != urldefrag(page_url)[0]:
+            return next_url
+    if script_driven:
+        raise HttpEngineUnavailable("Pagination is driven by JavaScript")
+    return None
+
+
+def create_session(pool_size: int = 4, retries: int = 3) -> requests.Session:
+    """Session with a pooled, retrying HTTP adapter and browser-like headers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    })
+    return session
+
+
+def fetch_listing_pages(session: Optional[requests.Session] = None, start_url: str = None,
+                        max_pages: int = 50, timeout: float = 30) -> Iterator[Tuple[int, str, str]]:
+    """Yield (page_number, page_url, page_source) for every listings page.
+
+    Raises HttpEngineUnavailable if the first page has no listing tables
+    after the disclaimer step.
+    """
+    session = session or create_session()
+    page_url = start_url or CLEARRECON_URL
+
+    response = session.get(page_url, timeout=timeout)
+    response.raise_for_status()
+    page_source = response.text
+    nav = parse_navigation(page_source)
+
+    if nav.table_count == 0:
+        disclaimer = find_disclaimer_request(nav, response.url)
+        if disclaimer is None:
+            raise HttpEngineUnavailable("No listing tables and no disclaimer link or form to follow")
+        method, url, data = disclaimer
+        print(f"Accepting disclaimer via HTTP {method.upper()} {url}")
+        if method == "post":
+            response = session.post(url, data=data, timeout=timeout)
+        else:
+            response = session.get(url, params=data or None, timeout=timeout)
+        response.raise_for_status()
+        page_source = response.text
+        nav = parse_navigation(page_source)
+        if nav.table_count == 0:
+            raise HttpEngineUnavailable("Listing tables not served over plain HTTP after the disclaimer")
+
+    seen_urls = {urldefrag(response.url)[0]}
+    page_count = 1
+    while True:
+        # Resolve the next link before yielding so JavaScript-only pagination
+        # is detected on the first page, not after partial results
+        next_url = find_next_page_url(nav, response.url) if page_count < max_pages else None
+        yield page_count, response.url, page_source
+
+        if not next_url or next_url in seen_urls:
+            print(f"No more pages found after page {page_count}")
+            break
+        seen_urls.add(next_url)
+
+        response = session.get(next_url, timeout=timeout)
+        response.raise_for_status()
+        page_source = response.text
+        nav = parse_navigation(page_source)
+        page_count += 1
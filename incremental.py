@@ -0,0 +1,180 @@
+"""
+Incremental scraping with per-page change detection.
+
+Each listings page is fingerprinted by the TS numbers and row text it holds.
+On a refresh the scraper stops once it reaches pages that haven't changed
+since the last run. Only new, changed and removed listings are merged into
+the stored dataset, keyed by TS number; a refresh that finds none of them
+publishes nothing.
+
+Page fingerprints are kept in csv_data/scrape_state.json.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from listing_dedup import POSITION_FIELDS, listing_key
+
+SCRAPE_STATE_PATH = "csv_data/scrape_state.json"
+
+
+def page_fingerprint(listings: Iterable[Dict]) -> str:
+    """Hash of a page's TS numbers and row text, in page order."""
+    digest = hashlib.sha256()
+    for listing in listings:
+        digest.update(listing_key(listing).encode('utf-8'))
+        digest.update(b"\x1f")
+        digest.update(str(listing.get("raw_data", "")).encode('utf-8'))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def _content(listing: Dict) -> Dict[str, str]:
+    """Listing fields that matter for change detection (non-empty, position-free)."""
+    content = {}
+    for key, value in listing.items():
+        value = str(value if value is not None else "").strip()
+        if key not in POSITION_FIELDS and value:
+            content[key] = value
+    return content
+
+
+def apply_changes(existing: List[Dict], upserts: List[Dict], replaced: Set[str]) -> List[Dict]:
+    """Existing listings minus the replaced keys, then the new and changed listings."""
+    merged: Dict[str, Dict] = {}
+    for listing in existing:
+        key = listing_key(listing)
+        if key and key not in replaced:
+            merged[key] = listing
+    return list(merged.values()) + upserts
+
+
+class ScrapeState:
+    """Page fingerprints and TS numbers from the last scrape."""
+
+    def __init__(self, pages: Optional[Dict[str, Dict]] = None, updated_at: str = ""):
+        self.pages = pages or {}
+        self.updated_at = updated_at
+
+    @classmethod
+    def load(cls, path: str = SCRAPE_STATE_PATH) -> "ScrapeState":
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(data.get("pages", {}), data.get("updated_at", ""))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path: str = SCRAPE_STATE_PATH):
+        self.updated_at = datetime.now().isoformat(timespec="seconds")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"pages": self.pages, "updated_at": self.updated_at}, f)
+        os.replace(tmp_path, path)
+
+
+class IncrementalTracker:
+    """Decides when a scrape can stop and merges its pages into the stored dataset.
+
+    The scrape stops after `stop_after` consecutive pages whose fingerprint
+    matches the previous run (INCREMENTAL_STOP_AFTER, default 2). A scraper
+    that stops there calls stop(); otherwise the run counts as a full walk,
+    even if its last pages happened to be unchanged.
+    """
+
+    def __init__(self, state: Optional[ScrapeState] = None, stop_after: Optional[int] = None):
+        self.state = state or ScrapeState.load()
+        self.stop_after = stop_after or int(os.environ.get("INCREMENTAL_STOP_AFTER", "2"))
+        self.fetched_pages: Dict[int, List[str]] = {}
+        self.changed_pages: List[int] = []
+        self.stopped_early = False
+        self._unchanged_streak = 0
+
+    def observe(self, page_num: int, page_listings: List[Dict]) -> bool:
+        """Record a fetched page. Returns False once the scrape should stop."""
+        fingerprint = page_fingerprint(page_listings)
+        previous = self.state.pages.get(str(page_num))
+        self.fetched_pages[page_num] = [listing_key(l) for l in page_listings if listing_key(l)]
+        self.state.pages[str(page_num)] = {"fingerprint": fingerprint, "ts_numbers": self.fetched_pages[page_num]}
+
+        if previous and previous.get("fingerprint") == fingerprint:
+            self._unchanged_streak += 1
+            print(f"Page {page_num} unchanged since last scrape ({self._unchanged_streak}/{self.stop_after})")
+        else:
+            self._unchanged_streak = 0
+            self.changed_pages.append(page_num)
+        return self._unchanged_streak < self.stop_after
+
+    def stop(self):
+        """Record that the scrape stopped before the last page, after observe() returned False."""
+        self.stopped_early = True
+
+    def changes(self, existing: List[Dict], fetched: List[Dict]) -> Tuple[List[Dict], Set[str], Dict[str, int]]:
+        """Compare fetched listings with the existing dataset by TS number.
+
+        A listing is removed once it no longer appears anywhere: not on a
+        page fetched this run and, after an early stop, not recorded for a
+        page that wasn't re-fetched.
+        Returns (new and changed listings, keys of the existing listings they
+        replace or that were removed, counts of new/changed/removed/unchanged).
+        """
+        current: Dict[str, Dict] = {}
+        for listing in existing:
+            key = listing_key(listing)
+            if key:
+                current[key] = listing
+
+        stats = {"new": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        upserts: List[Dict] = []
+        replaced: Set[str] = set()
+        seen = set()
+        for listing in fetched:
+            key = listing_key(listing)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            previous = current.get(key)
+            if previous is None:
+                stats["new"] += 1
+            elif _content(previous) != _content(listing):
+                stats["changed"] += 1
+                replaced.add(key)
+            else:
+                stats["unchanged"] += 1
+                continue
+            upserts.append(listing)
+
+        if not self.stopped_early:
+            # Full walk to the last page: anything not seen this run is gone
+            still_listed = seen
+        else:
+            still_listed = seen | {
+                ts for page, info in self.state.pages.items()
+                if int(page) not in self.fetched_pages for ts in info.get("ts_numbers", [])
+            }
+        for key in current:
+            if key not in still_listed:
+                replaced.add(key)
+                stats["removed"] += 1
+
+        return upserts, replaced, stats
+
+    def merge(self, existing: List[Dict], fetched: List[Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+        """Merge fetched listings into the existing dataset by TS number.
+
+        Existing listings that are still current keep their order, followed
+        by the new and changed ones (the order the listings database stores
+        an applied delta in). Returns (merged listings, counts as in changes()).
+        """
+        upserts, replaced, stats = self.changes(existing, fetched)
+        return apply_changes(existing, upserts, replaced), stats
+
+    def save_state(self, path: str = SCRAPE_STATE_PATH):
+        """Persist page fingerprints, dropping pages past the end after a full walk."""
+        if not self.stopped_early:
+            for page in [p for p in self.state.pages if int(p) not in self.fetched_pages]:
+                del self.state.pages[page]
+        self.state.save(path)
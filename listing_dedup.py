@@ -0,0 +1,88 @@
+"""
+Streaming deduplication of scraped listings by TS number.
+
+Every stage that identifies a listing (dedup, the incremental merge and page
+fingerprints, the database's ts_key) uses `listing_key`. Pages are added to
+a ListingDeduper as they are parsed, so only one copy of each listing is
+held and there is no second pass over the whole scrape before saving.
+
+When a TS number appears more than once, DEDUP_POLICY picks the copy kept:
+    last         the copy seen last (default)
+    complete     the copy with the most non-empty fields; ties go to the later copy
+    newest_page  the copy from the highest page number; ties go to the later copy
+"""
+
+import os
+from typing import Callable, Dict, Iterable, List, Mapping
+
+# Fields that describe where a row was scraped from, not the listing itself
+POSITION_FIELDS = ("row_index", "table_index", "page_number")
+
+
+def listing_key(listing: Mapping) -> str:
+    """Canonical dataset key for a listing: its TS number, uppercased, without whitespace."""
+    return "".join(str(listing.get("ts_number", "") or "").split()).upper()
+
+
+def _filled_fields(listing: Mapping) -> int:
+    return sum(1 for key, value in listing.items()
+               if key not in POSITION_FIELDS and str(value if value is not None else "").strip())
+
+
+def _page_number(listing: Mapping) -> int:
+    try:
+        return int(listing.get("page_number") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+# policy -> keep_new(current, candidate): whether candidate replaces current
+CONFLICT_POLICIES: Dict[str, Callable[[Mapping, Mapping], bool]] = {
+    "last": lambda current, candidate: True,
+    "complete": lambda current, candidate: _filled_fields(candidate) >= _filled_fields(current),
+    "newest_page": lambda current, candidate: _page_number(candidate) >= _page_number(current),
+}
+
+
+class ListingDeduper:
+    """Listings keyed by TS number, deduplicated as pages stream in."""
+
+    def __init__(self, policy: str = None):
+        self.policy = (policy or os.environ.get("DEDUP_POLICY", "last")).lower()
+        if self.policy not in CONFLICT_POLICIES:
+            raise ValueError(f"Unknown DEDUP_POLICY {self.policy!r} (choose from {', '.join(CONFLICT_POLICIES)})")
+        self._keep_new = CONFLICT_POLICIES[self.policy]
+        self._unique: Dict[str, Mapping] = {}
+        self.seen = 0
+        self.duplicates = 0
+        self.without_key = 0
+
+    def add(self, listings: Iterable[Mapping]) -> int:
+        """Add one page of listings; returns how many were new TS numbers."""
+        unique = self._unique
+        added = 0
+        for listing in listings:
+            self.seen += 1
+            key = listing_key(listing)
+            if not key:  # Only keep listings with a TS Number
+                self.without_key += 1
+                continue
+            current = unique.get(key)
+            if current is None:
+                unique[key] = listing
+                added += 1
+                continue
+            self.duplicates += 1
+            if self._keep_new(current, listing):
+                unique[key] = listing
+        return added
+
+    def listings(self) -> List[Mapping]:
+        return list(self._unique.values())
+
+    def __len__(self) -> int:
+        return len(self._unique)
+
+    def summary(self) -> str:
+        return (f"{self.seen} total listings, {len(self)} unique by TS Number "
+                f"({self.duplicates} duplicates resolved by '{self.policy}', {self.without_key} without a TS Number)")
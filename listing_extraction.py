@@ -0,0 +1,195 @@
+"""
+Listing field extraction engine for ClearRecon rows.
+
+All patterns are compiled once at import time. The city gazetteer is a hashed
+lookup over the tokenized row text instead of a ~200-alternative regex.
+"""
+
+import re
+from typing import Dict, Optional
+
+# Major CA cities (comprehensive list). Order matters: when two names start
+# at the same word (e.g. "Chino" / "Chino Hills") the earlier entry wins,
+# matching the original regex alternation.
+CA_CITIES = (
+    "Los Angeles", "San Francisco", "San Diego", "Sacramento", "Oakland", "Fresno",
+    "Long Beach", "Bakersfield", "Anaheim", "Riverside", "Santa Ana", "Stockton",
+    "Irvine", "Chula Vista", "Fremont", "San Bernardino", "Modesto", "Fontana",
+    "Oxnard", "Moreno Valley", "Huntington Beach", "Glendale", "Santa Clarita",
+    "Garden Grove", "Oceanside", "Rancho Cucamonga", "Santa Rosa", "Ontario",
+    "Lancaster", "Elk Grove", "Corona", "Palmdale", "Salinas", "Pomona", "Hayward",
+    "Escondido", "Torrance", "Sunnyvale", "Orange", "Fullerton", "Pasadena",
+    "Thousand Oaks", "Visalia", "Simi Valley", "Concord", "Roseville", "Rocklin",
+    "Victorville", "Santa Clara", "Vallejo", "Berkeley", "El Monte", "Downey",
+    "Costa Mesa", "Inglewood", "Carlsbad", "San Buenaventura", "Fairfield",
+    "West Covina", "Murrieta", "Richmond", "Norwalk", "Antioch", "Temecula", "Burbank",
+    "Daly City", "Rialto", "Santa Maria", "El Cajon", "San Mateo", "Clovis", "Compton",
+    "Jurupa Valley", "Vista", "South Gate", "Mission Viejo", "Vacaville", "Carson",
+    "Hesperia", "Santa Monica", "Westminster", "Redding", "Santa Barbara", "Chico",
+    "Newport Beach", "San Leandro", "San Marcos", "Whittier", "Hawthorne",
+    "Citrus Heights", "Tracy", "Alhambra", "Livermore", "Buena Park", "Lakewood",
+    "Merced", "Hemet", "Chino", "Menifee", "Lake Forest", "Napa", "Redwood City",
+    "Bellflower", "Indio", "Tustin", "Baldwin Park", "Chino Hills", "Mountain View",
+    "Alameda", "Upland", "Folsom", "San Ramon", "Pleasanton", "Union City", "Perris",
+    "Manteca", "Lynwood", "Apple Valley", "Redlands", "Turlock", "Milpitas",
+    "Redondo Beach", "Rancho Cordova", "Yorba Linda", "Palo Alto", "Davis", "Camarillo",
+    "Walnut Creek", "Pittsburg", "South San Francisco", "Yuba City", "San Clemente",
+    "Laguna Niguel", "Pico Rivera", "Montebello", "Lodi", "Madera", "Santa Cruz",
+    "La Habra", "Encinitas", "Monterey Park", "Tulare", "Cupertino", "Gardena",
+    "National City", "Petaluma", "Huntington Park", "San Rafael", "Porterville",
+    "Hanford", "Waterford", "Delano", "Diamond Bar", "Glendora", "Cerritos", "Azusa",
+    "Rancho Palos Verdes", "Fountain Valley", "Placentia", "Monrovia", "Santee",
+    "Eastvale", "Rosemead", "San Gabriel", "Gilroy", "Stanton", "Paramount", "Brea",
+    "Covina", "San Bruno", "Arcadia", "Culver City", "Benicia", "Colton", "Beaumont",
+    "Morgan Hill", "San Luis Obispo", "Los Altos", "Brentwood", "Aliso Viejo",
+    "La Mesa", "West Sacramento", "Agoura Hills", "La Mirada", "Rowland Heights",
+    "Cypress", "Newark", "Desert Hot Springs", "Duarte", "Lomita", "Barstow",
+    "Adelanto", "Twentynine Palms", "Yucca Valley", "Joshua Tree", "Ridgecrest",
+    "California City", "Tehachapi", "Mojave",
+)
+
+# Lowercased city name -> priority (its position in CA_CITIES)
+CITY_GAZETTEER: Dict[str, int] = {name.lower(): i for i, name in enumerate(CA_CITIES)}
+MAX_CITY_WORDS = max(len(name.split()) for name in CA_CITIES)
+# First words of every gazetteer name, so most tokens are rejected with one lookup
+CITY_FIRST_WORDS = frozenset(name.split()[0] for name in CITY_GAZETTEER)
+
+WORD_RE = re.compile(r'\w+')
+
+# Fallback city patterns, tried in order when no gazetteer city is found
+CITY_PATTERNS = [
+    # Pattern: City, CA or City, California
+    re.compile(r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*),?\s+CA\b', re.IGNORECASE),
+    re.compile(r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*),?\s+California\b', re.IGNORECASE),
+    # Pattern: Address in City format
+    re.compile(r'(?:in|at|located in)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', re.IGNORECASE),
+    # Pattern: City name before zip code
+    re.compile(r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+\d{5}(?:-\d{4})?\b', re.IGNORECASE),
+]
+CITY_TRAILING_PUNCT_RE = re.compile(r'[,\.]$')
+
+ADDRESS_PATTERNS = [
+    re.compile(r'\d+\s+[A-Za-z\s]+(Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Boulevard|Blvd|Way|Lane|Ln|Circle|Cir|Court|Ct|Place|Pl)\b', re.IGNORECASE),
+    re.compile(r'\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Boulevard|Blvd|Way|Lane|Ln|Circle|Cir|Court|Ct|Place|Pl)', re.IGNORECASE),
+    re.compile(r'\d+\s+[A-Za-z0-9\s\-]+(?=,|\s+[A-Z][a-z]+,?\s+CA)', re.IGNORECASE),
+]
+
+PRICE_RE = re.compile(r'\$[\d,]+(?:\.\d{2})?')
+
+DATE_PATTERNS = [
+    re.compile(r'\b\d{1,2}/\d{1,2}/\d{4}\b'),
+    re.compile(r'\b\d{4}-\d{1,2}-\d{1,2}\b'),
+    re.compile(r'\b\d{1,2}-\d{1,2}-\d{4}\b'),
+]
+
+# TS Number (Trustee Sale Number) patterns, most specific first
+TS_PATTERNS = [
+    # Format: 123456-CA
+    re.compile(r'^\s*(\d{5,}-[A-Z]{2})\b', re.IGNORECASE),
+    # Format: TS# 12345 or TS 12345-CA
+    re.compile(r'TS[#\s]*\s*([A-Z0-9-]{5,})', re.IGNORECASE),
+    # Format: TRUSTEE SALE #12345 or TRUSTEE'S SALE #12345-CA
+    re.compile(r'TRUSTEE[\'S]*\s*SALE[\s-]*#?[\s-]*([A-Z0-9-]{5,})', re.IGNORECASE),
+    # Format: Sale #12345 or Sale #12345-CA
+    re.compile(r'Sale[\s-]*#?[\s-]*([A-Z0-9-]{5,})', re.IGNORECASE),
+    # Look for any 5+ digit number followed by -CA or -AZ
+    re.compile(r'\b(\d{5,}-[A-Z]{2})\b', re.IGNORECASE),
+    # Look for any 5+ digit number that might be a TS Number
+    re.compile(r'\b(\d{5,})\b', re.IGNORECASE),
+]
+TS_CLEAN_RE = re.compile(r'[^A-Z0-9-]')
+
+
+def find_gazetteer_city(text: str) -> Optional[str]:
+    """Return the leftmost known CA city in text, or None.
+
+    Equivalent to searching for the case-insensitive alternation
+    \\b(City1|City2|...)\\b: words are \\w+ runs and multi-word names must be
+    separated by exactly one space.
+    """
+    for word in WORD_RE.finditer(text):
+        key = word.group().lower()
+        if key not in CITY_FIRST_WORDS:
+            continue
+        best = None
+        end = word.end()
+        for n in range(MAX_CITY_WORDS):
+            if n:
+                # Extend the candidate name by the next space-separated word
+                if text[end:end + 1] != " ":
+                    break
+                next_word = WORD_RE.match(text, end + 1)
+                if not next_word:
+                    break
+                key = f"{key} {next_word.group().lower()}"
+                end = next_word.end()
+            priority = CITY_GAZETTEER.get(key)
+            if priority is not None and (best is None or priority < best[0]):
+                best = (priority, end)
+        if best is not None:
+            return text[word.start():best[1]]
+    return None
+
+
+def extract_city(text: str) -> str:
+    city_name = find_gazetteer_city(text)
+    if city_name is None:
+        for pattern in CITY_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                city_name = match.group(1)
+                break
+    if city_name is None:
+        return ""
+    # Clean up city name and use proper case
+    city_name = CITY_TRAILING_PUNCT_RE.sub('', city_name.strip())
+    return city_name.title()
+
+
+def extract_address(text: str) -> str:
+    for pattern in ADDRESS_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group().strip()
+    return ""
+
+
+def extract_price(text: str) -> str:
+    match = PRICE_RE.search(text)
+    return match.group().strip() if match else ""
+
+
+def extract_date(text: str) -> str:
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group().strip()
+    return ""
+
+
+def extract_ts_number(text: str) -> str:
+    for pattern in TS_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        # Get the first non-None group and keep only A-Z, 0-9 and hyphens
+        ts_num = next((g for g in match.groups() if g), '').strip().upper()
+        ts_num = TS_CLEAN_RE.sub('', ts_num)
+        # Ensure TS Number is at least 5 characters (e.g., 12345 or 123-CA)
+        if len(ts_num) >= 5:
+            # If it's just numbers, add -CA suffix
+            if ts_num.isdigit():
+                ts_num = f"{ts_num}-CA"
+            return ts_num
+    return ""
+
+
+def extract_listing_fields(combined_text: str) -> Dict[str, str]:
+    """Extract city, address, price, date and TS number from a row's text."""
+    return {
+        "ts_number": extract_ts_number(combined_text),
+        "address": extract_address(combined_text),
+        "city": extract_city(combined_text),
+        "price": extract_price(combined_text),
+        "date": extract_date(combined_text),
+    }
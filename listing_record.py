@@ -0,0 +1,106 @@
+"""
+Compact record for one scraped listing.
+
+The scraper used to build a 13-key dict per row, and `details` repeated the
+first 1000 characters of `raw_data`. Listing keeps its fields in __slots__
+(no per-row __dict__) and stores the row text once: `details` is derived
+from `raw_data` unless a source supplies different text. Listing reads and
+writes like the dict it replaces (get, [], keys, items), so the CSV writer,
+the database and the incremental merge take either.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+# Characters of the row text shown as a listing's details
+DETAILS_LENGTH = 1000
+
+# Keys in the order the scraper has always produced them
+LISTING_FIELDS = (
+    "ts_number", "address", "city", "county", "date", "sale_date", "price",
+    "details", "status", "raw_data", "row_index", "table_index", "page_number",
+)
+
+
+def derive_details(raw_data: Any) -> str:
+    return str(raw_data or "")[:DETAILS_LENGTH]
+
+
+class Listing(Mapping):
+    """One listing row, stored compactly; `details` is a view of `raw_data`."""
+
+    __slots__ = ("ts_number", "address", "city", "county", "date", "sale_date", "price",
+                 "status", "raw_data", "row_index", "table_index", "page_number", "extra")
+
+    def __init__(self, ts_number: str = "", address: str = "", city: str = "", county: str = "",
+                 date: str = "", sale_date: str = "", price: str = "", status: str = "",
+                 raw_data: str = "", row_index: Any = "", table_index: Any = "", page_number: Any = ""):
+        self.ts_number = ts_number
+        self.address = address
+        self.city = city
+        self.county = county
+        self.date = date
+        self.sale_date = sale_date
+        self.price = price
+        self.status = status
+        self.raw_data = raw_data
+        self.row_index = row_index
+        self.table_index = table_index
+        self.page_number = page_number
+        # Keys beyond LISTING_FIELDS, and details that differ from raw_data
+        self.extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_row(cls, row: Mapping) -> "Listing":
+        """Build from a dict such as a CSV or database row."""
+        listing = cls(raw_data=row.get("raw_data", ""))
+        for key, value in row.items():
+            if key != "raw_data":
+                listing[key] = value
+        return listing
+
+    @property
+    def details(self) -> str:
+        if self.extra and "details" in self.extra:
+            return self.extra["details"]
+        return derive_details(self.raw_data)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "details":
+            return self.details
+        if key in LISTING_FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra and key != "details":
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key == "details":
+            # Only kept when it isn't just the start of raw_data
+            if self.extra:
+                self.extra.pop("details", None)
+            if value != derive_details(self.raw_data):
+                self._set_extra(key, value)
+        elif key in LISTING_FIELDS:
+            setattr(self, key, value)
+        else:
+            self._set_extra(key, value)
+
+    def _set_extra(self, key: str, value: Any):
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __iter__(self) -> Iterator[str]:
+        yield from LISTING_FIELDS
+        if self.extra:
+            yield from (key for key in self.extra if key != "details")
+
+    def __len__(self) -> int:
+        return len(LISTING_FIELDS) + sum(1 for key in (self.extra or ()) if key != "details")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"Listing({self.ts_number!r}, {self.address!r}, {self.city!r})"
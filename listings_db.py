@@ -0,0 +1,359 @@
+"""
+SQLite-backed listings repository.
+
+Every saved scrape becomes a dataset in a single WAL-mode SQLite file. The
+API serves the dataset of the dataset manifest's current version (see
+dataset_versions.py), which records each version's dataset_id, and datasets
+are deleted when their version is pruned. Listings are indexed by TS number,
+normalized city and ISO sale date, so /filter, /cities and /data_info run
+indexed SQL instead of scanning rows in Python. CSV files are written
+alongside as an export format.
+
+The database lives at LISTINGS_DB_PATH (default csv_data/listings.db).
+"""
+
+import os
+import csv
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from file_lock import FileLock
+from listings_store import normalize_city, normalize_sale_date, parse_price
+from listing_record import derive_details
+from listing_dedup import listing_key
+
+LISTINGS_DB_PATH = os.environ.get("LISTINGS_DB_PATH", "csv_data/listings.db")
+
+# Listing fields stored as their own columns; anything else goes in `extra`
+LISTING_COLUMNS = [
+    "ts_number", "address", "city", "county", "date", "sale_date", "price",
+    "details", "status", "page_number", "raw_data", "row_index", "table_index",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    csv_path TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    fieldnames TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS listings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset_id INTEGER NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    ts_key TEXT NOT NULL,
+    city_norm TEXT NOT NULL DEFAULT '',
+    price_value REAL,
+    ts_number TEXT, address TEXT, city TEXT, county TEXT, date TEXT, sale_date TEXT,
+    price TEXT, details TEXT, status TEXT, page_number TEXT, raw_data TEXT,
+    row_index TEXT, table_index TEXT,
+    extra TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_listings_ts ON listings(dataset_id, ts_key);
+CREATE INDEX IF NOT EXISTS idx_listings_city ON listings(dataset_id, city_norm);
+CREATE INDEX IF NOT EXISTS idx_listings_sale_date ON listings(dataset_id, sale_date);
+
+-- Distinct cities per dataset, so substring matches never scan listings
+CREATE TABLE IF NOT EXISTS dataset_cities (
+    dataset_id INTEGER NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    city_norm TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY (dataset_id, city_norm)
+);
+"""
+
+
+class ListingsRepository:
+    """Datasets of listings in one SQLite file, with one connection per thread."""
+
+    def __init__(self, db_path: str = LISTINGS_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # ---- writes -------------------------------------------------------
+
+    def _rows(self, listings: List[Dict]) -> Tuple[List[Tuple], Dict[str, int]]:
+        """Listings as listings-table rows (without dataset_id), plus row counts per normalized city."""
+        rows = []
+        city_counts: Dict[str, int] = {}
+        for listing in listings:
+            values = {f: str(listing.get(f, "") if listing.get(f) is not None else "").strip() for f in LISTING_COLUMNS}
+            if not values["sale_date"]:
+                values["sale_date"] = normalize_sale_date(values["date"])
+            city_norm = normalize_city(values["city"])
+            if city_norm:
+                city_counts[city_norm] = city_counts.get(city_norm, 0) + 1
+            extra = {k: str(v) for k, v in listing.items() if k not in LISTING_COLUMNS}
+            price_value = parse_price(values["price"])
+            # details is only stored when it isn't just the start of raw_data
+            details = values["details"] if values["details"] != derive_details(values["raw_data"]) else None
+            rows.append((
+                listing_key(values), city_norm, None if price_value != price_value else price_value,
+                *(values[f] if f != "details" else details for f in LISTING_COLUMNS),
+                json.dumps(extra) if extra else None,
+            ))
+        return rows, city_counts
+
+    def _insert_rows(self, conn: sqlite3.Connection, dataset_id: int, rows: List[Tuple]):
+        placeholders = ", ".join("?" for _ in range(len(LISTING_COLUMNS) + 5))
+        conn.executemany(
+            f"INSERT INTO listings (dataset_id, ts_key, city_norm, price_value, {', '.join(LISTING_COLUMNS)}, extra) "
+            f"VALUES ({placeholders})",
+            [(dataset_id, *row) for row in rows],
+        )
+
+    def save_dataset(self, listings: List[Dict], csv_path: str, fieldnames: Optional[List[str]] = None) -> int:
+        """Store listings as a new dataset. Returns its id."""
+        if fieldnames is None:
+            keys = set()
+            for listing in listings:
+                keys.update(listing.keys())
+            fieldnames = [f for f in LISTING_COLUMNS if f in keys] + sorted(keys - set(LISTING_COLUMNS))
+
+        rows, city_counts = self._rows(listings)
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO datasets (csv_path, created_at, row_count, fieldnames) VALUES (?, ?, ?, ?)",
+                    (csv_path, datetime.now().isoformat(timespec="seconds"), len(rows), json.dumps(fieldnames)),
+                )
+                dataset_id = cursor.lastrowid
+                self._insert_rows(conn, dataset_id, rows)
+                conn.executemany(
+                    "INSERT INTO dataset_cities (dataset_id, city_norm, row_count) VALUES (?, ?, ?)",
+                    [(dataset_id, city, count) for city, count in city_counts.items()],
+                )
+        print(f"Stored {len(rows)} listings as dataset {dataset_id} in {self.db_path}")
+        return dataset_id
+
+    def save_delta(self, base: sqlite3.Row, upserts: List[Dict], replaced: Set[str],
+                   csv_path: str, fieldnames: List[str]) -> int:
+        """Store a new dataset as `base` with the `replaced` TS keys dropped and `upserts` added.
+
+        The unchanged rows are copied inside SQLite, so an incremental scrape
+        only converts and inserts the listings that are new or changed.
+        Returns the new dataset's id.
+        """
+        rows, _ = self._rows(upserts)
+        columns = ", ".join(["ts_key", "city_norm", "price_value", *LISTING_COLUMNS, "extra"])
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS replaced_keys (ts_key TEXT PRIMARY KEY)")
+                conn.execute("DELETE FROM replaced_keys")
+                conn.executemany("INSERT OR IGNORE INTO replaced_keys VALUES (?)", [(key,) for key in replaced])
+                cursor = conn.execute(
+                    "INSERT INTO datasets (csv_path, created_at, row_count, fieldnames) VALUES (?, ?, 0, ?)",
+                    (csv_path, datetime.now().isoformat(timespec="seconds"), json.dumps(fieldnames)),
+                )
+                dataset_id = cursor.lastrowid
+                copied = conn.execute(
+                    f"INSERT INTO listings (dataset_id, {columns}) SELECT ?, {columns} FROM listings "
+                    "WHERE dataset_id = ? AND ts_key != '' AND ts_key NOT IN (SELECT ts_key FROM replaced_keys) "
+                    "ORDER BY id",
+                    (dataset_id, base["id"]),
+                ).rowcount
+                self._insert_rows(conn, dataset_id, rows)
+                conn.execute(
+                    "INSERT INTO dataset_cities (dataset_id, city_norm, row_count) "
+                    "SELECT dataset_id, city_norm, COUNT(*) FROM listings "
+                    "WHERE dataset_id = ? AND city_norm != '' GROUP BY city_norm",
+                    (dataset_id,),
+                )
+                conn.execute("UPDATE datasets SET row_count = ? WHERE id = ?", (copied + len(rows), dataset_id))
+        print(f"Stored dataset {dataset_id} from dataset {base['id']}: {copied} rows kept, "
+              f"{len(rows)} new or changed, in {self.db_path}")
+        return dataset_id
+
+    def delete_datasets(self, dataset_ids: Iterable[int]) -> int:
+        """Delete datasets (and, by cascade, their listings). Returns how many were removed."""
+        ids = list(dataset_ids)
+        if not ids:
+            return 0
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    f"DELETE FROM datasets WHERE id IN ({', '.join('?' for _ in ids)})", ids,
+                )
+        return cursor.rowcount
+
+    def import_csv(self, csv_path: str) -> int:
+        """Load an existing scraped CSV as a dataset."""
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            listings = list(reader)
+            fieldnames = list(reader.fieldnames or [])
+        # Older CSVs have no sale_date column: it is still derived and indexed,
+        # but rows keep the CSV's own fields
+        return self.save_dataset(listings, csv_path, fieldnames)
+
+    # ---- reads --------------------------------------------------------
+
+    def current_dataset(self) -> Optional[sqlite3.Row]:
+        """The newest dataset stored (the API serves the one the version manifest points at)."""
+        return self._connection().execute(
+            "SELECT * FROM datasets ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+
+    def dataset_for_version(self, version: Dict) -> Optional[sqlite3.Row]:
+        """The dataset of a manifest version: by its dataset_id, else the newest one saved from its CSV."""
+        conn = self._connection()
+        if version.get("dataset_id") is not None:
+            return conn.execute("SELECT * FROM datasets WHERE id = ?", (version["dataset_id"],)).fetchone()
+        return conn.execute(
+            "SELECT * FROM datasets WHERE csv_path = ? ORDER BY id DESC LIMIT 1", (version["csv_path"],)
+        ).fetchone()
+
+    def _row_to_listing(self, row: sqlite3.Row, fieldnames: List[str],
+                        fields: Optional[List[str]] = None) -> Dict[str, str]:
+        extra = json.loads(row["extra"]) if row["extra"] else {}
+        if fields is not None:
+            # sale_date is stored for every row, also for CSVs that had no such column
+            fieldnames = [f for f in fields if f in fieldnames or f == "sale_date"]
+        listing = {f: (row[f] if f in LISTING_COLUMNS else extra.get(f, "")) or "" for f in fieldnames}
+        if "details" in listing and row["details"] is None:
+            listing["details"] = derive_details(row["raw_data"])
+        return listing
+
+    def matching_cities(self, dataset_id: int, city: str) -> List[str]:
+        """Normalized cities equal to or containing `city` (case-insensitive)."""
+        wanted = normalize_city(city)
+        rows = self._connection().execute(
+            "SELECT city_norm FROM dataset_cities WHERE dataset_id = ? AND (city_norm = ? OR instr(lower(city_norm), lower(?)) > 0)",
+            (dataset_id, wanted, wanted),
+        ).fetchall()
+        return [r["city_norm"] for r in rows]
+
+    def filter(self, dataset: sqlite3.Row, city: str, start_iso: str, end_iso: str,
+               offset: int = 0, limit: Optional[int] = None,
+               fields: Optional[List[str]] = None, min_price: Optional[float] = None,
+               max_price: Optional[float] = None, county: str = "") -> Tuple[List[Dict], int, List[Dict], int]:
+        """Page through listings in a date window and listings without a parseable date.
+
+        offset/limit apply to each list separately. Returns (dated page,
+        dated total, undated page, undated total); pages are projected to
+        `fields` when given. The optional price bounds skip rows without a
+        price, and county is a case-insensitive substring match.
+        """
+        fieldnames = json.loads(dataset["fieldnames"])
+        conn = self._connection()
+
+        row_clause = ""
+        params: List = []
+        if city and city != "all":
+            cities = self.matching_cities(dataset["id"], city)
+            if not cities:
+                return [], 0, [], 0
+            row_clause = f" AND city_norm IN ({', '.join('?' for _ in cities)})"
+            params = list(cities)
+        if min_price is not None:
+            row_clause += " AND price_value >= ?"
+            params.append(min_price)
+        if max_price is not None:
+            row_clause += " AND price_value <= ?"
+            params.append(max_price)
+        wanted_county = normalize_city(county).lower() if county != "all" else ""
+        if wanted_county:
+            row_clause += " AND instr(lower(trim(county)), ?) > 0"
+            params.append(wanted_county)
+
+        pages = []
+        for date_clause, date_params in ((" AND sale_date BETWEEN ? AND ?", [start_iso, end_iso]),
+                                         (" AND sale_date = ''", [])):
+            where = f"WHERE dataset_id = ?{date_clause}{row_clause}"
+            where_params = [dataset["id"], *date_params, *params]
+            total = conn.execute(f"SELECT COUNT(*) FROM listings {where}", where_params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM listings {where} ORDER BY id LIMIT ? OFFSET ?",
+                [*where_params, -1 if limit is None else limit, offset],
+            ).fetchall() if total > offset else []
+            pages.append(([self._row_to_listing(r, fieldnames, fields) for r in rows], total))
+
+        (dated, dated_total), (undated, undated_total) = pages
+        return dated, dated_total, undated, undated_total
+
+    def cities(self, dataset_id: int, prefix: str = "", limit: Optional[int] = None) -> List[str]:
+        """Sorted distinct cities, optionally only those starting with prefix."""
+        sql = "SELECT city_norm FROM dataset_cities WHERE dataset_id = ?"
+        params: List = [dataset_id]
+        if prefix:
+            sql += " AND lower(city_norm) LIKE ? ESCAPE '\\'"
+            escaped = prefix.strip().lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(escaped + "%")
+        sql += " ORDER BY city_norm"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [r["city_norm"] for r in self._connection().execute(sql, params).fetchall()]
+
+    def listings(self, dataset: sqlite3.Row, batch_size: int = 1000) -> Iterable[Dict[str, str]]:
+        """Every listing of a dataset in original order (for CSV export).
+
+        Rows are fetched in keyset-paged batches on the calling thread's
+        connection, so a streaming response may resume on another thread.
+        """
+        fieldnames = json.loads(dataset["fieldnames"])
+        last_id = 0
+        while True:
+            batch = self._connection().execute(
+                "SELECT * FROM listings WHERE dataset_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (dataset["id"], last_id, batch_size),
+            ).fetchall()
+            if not batch:
+                return
+            last_id = batch[-1]["id"]
+            for row in batch:
+                yield self._row_to_listing(row, fieldnames)
+
+    def export_csv(self, dataset: sqlite3.Row, csv_path: str):
+        """Write a dataset back out in the scraper's CSV format."""
+        fieldnames = json.loads(dataset["fieldnames"])
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            writer.writerows(self.listings(dataset))
+
+
+_repository: Optional[ListingsRepository] = None
+_repository_lock = threading.Lock()
+
+
+def get_repository(seed_csv: Optional[str] = None) -> ListingsRepository:
+    """Process-wide repository; an empty database is seeded from seed_csv.
+
+    Seeding holds a file lock next to the database, so when several API
+    workers start together only the first one imports the seed.
+    """
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            repository = ListingsRepository()
+            if repository.current_dataset() is None and seed_csv and os.path.exists(seed_csv):
+                with FileLock(f"{repository.db_path}.seed.lock"):
+                    if repository.current_dataset() is None:
+                        print(f"Seeding {repository.db_path} from {seed_csv}")
+                        repository.import_csv(seed_csv)
+            _repository = repository
+        return _repository
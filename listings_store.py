@@ -0,0 +1,418 @@
+"""
+In-memory columnar listings store for the ClearRecon API.
+
+The CSV written by the scraper is loaded once into compact column arrays and
+shared by every request. It is only reloaded when the file's mtime or size
+changes.
+
+Each loaded CSV is also saved as a binary column file next to it
+(<csv>.cols, see columnar_file.py). Later loads memory-map that file instead
+of parsing the CSV, as long as it was written from the CSV's current
+version. LISTINGS_SNAPSHOT_FILES=0 turns this off.
+"""
+
+import os
+import csv
+import sys
+import math
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date
+from typing import List, Dict, Optional, Iterable, Sequence, Tuple
+
+from listing_record import derive_details
+from columnar_file import MappedColumns, map_columns, write_columns
+
+LISTINGS_SNAPSHOT_FILES = os.environ.get("LISTINGS_SNAPSHOT_FILES", "1").lower() not in ("0", "false", "no")
+
+# Date formats seen in scraped CSVs, in the order the API has always tried them
+DATE_FORMATS = ['%m/%d/%Y', '%Y-%m-%d', '%m-%d-%Y', '%d/%m/%Y']
+
+# Sentinel stored in the date column when a row has no parseable sale date
+NO_DATE = 0
+
+# Sentinel stored in the city column when a row has no city
+NO_CITY = -1
+
+
+def parse_date_ordinal(date_str: str) -> int:
+    """Parse a sale date string into a proleptic ordinal, or NO_DATE."""
+    date_str = (date_str or "").strip()
+    if not date_str:
+        return NO_DATE
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).toordinal()
+        except ValueError:
+            continue
+    return NO_DATE
+
+
+def normalize_sale_date(date_str: str) -> str:
+    """Normalize a scraped sale date to ISO 'YYYY-MM-DD', or '' if unparseable."""
+    ordinal = parse_date_ordinal(date_str)
+    return date.fromordinal(ordinal).isoformat() if ordinal != NO_DATE else ""
+
+
+def parse_price(price_str: str) -> float:
+    """Parse a price like '$123,456.00' into a float, or NaN when missing."""
+    cleaned = (price_str or "").replace("$", "").replace(",", "").strip()
+    if not cleaned:
+        return math.nan
+    try:
+        return float(cleaned)
+    except ValueError:
+        return math.nan
+
+
+def normalize_city(city: str) -> str:
+    """Normalize a city name the way the filter form and dropdown expect."""
+    return (city or "").strip().lower().title()
+
+
+class CityIndex:
+    """Inverted index from normalized city to row ids, with n-gram lookup.
+
+    Substring matches are answered from an n-gram index over the distinct
+    city names, so a query never touches individual rows.
+    """
+
+    GRAM_SIZE = 3
+
+    def __init__(self, city_names: List[str], city_codes: Sequence[int],
+                 postings: Optional[List[Sequence[int]]] = None):
+        self.city_names = city_names
+        self.sorted_names = sorted(city_names)
+        # Lowercased names sorted for prefix bisects (autocomplete)
+        self._prefix_keys = sorted((name.lower(), name) for name in city_names)
+        self._codes_by_lower = {name.lower(): code for code, name in enumerate(city_names)}
+
+        # city code -> row ids (ascending, i.e. file order)
+        if postings is None:
+            rows_by_city: List[List[int]] = [[] for _ in city_names]
+            for row_id, code in enumerate(city_codes):
+                if code != NO_CITY:
+                    rows_by_city[code].append(row_id)
+            postings = [array('i', ids) for ids in rows_by_city]
+        self.postings = postings
+
+        # n-gram (lengths 1..GRAM_SIZE) -> set of city codes containing it
+        self._grams: Dict[str, set] = {}
+        for code, name in enumerate(city_names):
+            lowered = name.lower()
+            for size in range(1, self.GRAM_SIZE + 1):
+                for start in range(len(lowered) - size + 1):
+                    self._grams.setdefault(lowered[start:start + size], set()).add(code)
+
+    def lookup(self, city: str) -> set:
+        """City codes matching exactly or containing the query as a substring."""
+        wanted = normalize_city(city).lower()
+        if not wanted:
+            return set()
+
+        exact = self._codes_by_lower.get(wanted)
+        size = min(len(wanted), self.GRAM_SIZE)
+        candidates = None
+        for start in range(len(wanted) - size + 1):
+            codes = self._grams.get(wanted[start:start + size])
+            if not codes:
+                candidates = set()
+                break
+            candidates = set(codes) if candidates is None else candidates & codes
+            if not candidates:
+                break
+
+        # n-grams only narrow the candidates; confirm the full substring
+        matches = {code for code in candidates or () if wanted in self.city_names[code].lower()}
+        if exact is not None:
+            matches.add(exact)
+        return matches
+
+    def complete(self, prefix: str, limit: int = 20) -> List[str]:
+        """City names starting with prefix (case-insensitive), sorted."""
+        wanted = (prefix or "").strip().lower()
+        if not wanted:
+            return self.sorted_names[:limit]
+        start = bisect_left(self._prefix_keys, (wanted,))
+        results = []
+        for lowered, name in self._prefix_keys[start:]:
+            if not lowered.startswith(wanted) or len(results) >= limit:
+                break
+            results.append(name)
+        return results
+
+    def row_ids(self, codes: Iterable[int]) -> List[int]:
+        """Row ids for the given city codes, merged into file order."""
+        return list(heapq.merge(*(self.postings[code] for code in codes)))
+
+
+class ListingsSnapshot:
+    """Immutable column-oriented view of one CSV dataset."""
+
+    def __init__(self, csv_path: str, signature: tuple, fieldnames: List[str]):
+        self.csv_path = csv_path
+        self.signature = signature
+        self.fieldnames = fieldnames
+        # Raw string columns, exactly as read from the CSV; a details entry is
+        # None when it is just the start of raw_data, and derived on read
+        self.columns: Dict[str, List[Optional[str]]] = {name: [] for name in fieldnames}
+        self._derive_details = "details" in fieldnames and "raw_data" in fieldnames
+        # Typed columns derived once at load time
+        self.date_ordinals = array('i')
+        self.city_codes = array('i')
+        self.prices = array('d')
+        # Interned, normalized city names; city_codes index into this list
+        self.city_names: List[str] = []
+        self._city_lookup: Dict[str, int] = {}
+        # Sorted date index, built by finalize(): row ids ordered by sale date
+        # plus the matching ordinals so a date window is two bisects
+        self.date_order = array('i')
+        self.sorted_ordinals = array('i')
+        self.undated_ids = array('i')
+        self.city_index: Optional[CityIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.date_ordinals)
+
+    @property
+    def cities(self) -> List[str]:
+        """Sorted list of unique normalized cities."""
+        return self.city_index.sorted_names if self.city_index else sorted(self.city_names)
+
+    def _city_code(self, city: str) -> int:
+        normalized = normalize_city(city)
+        if not normalized:
+            return NO_CITY
+        code = self._city_lookup.get(normalized)
+        if code is None:
+            code = len(self.city_names)
+            self.city_names.append(sys.intern(normalized))
+            self._city_lookup[normalized] = code
+        return code
+
+    def append(self, row: Dict[str, str]):
+        for name in self.fieldnames:
+            self.columns[name].append(row.get(name) or "")
+        if self._derive_details and self.columns["details"][-1] == derive_details(self.columns["raw_data"][-1]):
+            self.columns["details"][-1] = None
+        # Prefer the ISO column written at ingest; fall back to the raw date
+        # for CSVs scraped before sale_date existed
+        try:
+            ordinal = date.fromisoformat(row.get('sale_date') or "").toordinal()
+        except ValueError:
+            ordinal = parse_date_ordinal(row.get('date', ''))
+        self.date_ordinals.append(ordinal)
+        self.city_codes.append(self._city_code(row.get('city', '')))
+        self.prices.append(parse_price(row.get('price', '')))
+
+    def row(self, index: int, fields: Optional[List[str]] = None) -> Dict[str, str]:
+        """Materialize a single row as a dict in CSV field order (or just `fields`).
+
+        A requested sale_date is returned even when the CSV has no such column.
+        """
+        if fields is None:
+            row = {name: self.columns[name][index] for name in self.fieldnames}
+        else:
+            row = {name: self.columns[name][index] if name in self.columns else ""
+                   for name in fields if name in self.columns or name == "sale_date"}
+            # CSVs scraped before sale_date existed: the ISO date parsed at load time
+            if row.get("sale_date") == "":
+                ordinal = self.date_ordinals[index]
+                row["sale_date"] = date.fromordinal(ordinal).isoformat() if ordinal != NO_DATE else ""
+        if row.get("details", "") is None:
+            row["details"] = derive_details(self.columns["raw_data"][index])
+        return row
+
+    def rows(self, indexes: Iterable[int], fields: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        return [self.row(i, fields) for i in indexes]
+
+    def finalize(self):
+        """Build the sorted date and city indexes once all rows are appended."""
+        date_ordinals = self.date_ordinals
+        dated = [i for i in range(len(date_ordinals)) if date_ordinals[i] != NO_DATE]
+        dated.sort(key=date_ordinals.__getitem__)
+        self.date_order = array('i', dated)
+        self.sorted_ordinals = array('i', (date_ordinals[i] for i in dated))
+        self.undated_ids = array('i', (i for i in range(len(date_ordinals)) if date_ordinals[i] == NO_DATE))
+        self.city_index = CityIndex(self.city_names, self.city_codes)
+
+    # Typed columns saved in a column file, besides the per-city postings
+    ARRAY_COLUMNS = ("date_ordinals", "city_codes", "prices", "date_order", "sorted_ordinals", "undated_ids")
+
+    def save(self, path: str):
+        """Write the finalized snapshot as a binary column file."""
+        postings = array('i')
+        posting_offsets = array('q', [0])
+        for ids in self.city_index.postings:
+            postings.extend(ids)
+            posting_offsets.append(len(postings))
+        arrays = {name: getattr(self, name) for name in self.ARRAY_COLUMNS}
+        arrays.update(city_postings=postings, city_posting_offsets=posting_offsets)
+        meta = {"csv_path": self.csv_path, "csv_signature": list(self.signature),
+                "fieldnames": self.fieldnames, "city_names": self.city_names}
+        write_columns(path, meta, arrays, self.columns)
+
+    @classmethod
+    def from_columns(cls, csv_path: str, signature: tuple, mapped: MappedColumns) -> "ListingsSnapshot":
+        """Snapshot over a mapped column file; nothing is copied besides the city names."""
+        snapshot = cls(csv_path, signature, mapped.meta["fieldnames"])
+        snapshot.columns = dict(mapped.strings)
+        for name in cls.ARRAY_COLUMNS:
+            setattr(snapshot, name, mapped.arrays[name])
+        snapshot.city_names = [sys.intern(name) for name in mapped.meta["city_names"]]
+        snapshot._city_lookup = {name: code for code, name in enumerate(snapshot.city_names)}
+        postings, offsets = mapped.arrays["city_postings"], mapped.arrays["city_posting_offsets"]
+        snapshot.city_index = CityIndex(snapshot.city_names, snapshot.city_codes,
+                                        [postings[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)])
+        return snapshot
+
+    def date_range(self, start_ordinal: int, end_ordinal: int) -> List[int]:
+        """Row ids with a sale date inside [start, end], in file order."""
+        lo = bisect_left(self.sorted_ordinals, start_ordinal)
+        hi = bisect_right(self.sorted_ordinals, end_ordinal)
+        return sorted(self.date_order[lo:hi])
+
+    def filter(self, city: str, start_ordinal: int, end_ordinal: int,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               county: str = "") -> Tuple[List[int], List[int]]:
+        """Return (row ids in the date window, row ids without a parseable date).
+
+        City matching is an exact normalized match or a case-insensitive
+        substring match and applies to both lists, as do the optional county
+        (matched the same way) and price bounds. Rows without a price never
+        match a price bound.
+        """
+        if not city or city == "all":
+            candidates, undated = self.date_range(start_ordinal, end_ordinal), list(self.undated_ids)
+        else:
+            # Walk only the rows of the matching cities, checking each date ordinal
+            date_ordinals = self.date_ordinals
+            candidates = []
+            undated = []
+            for i in self.city_index.row_ids(self.city_index.lookup(city)):
+                ordinal = date_ordinals[i]
+                if ordinal == NO_DATE:
+                    undated.append(i)
+                elif start_ordinal <= ordinal <= end_ordinal:
+                    candidates.append(i)
+
+        matches = self._row_predicate(min_price, max_price, county)
+        if matches is not None:
+            candidates = [i for i in candidates if matches(i)]
+            undated = [i for i in undated if matches(i)]
+        return candidates, undated
+
+    def _row_predicate(self, min_price: Optional[float], max_price: Optional[float], county: str):
+        """Per-row check for the optional price and county filters, or None when there are none."""
+        checks = []
+        prices = self.prices
+        if min_price is not None:
+            checks.append(lambda i: prices[i] >= min_price)
+        if max_price is not None:
+            checks.append(lambda i: prices[i] <= max_price)
+        wanted = normalize_city(county).lower() if county != "all" else ""
+        if wanted:
+            counties = self.columns.get("county") or [""] * len(self)
+            checks.append(lambda i: wanted in normalize_city(counties[i]).lower())
+        if not checks:
+            return None
+        return lambda i: all(check(i) for check in checks)
+
+
+def file_signature(csv_path: str) -> Optional[tuple]:
+    """Return (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def snapshot_path(csv_path: str) -> str:
+    """Where the binary column file for a CSV dataset lives."""
+    return f"{csv_path}.cols"
+
+
+def map_snapshot(csv_path: str, signature: tuple) -> Optional[ListingsSnapshot]:
+    """Map the CSV's column file, unless it is missing or was written from another version of the CSV."""
+    mapped = map_columns(snapshot_path(csv_path))
+    if mapped is None or tuple(mapped.meta.get("csv_signature") or ()) != signature:
+        return None
+    return ListingsSnapshot.from_columns(csv_path, signature, mapped)
+
+
+def save_snapshot_file(snapshot: ListingsSnapshot) -> Optional[str]:
+    """Save a snapshot's column file next to its CSV; returns the file's path."""
+    path = snapshot_path(snapshot.csv_path)
+    try:
+        snapshot.save(path)
+    except OSError as e:
+        print(f"Could not write column file {path}: {e}")
+        return None
+    return path
+
+
+def write_snapshot_file(csv_path: str) -> Optional[str]:
+    """Parse a freshly written listings CSV and save its column file."""
+    return save_snapshot_file(parse_snapshot(csv_path))
+
+
+def load_snapshot(csv_path: str) -> ListingsSnapshot:
+    """Load a listings CSV: map its column file, or parse the CSV and write one."""
+    signature = file_signature(csv_path)
+    if LISTINGS_SNAPSHOT_FILES:
+        snapshot = map_snapshot(csv_path, signature)
+        if snapshot is not None:
+            print(f"Mapped {len(snapshot)} listings and {len(snapshot.city_names)} cities from {snapshot_path(csv_path)}")
+            return snapshot
+    snapshot = parse_snapshot(csv_path)
+    if LISTINGS_SNAPSHOT_FILES:
+        save_snapshot_file(snapshot)
+    return snapshot
+
+
+def parse_snapshot(csv_path: str) -> ListingsSnapshot:
+    """Parse a listings CSV into a ListingsSnapshot."""
+    signature = file_signature(csv_path)
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        snapshot = ListingsSnapshot(csv_path, signature, list(reader.fieldnames or []))
+        for row in reader:
+            snapshot.append(row)
+    snapshot.finalize()
+    print(f"Loaded {len(snapshot)} listings and {len(snapshot.city_names)} cities from {csv_path}")
+    return snapshot
+
+
+class ListingsStore:
+    """Process-wide cache of the current listings snapshot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ListingsSnapshot] = None
+
+    def get(self, csv_path: str) -> Optional[ListingsSnapshot]:
+        """Return the snapshot for csv_path, reloading only if the file changed."""
+        signature = file_signature(csv_path) if csv_path else None
+        if signature is None:
+            return None
+
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.csv_path == csv_path and snapshot.signature == signature:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.csv_path != csv_path or snapshot.signature != signature:
+                snapshot = load_snapshot(csv_path)
+                self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+
+listings_store = ListingsStore()
@@ -0,0 +1,437 @@
+"""
+Counters and histograms exposed in Prometheus text format on GET /metrics.
+
+Scrape spans (driver init, navigation, disclaimer, page waits, parse, save),
+per-page listing counts, field extraction time and /filter latency are
+recorded here. Scrapes run in a worker process, and pages may be parsed in
+further processes. Those processes ship their metrics to the API process as
+a snapshot (see `drain`), which is merged into its registry. Stats the API
+already keeps (query cache, thread pools, email queue) are added when
+/metrics is rendered, by registered collectors.
+
+With several API workers, each worker writes its metrics to a file in
+METRICS_DIR every few seconds (see `share`), and /metrics adds up the
+counters and histograms of every worker's file, so any worker reports the
+deployment's totals. Files of workers that exited are kept, so totals never
+go backwards; METRICS_DIR is emptied when the server starts. Per-worker
+collectors (stats of one process, like its cache or thread pools) are
+reported for every live worker with a `pid` label.
+
+Configuration:
+    METRICS_DIR              directory shared by the API workers (unset: this process only)
+    METRICS_FLUSH_INTERVAL   seconds between a worker's metric file writes (default 5)
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+# (labels, value) pairs a collector reports for one metric
+Samples = List[Tuple[Dict[str, str], float]]
+# A collector returns (name, type, help, samples) for each metric it reports
+Collector = Callable[[], Iterable[Tuple[str, str, str, Samples]]]
+
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+
+# Seconds; from fast page waits up to slow Chrome starts
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else f"{int(value)}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def empty(self) -> "_Metric":
+        """A metric like this one without any values."""
+        return type(self)(self.name, self.help, self.labelnames)
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self._labels(k))} {_format_value(v)}" for k, v in values.items()]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+    def merge(self, snapshot: Dict):
+        with self._lock:
+            for key, value in snapshot.items():
+                self._values[key] = self._values.get(key, 0.0) + value
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (last is +Inf), sum]
+        self._series: Dict[LabelValues, List] = {}
+
+    def empty(self) -> "Histogram":
+        return Histogram(self.name, self.help, self.labelnames, self.buckets)
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Span: observe the wall-clock seconds the block took."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def time_iter(self, iterable: Iterable, **labels: str) -> Iterator:
+        """Yield from iterable, observing how long each item took to produce."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(time.perf_counter() - start, **labels)
+            yield item
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        lines = []
+        for key, (counts, total) in series.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+    def merge(self, snapshot: Dict):
+        with self._lock:
+            for key, (counts, total) in snapshot.items():
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    """The metrics of one process, plus collectors for stats kept elsewhere."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        # name -> collector, so a module imported twice (as __main__ and by name) reports once
+        self._collectors: Dict[str, Collector] = {}
+        self._worker_collectors: Dict[str, Collector] = {}
+        self._lock = threading.Lock()
+        self.shared_dir: Optional[str] = None
+        self._flush_stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Collector, per_worker: bool = False):
+        """Add stats reported on render; per_worker ones describe this process and get a pid label."""
+        with self._lock:
+            (self._worker_collectors if per_worker else self._collectors)[collector.__name__] = collector
+
+    def _collect(self, collectors: List[Collector]) -> List[Tuple[str, str, str, Samples]]:
+        families = []
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                print(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        return families
+
+    def _worker_families(self) -> List[Tuple[str, str, str, Samples]]:
+        """This process's per-worker stats, labelled with its pid."""
+        with self._lock:
+            collectors = list(self._worker_collectors.values())
+        pid = str(os.getpid())
+        return [(name, kind, help, [({**labels, "pid": pid}, value) for labels, value in samples])
+                for name, kind, help, samples in self._collect(collectors)]
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format.
+
+        With a shared directory, counters and histograms are summed over
+        every worker's file and per-worker stats of every live worker are
+        included.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+        worker_families = self._worker_families()
+        if self.shared_dir:
+            others = self._read_shared()
+            combined = []
+            for metric in metrics:
+                total = metric.empty()
+                total.merge(metric.snapshot())
+                for worker in others:
+                    total.merge(_decode(worker["metrics"].get(metric.name, [])))
+                combined.append(total)
+            metrics = combined
+            worker_families += [tuple(family) for worker in others if _alive(worker["pid"])
+                                for family in worker["collected"]]
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.lines())
+        # One HELP/TYPE header per family, with the samples of every worker under it
+        families: Dict[str, Tuple[str, str, Samples]] = {}
+        for name, kind, help, samples in self._collect(collectors) + worker_families:
+            families.setdefault(name, (kind, help, []))[2].extend(samples)
+        for name, (kind, help, samples) in families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+    # ---- sharing between API workers ------------------------------------
+
+    def _shared_path(self, pid: int) -> str:
+        return os.path.join(self.shared_dir, f"metrics-{pid}.json")
+
+    def flush(self):
+        """Write this process's metrics and per-worker stats to its file in the shared directory."""
+        if not self.shared_dir:
+            return
+        with self._lock:
+            metrics = list(self._metrics.values())
+        record = {
+            "pid": os.getpid(),
+            "metrics": {metric.name: _encode(metric.snapshot()) for metric in metrics},
+            "collected": self._worker_families(),
+        }
+        path = self._shared_path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def _read_shared(self) -> List[Dict]:
+        """The last flushed records of the other workers."""
+        records = []
+        for filename in sorted(os.listdir(self.shared_dir)):
+            if not (filename.startswith("metrics-") and filename.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.shared_dir, filename), 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if record.get("pid") != os.getpid():
+                records.append(record)
+        return records
+
+    def share(self, directory: str, interval: float = METRICS_FLUSH_INTERVAL):
+        """Flush this process's metrics to `directory` every `interval` seconds until unshare()."""
+        if self._flusher is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self.shared_dir = directory
+        self._flush_stop.clear()
+
+        def run():
+            while not self._flush_stop.wait(interval):
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"Writing metrics to {directory} failed: {e}")
+
+        self._flusher = threading.Thread(target=run, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def unshare(self):
+        """Stop the flush thread after a last flush (the file stays, so totals keep this worker's counts)."""
+        if self._flusher is None:
+            return
+        self._flush_stop.set()
+        self._flusher.join()
+        self._flusher = None
+        self.flush()
+        self.shared_dir = None
+
+    def drain(self) -> Dict[str, Dict]:
+        """Snapshot and reset this process's metrics, to be merged into another registry."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {}
+        for metric in metrics:
+            snapshot[metric.name] = metric.snapshot()
+            metric.reset()
+        return snapshot
+
+    def merge(self, snapshot: Optional[Dict[str, Dict]]):
+        """Add metrics recorded by another process."""
+        for name, values in (snapshot or {}).items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+
+def _encode(snapshot: Dict) -> List:
+    """A metric snapshot as JSON: [label values, value] pairs."""
+    return [[list(key), value] for key, value in snapshot.items()]
+
+
+def _decode(items: List) -> Dict:
+    return {tuple(key): value for key, value in items}
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def clear_shared_metrics(directory: str):
+    """Remove the metric files of a previous server run; call before the workers start."""
+    if not os.path.isdir(directory):
+        return
+    for filename in os.listdir(directory):
+        if filename.startswith("metrics-"):
+            os.remove(os.path.join(directory, filename))
+
+
+REGISTRY = Registry()
+
+SCRAPE_STEP_SECONDS = REGISTRY.histogram(
+    "clearrecon_scrape_step_seconds",
+    "Time spent in each scraper step (driver_init, navigation, disclaimer, page waits, parse, save)",
+    ["step"])
+SCRAPE_PAGES = REGISTRY.counter(
+    "clearrecon_scrape_pages_total", "Listing pages scraped")
+SCRAPE_PAGE_LISTINGS = REGISTRY.histogram(
+    "clearrecon_scrape_page_listings", "Listings found per scraped page",
+    buckets=(0, 5, 10, 25, 50, 100, 250, 500))
+EXTRACTION_SECONDS = REGISTRY.histogram(
+    "clearrecon_field_extraction_seconds", "Regex field extraction time per listing row",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01))
+SCRAPE_JOBS = REGISTRY.counter(
+    "clearrecon_scrape_jobs_total", "Finished scrape jobs by outcome", ["status"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "clearrecon_request_seconds", "API request latency, until the response is fully sent", ["path", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+
+class RequestLatencyMiddleware:
+    """ASGI middleware timing requests to the given paths into REQUEST_SECONDS."""
+
+    def __init__(self, app, paths: Iterable[str] = ("/filter",)):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, path=scope["path"], status=str(status["code"]))
@@ -0,0 +1,83 @@
+"""
+Listings parsed out of one page of ClearRecon HTML.
+
+This is the parse step every scraper engine hands to ParsePipeline
+(parse_pipeline.py). The pipeline's spawned parser processes import this
+module, so it only pulls in the parser backends, the field extraction
+engine and the listing record, never the API module with its Selenium
+imports and app setup.
+"""
+
+import time
+from typing import List, Optional
+
+from listing_extraction import extract_listing_fields
+from listing_record import Listing
+from listings_store import normalize_sale_date
+from metrics import EXTRACTION_SECONDS, SCRAPE_STEP_SECONDS
+from page_parsers import PageParser, get_page_parser
+
+
+def parse_page_listings(page_source: str, page_num: int) -> List[Listing]:
+    """Parse one page of listing HTML (worker-pool entry point)."""
+    with SCRAPE_STEP_SECONDS.time(step="parse"):
+        return extract_all_listings_selenium(page_source, None, page_num)
+
+
+def extract_all_listings_selenium(page_source: str, driver, page_num: int, parser: Optional[PageParser] = None) -> List[Listing]:
+    """Extract all listings from the Selenium-loaded page HTML."""
+    listings = []
+    parser = parser or get_page_parser()
+
+    try:
+        # Strategy 1: Table-based extraction
+        tables = parser.extract_tables(page_source)
+        print(f"Found {len(tables)} data tables on page {page_num} ({parser.name} parser)")
+
+        for table_index, (headers, rows) in enumerate(tables):
+            print(f"Table {table_index + 1}: {len(rows) + 1} rows, Headers: {headers}")
+
+            for row_index, cell_data in enumerate(rows, 1):  # Header already skipped
+                if any(cell_data):  # Skip empty rows
+                    listing = parse_listing_data_enhanced(cell_data, headers)
+                    listing["row_index"] = row_index
+                    listing["table_index"] = table_index + 1
+                    listing["page_number"] = page_num
+                    listings.append(listing)
+
+        # Strategy 2: Div-based extraction if no tables
+        if not listings:
+            print(f"No table data found on page {page_num}, trying div extraction...")
+
+            for div_index, text in enumerate(parser.extract_listing_divs(page_source)):
+                if len(text) > 50:  # Meaningful content
+                    listing = parse_listing_data_enhanced([text], [])
+                    listing["row_index"] = div_index + 1
+                    listing["table_index"] = 0
+                    listing["page_number"] = page_num
+                    listing["source"] = "div extraction"
+                    listings.append(listing)
+
+        print(f"Page {page_num}: Extracted {len(listings)} listings")
+        return listings
+
+    except Exception as e:
+        print(f"Extraction error on page {page_num}: {e}")
+        return []
+
+
+def parse_listing_data_enhanced(cell_data: List[str], headers: List[str]) -> Listing:
+    """Enhanced parsing with comprehensive city extraction and CSV structure."""
+    # Combine all cell data for analysis; details is a view of its first
+    # DETAILS_LENGTH characters rather than a second copy
+    combined_text = " ".join(cell_data).strip()
+
+    # Pull city, address, price, date and TS Number with the precompiled engine
+    extract_start = time.perf_counter()
+    listing = Listing(raw_data=combined_text, **extract_listing_fields(combined_text))
+    EXTRACTION_SECONDS.observe(time.perf_counter() - extract_start)
+
+    # Normalize the sale date once at ingest so queries never re-parse it
+    listing.sale_date = normalize_sale_date(listing.date)
+
+    return listing
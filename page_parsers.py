@@ -0,0 +1,136 @@
+"""
+Page parser backends for ClearRecon listing pages.
+
+The scraper hands raw page HTML to a parser backend, which returns table
+headers and cell text for each listing table. The lxml backend is the fast
+path for the known table layout. The BeautifulSoup backend is kept as a
+fallback and produces the same output.
+
+Select a backend with the PAGE_PARSER environment variable ("lxml", "bs4"
+or "auto"; default "auto" = lxml when installed).
+"""
+
+import os
+import re
+from typing import List, Tuple
+
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Class names that mark listing containers when a page has no tables
+LISTING_DIV_CLASS_RE = re.compile(r'listing|property|auction|item')
+
+# (headers, rows) for one table; each row is the stripped text of its cells
+TableData = Tuple[List[str], List[List[str]]]
+
+
+class PageParser:
+    """Base class for page parser backends."""
+
+    name = "base"
+
+    def extract_tables(self, page_source: str) -> List[TableData]:
+        """Return (headers, rows) for every table with a header and data rows."""
+        raise NotImplementedError
+
+    def extract_listing_divs(self, page_source: str) -> List[str]:
+        """Return the stripped text of every listing-like div."""
+        raise NotImplementedError
+
+
+class BeautifulSoupPageParser(PageParser):
+    """Original html.parser based extraction, used when lxml is unavailable."""
+
+    name = "bs4"
+
+    def extract_tables(self, page_source: str) -> List[TableData]:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(page_source, 'html.parser')
+        tables = []
+        for table in soup.find_all('table'):
+            # The table's own rows and cells, not those of tables nested in it
+            rows = [row for row in table.find_all('tr') if row.find_parent('table') is table]
+            if len(rows) > 1:  # Has header and data rows
+                headers = [th.get_text(strip=True) for th in rows[0].find_all(['th', 'td'], recursive=False)]
+                data = [[cell.get_text(strip=True) for cell in row.find_all(['td', 'th'], recursive=False)]
+                        for row in rows[1:]]
+                tables.append((headers, data))
+        return tables
+
+    def extract_listing_divs(self, page_source: str) -> List[str]:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(page_source, 'html.parser')
+        return [div.get_text(strip=True) for div in soup.find_all('div', class_=LISTING_DIV_CLASS_RE)]
+
+
+def _lxml_text(element) -> str:
+    """Equivalent of BeautifulSoup's get_text(strip=True) for an lxml element."""
+    return "".join(text.strip() for text in element.itertext())
+
+
+class LxmlPageParser(PageParser):
+    """Fast path: lxml's C parser with direct element iteration."""
+
+    name = "lxml"
+
+    def _parse(self, page_source: str):
+        """The parsed document, or None for an empty page (which lxml refuses to parse)."""
+        if not page_source or not page_source.strip():
+            return None
+        try:
+            return lxml.html.document_fromstring(page_source)
+        except ValueError:
+            # Unicode strings with an XML encoding declaration must be bytes
+            return lxml.html.document_fromstring(page_source.encode('utf-8'))
+        except lxml.etree.ParserError:
+            return None
+
+    def extract_tables(self, page_source: str) -> List[TableData]:
+        doc = self._parse(page_source)
+        if doc is None:
+            return []
+        tables = []
+        for table in doc.iter('table'):
+            # The table's own rows (directly or in thead/tbody/tfoot) and cells,
+            # not those of tables nested in it
+            rows = table.xpath('./tr|./*/tr')
+            if len(rows) > 1:  # Has header and data rows
+                headers = [_lxml_text(cell) for cell in rows[0].xpath('./th|./td')]
+                data = [[_lxml_text(cell) for cell in row.xpath('./td|./th')] for row in rows[1:]]
+                tables.append((headers, data))
+        return tables
+
+    def extract_listing_divs(self, page_source: str) -> List[str]:
+        doc = self._parse(page_source)
+        if doc is None:
+            return []
+        texts = []
+        for div in doc.iter('div'):
+            classes = (div.get('class') or '').split()
+            if any(LISTING_DIV_CLASS_RE.search(cls) for cls in classes):
+                texts.append(_lxml_text(div))
+        return texts
+
+
+PAGE_PARSERS = {
+    "lxml": LxmlPageParser,
+    "bs4": BeautifulSoupPageParser,
+}
+
+
+def get_page_parser(name: str = None) -> PageParser:
+    """Return the configured page parser backend."""
+    name = (name or os.environ.get("PAGE_PARSER", "auto")).lower()
+    if name == "auto":
+        name = "lxml" if LXML_AVAILABLE else "bs4"
+    if name == "lxml" and not LXML_AVAILABLE:
+        print("lxml is not installed - falling back to BeautifulSoup page parser")
+        name = "bs4"
+    if name not in PAGE_PARSERS:
+        raise ValueError(f"Unknown page parser '{name}'. Choose from: {', '.join(PAGE_PARSERS)}")
+    return PAGE_PARSERS[name]()
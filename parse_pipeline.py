@@ -0,0 +1,118 @@
+"""
+Parallel parsing of scraped pages.
+
+The scraper engines are producers: each page's HTML is submitted to a
+ParsePipeline as soon as it is loaded and the engine moves straight on to
+the next page. A process pool parses pages in parallel, so parsing uses
+every core and overlaps navigation and network waits instead of running
+between page clicks. Parsed pages are consumed in page order and streamed
+into a ListingDeduper (listing_dedup.py), which drops duplicate TS numbers
+as pages arrive rather than after the whole scrape.
+
+Configuration:
+    SCRAPER_PARSE_PROCESSES  parser processes (default: CPU count, at most 4; 0 parses inline,
+                             the default on a single CPU where a pool only adds start-up cost)
+    SCRAPER_PARSE_BACKLOG    pages waiting for a parser before the producer blocks (default 8)
+"""
+
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from functools import partial
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+# parse_page(page_source, page_number) -> listings on that page; must be a
+# module-level function so it can be sent to the worker processes, which
+# import its module: keep it in a light one (page_listings.py), not the API
+PageParseFunc = Callable[[str, int], List[Dict]]
+
+
+def parse_in_worker(parse_page: PageParseFunc, page_source: str, page_number: int) -> Tuple[List[Dict], Dict]:
+    """Worker process entry point: the page's listings plus the metrics recorded parsing it."""
+    listings = parse_page(page_source, page_number)
+    return listings, REGISTRY.drain()
+
+
+def default_parse_processes() -> int:
+    cpus = os.cpu_count() or 1
+    return int(os.environ.get("SCRAPER_PARSE_PROCESSES", min(cpus, 4) if cpus > 1 else 0))
+
+
+class ParsePipeline:
+    """Pages in, parsed pages out in page order; parsing happens on a process pool."""
+
+    def __init__(self, parse_page: PageParseFunc, processes: Optional[int] = None,
+                 backlog: Optional[int] = None):
+        self.parse_page = parse_page
+        self.processes = default_parse_processes() if processes is None else processes
+        self.backlog = max(1, backlog or int(os.environ.get("SCRAPER_PARSE_BACKLOG", "8")))
+        self._pending: Deque[Tuple[int, Future]] = deque()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if self.processes > 0:
+            # Spawned like scrape jobs: the engines run alongside browser and HTTP threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+
+    @property
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        """The parser pool, for engines that schedule parsing themselves (None when inline)."""
+        return self._executor
+
+    @property
+    def parse_func(self) -> Callable[[str, int], Any]:
+        """What to run on `executor` for a page; pass its result through `collect`."""
+        return partial(parse_in_worker, self.parse_page) if self._executor is not None else self.parse_page
+
+    def collect(self, result: Any) -> List[Dict]:
+        """A page's listings from a parse_func result, merging worker metrics into this process."""
+        if self._executor is None:
+            return result
+        listings, worker_metrics = result
+        REGISTRY.merge(worker_metrics)
+        return listings
+
+    def submit(self, page_source: str, page_number: int):
+        """Queue a page for parsing; blocks only while the backlog is full."""
+        if len(self._pending) >= self.backlog:
+            wait([self._pending[0][1]])
+        if self._executor is None:
+            future: Future = Future()
+            try:
+                future.set_result(self.parse_page(page_source, page_number))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = self._executor.submit(self.parse_func, page_source, page_number)
+        self._pending.append((page_number, future))
+
+    def ready(self, wait_all: bool = False) -> Iterator[Tuple[int, List[Dict]]]:
+        """Yield (page_number, listings) for parsed pages, in page order.
+
+        Without wait_all, stops at the first page still being parsed.
+        A page whose parse failed yields no listings.
+        """
+        while self._pending and (wait_all or self._pending[0][1].done()):
+            page_number, future = self._pending.popleft()
+            try:
+                listings = self.collect(future.result())
+            except Exception as e:
+                print(f"Parsing page {page_number} failed: {e}")
+                listings = []
+            yield page_number, listings
+
+    def close(self):
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self) -> "ParsePipeline":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
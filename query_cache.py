@@ -0,0 +1,100 @@
+"""
+LRU/TTL cache for /filter query results.
+
+Keys are the normalized filter parameters plus the version of the dataset
+being served, so a newly published dataset can never be answered from
+entries for the old one. Publishing also clears the cache outright to free
+the memory. Hit, miss, eviction and expiry counters are kept for monitoring.
+
+Configuration:
+    FILTER_CACHE_SIZE  entries to keep (default 256, 0 disables the cache)
+    FILTER_CACHE_TTL   seconds an entry stays valid (default 300)
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+from listings_store import normalize_city
+
+
+def filter_cache_key(city: str, start: date, end: date, version: Hashable,
+                     offset: int = 0, limit: Optional[int] = None,
+                     fields: Optional[Sequence[str]] = None, min_price: Optional[float] = None,
+                     max_price: Optional[float] = None, county: str = "") -> Tuple:
+    """Normalized cache key for a /filter query.
+
+    "" and "all" both select every city (or county). Any other city or
+    county is matched case-insensitively, so only its normalized form matters.
+    """
+    city_key = ("*",) if not city or city == "all" else ("city", normalize_city(city).lower())
+    county_key = "" if county == "all" else normalize_city(county).lower()
+    return (city_key, start.isoformat(), end.isoformat(), offset, limit,
+            tuple(fields) if fields is not None else None, min_price, max_price, county_key, version)
+
+
+class QueryCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+filter_cache = QueryCache(
+    maxsize=int(os.environ.get("FILTER_CACHE_SIZE", "256")),
+    ttl=float(os.environ.get("FILTER_CACHE_TTL", "300")),
+)
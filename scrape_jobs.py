@@ -0,0 +1,458 @@
+"""
+Background scrape jobs, run in a long-lived worker process.
+
+POST /scrape_all starts a job and returns at once. The scrape runs in a
+child process (so Chrome, parsing and the save never touch the API's event
+loop or threads) and streams progress back over a queue: pages done,
+listings found and elapsed time are reported by GET /scrape_jobs/{job_id}.
+The child is started with the first job and then runs every later job, so
+the Chrome pool it owns stays warm between scrapes (DRIVER_POOL_WARM=1
+starts the browsers as soon as the child starts). On shutdown or timeout
+the child gets SIGTERM, which it turns into a normal exit: the scraper's
+cleanup runs, parser processes are stopped and Chrome is quit.
+Only one job runs at a time; starting another while one is running returns
+the running job. When a job succeeds, the API publishes its dataset in one
+step via the `on_success` callback.
+
+With several API workers, every worker has a ScrapeJobManager. A job runs
+under a file lock, so only one worker starts it, and job status is kept in
+a shared state file so any worker can report it. Only the worker holding
+the schedule lock runs scheduled scrapes.
+
+Configuration:
+    SCRAPE_SCHEDULE      cron expression ("m h dom mon dow") for scheduled scrapes, e.g. "0 6 * * *"
+    SCRAPE_JOB_TIMEOUT   seconds before a job's worker process is stopped (default 3600)
+    SCRAPE_JOBS_PATH     shared job status file (default csv_data/scrape_jobs.json); its
+                         locks are <path>.lock, <path>.run.lock and <path>.schedule.lock
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import signal
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from file_lock import FileLock, is_locked
+from metrics import REGISTRY, SCRAPE_JOBS
+
+SCRAPE_JOBS_PATH = os.environ.get("SCRAPE_JOBS_PATH", "csv_data/scrape_jobs.json")
+
+# Jobs whose status is remembered for the status endpoint
+MAX_TRACKED_JOBS = 50
+
+# Set in the worker process; the scrapers report progress through it
+_progress_queue = None
+
+
+def report_progress(pages_done: int, listings_found: int):
+    """Called by the scrapers after each page; a no-op outside a job."""
+    if _progress_queue is not None:
+        _progress_queue.put(("progress", pages_done, listings_found))
+
+
+def _run_scrape(progress_queue, engine: Optional[str], incremental: Optional[bool]):
+    """Run one job in the worker process, reporting its outcome on the queue."""
+    try:
+        from selenium_main_final import scrape_clearrecon
+        csv_path = scrape_clearrecon(engine, incremental)
+        # The scrape's spans and counters, for the API's /metrics
+        progress_queue.put(("metrics", REGISTRY.drain()))
+        if csv_path:
+            progress_queue.put(("done", csv_path))
+        else:
+            progress_queue.put(("error", "Scraper returned no dataset"))
+    except Exception as e:
+        progress_queue.put(("error", f"{type(e).__name__}: {e}"))
+
+
+def _exit_on_sigterm(signum, frame):
+    # Unwinds the running scrape through its finally blocks
+    raise SystemExit(128 + signum)
+
+
+def _scrape_worker(commands, progress_queue):
+    """Worker process entry point: runs jobs from `commands` until it gets None."""
+    global _progress_queue
+    _progress_queue = progress_queue
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    from driver_pool import DRIVER_POOL_WARM, close_driver_pool, get_driver_pool
+    try:
+        if DRIVER_POOL_WARM:
+            try:
+                get_driver_pool().warm()
+            except Exception as e:
+                print(f"Could not warm the driver pool: {e}")
+        while True:
+            command = commands.get()
+            if command is None:
+                break
+            _run_scrape(progress_queue, *command)
+    finally:
+        close_driver_pool()
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.split(","):
+        spec, _, step = part.partition("/")
+        if spec == "*":
+            start, end = low, high
+        elif "-" in spec:
+            start, end = (int(v) for v in spec.split("-", 1))
+        else:
+            start = end = int(spec)
+            if step:
+                end = high
+        if not low <= start <= end <= high:
+            raise ValueError(f"cron field {field!r} out of range {low}-{high}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronSchedule:
+    """Five-field cron expression: minute hour day-of-month month day-of-week (0 = Sunday).
+
+    Supports *, lists, ranges and steps (e.g. "*/30 6-18 * * 1-5").
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields, got {expression!r}")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {d % 7 for d in _parse_cron_field(fields[4], 0, 7)}
+        # Like cron: when both day fields are restricted, either may match
+        self._any_day = fields[2] == "*" or fields[4] == "*"
+
+    def matches(self, moment: datetime) -> bool:
+        if moment.minute not in self.minutes or moment.hour not in self.hours or moment.month not in self.months:
+            return False
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        return (day_ok and weekday_ok) if self._any_day else (day_ok or weekday_ok)
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(366 * 24 * 60):
+            if self.matches(candidate):
+                return candidate
+            candidate += timedelta(minutes=1)
+        raise ValueError(f"cron expression {self.expression!r} never matches")
+
+
+class ScrapeJob:
+    """Status and progress of one scrape run."""
+
+    def __init__(self, trigger: str, engine: Optional[str], incremental: Optional[bool]):
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.engine = engine
+        self.incremental = incremental
+        self.status = "running"
+        self.pages_done = 0
+        self.listings_found = 0
+        self.csv_path = ""
+        self.error = ""
+        self.result: Dict = {}
+        self.started = datetime.now()
+        self.finished: Optional[datetime] = None
+        # The API worker process supervising the job
+        self.supervisor_pid = os.getpid()
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return round(((self.finished or datetime.now()) - self.started).total_seconds(), 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "trigger": self.trigger,
+            "engine": self.engine or os.environ.get("SCRAPER_ENGINE", "auto"),
+            "pages_done": self.pages_done,
+            "listings_found": self.listings_found,
+            "elapsed_seconds": self.elapsed_seconds,
+            "started_at": self.started.isoformat(timespec="seconds"),
+            "finished_at": self.finished.isoformat(timespec="seconds") if self.finished else "",
+            "csv_path": self.csv_path,
+            "error": self.error,
+            "supervisor_pid": self.supervisor_pid,
+            **self.result,
+        }
+
+    @classmethod
+    def from_dict(cls, record: Dict) -> "ScrapeJob":
+        """A job read back from the shared state file."""
+        job = cls(record["trigger"], record.get("engine"), record.get("incremental"))
+        job.id = record["job_id"]
+        job.status = record["status"]
+        job.pages_done = record.get("pages_done", 0)
+        job.listings_found = record.get("listings_found", 0)
+        job.csv_path = record.get("csv_path", "")
+        job.error = record.get("error", "")
+        job.started = datetime.fromisoformat(record["started_at"])
+        job.finished = datetime.fromisoformat(record["finished_at"]) if record.get("finished_at") else None
+        job.supervisor_pid = record.get("supervisor_pid")
+        job.result = {k: v for k, v in record.items() if k not in _RECORD_FIELDS}
+        return job
+
+
+# Keys to_dict() always writes; anything else in a record came from job.result
+_RECORD_FIELDS = frozenset(ScrapeJob(trigger="", engine=None, incremental=None).to_dict())
+
+
+class SharedJobState:
+    """Recent jobs of every API worker, in a JSON file rewritten atomically under a lock."""
+
+    def __init__(self, path: str = SCRAPE_JOBS_PATH):
+        self.path = path
+        self._lock_path = f"{path}.lock"
+
+    def records(self) -> List[Dict]:
+        """Job records, oldest first."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _write(self, records: List[Dict]):
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def save(self, job: ScrapeJob):
+        with FileLock(self._lock_path):
+            records = [r for r in self.records() if r.get("job_id") != job.id]
+            records.append(job.to_dict())
+            self._write(records[-MAX_TRACKED_JOBS:])
+
+    def fail_interrupted(self, error: str):
+        """Mark "running" records failed; called by the worker that just took the run lock."""
+        with FileLock(self._lock_path):
+            records = self.records()
+            stale = [r for r in records if r.get("status") == "running"]
+            for record in stale:
+                record.update(status="failed", error=error,
+                              finished_at=datetime.now().isoformat(timespec="seconds"))
+            if stale:
+                self._write(records)
+
+    def get(self, job_id: str) -> Optional[ScrapeJob]:
+        record = next((r for r in self.records() if r.get("job_id") == job_id), None)
+        return ScrapeJob.from_dict(record) if record else None
+
+    def running(self) -> Optional[ScrapeJob]:
+        record = next((r for r in reversed(self.records()) if r.get("status") == "running"), None)
+        return ScrapeJob.from_dict(record) if record else None
+
+
+class ScrapeJobManager:
+    """Starts single-flight scrape jobs and supervises their worker processes.
+
+    Jobs are single-flight across API workers too: a job holds the run lock
+    from start until it is published, and its status is shared through
+    SharedJobState.
+    """
+
+    def __init__(self, on_success: Optional[Callable[[str], Dict]] = None, timeout: float = 3600.0,
+                 state_path: str = SCRAPE_JOBS_PATH):
+        self.on_success = on_success
+        self.timeout = timeout
+        self.state = SharedJobState(state_path)
+        self._run_lock = FileLock(f"{state_path}.run.lock")
+        self._schedule_lock = FileLock(f"{state_path}.schedule.lock")
+        self._jobs: Dict[str, ScrapeJob] = {}
+        self._running: Optional[ScrapeJob] = None
+        # The long-lived worker process, its job queue and its event queue
+        self._process: Optional[multiprocessing.Process] = None
+        self._commands = None
+        self._events = None
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context("spawn")
+        self._scheduler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.schedule: Optional[CronSchedule] = None
+        self.next_run: Optional[datetime] = None
+
+    def start(self, trigger: str = "manual", engine: Optional[str] = None,
+              incremental: Optional[bool] = None) -> Tuple[ScrapeJob, bool]:
+        """Start a job unless one is running in any worker. Returns (job, started).
+
+        Blocks on file locks and process start-up; call it off the event loop.
+        """
+        while True:
+            with self._lock:
+                if self._running is not None:
+                    return self._running, False
+                if self._run_lock.acquire(blocking=False):
+                    try:
+                        # Jobs still "running" in the state file lost their worker
+                        self.state.fail_interrupted("API worker exited before the job finished")
+                        job = ScrapeJob(trigger, engine, incremental)
+                        process, events = self._ensure_worker()
+                        self._commands.put((engine, incremental))
+                    except Exception:
+                        self._run_lock.release()
+                        raise
+                    self._running = job
+                    self._jobs[job.id] = job
+                    while len(self._jobs) > MAX_TRACKED_JOBS:
+                        del self._jobs[next(iter(self._jobs))]
+                    self._save_state(job)
+                    break
+            # Another API worker holds the run lock
+            running = self._wait_for_shared_running()
+            if running is not None:
+                return running, False
+            # Its job finished in the meantime; try again
+        print(f"Started scrape job {job.id} ({trigger}) in process {process.pid}")
+        threading.Thread(target=self._supervise, args=(job, process, events),
+                         name=f"scrape-supervisor-{job.id}", daemon=True).start()
+        return job, True
+
+    def _ensure_worker(self):
+        """The worker process and its event queue, starting it if needed; call with self._lock held."""
+        if self._process is None or not self._process.is_alive():
+            self._commands, self._events = self._context.Queue(), self._context.Queue()
+            # Not a daemon, so the scraper can start its own parser processes;
+            # close() stops it on shutdown
+            self._process = self._context.Process(
+                target=_scrape_worker, args=(self._commands, self._events),
+                name="scrape-worker", daemon=False,
+            )
+            self._process.start()
+        return self._process, self._events
+
+    def _stop_worker(self, process, grace: float = 20.0):
+        """SIGTERM the worker (it cleans up and exits), killing it if it doesn't within `grace` seconds."""
+        if process.is_alive():
+            process.terminate()
+            process.join(grace)
+        if process.is_alive():
+            print(f"Scrape worker {process.pid} ignored SIGTERM - killing it")
+            process.kill()
+            process.join(5)
+
+    def _supervise(self, job: ScrapeJob, process, progress_queue):
+        outcome = None
+        deadline = job.started + timedelta(seconds=self.timeout)
+        while outcome is None:
+            try:
+                event = progress_queue.get(timeout=1)
+            except queue.Empty:
+                if not process.is_alive():
+                    outcome = ("error", f"Worker process exited with code {process.exitcode}")
+                elif datetime.now() > deadline:
+                    # The next job starts a fresh worker
+                    self._stop_worker(process)
+                    outcome = ("error", f"Timed out after {self.timeout:.0f}s")
+                continue
+            if event[0] == "progress":
+                job.pages_done, job.listings_found = event[1], event[2]
+                self._save_state(job)
+            elif event[0] == "metrics":
+                REGISTRY.merge(event[1])
+            else:
+                outcome = event
+
+        if outcome[0] == "done":
+            job.csv_path = outcome[1]
+            try:
+                # Publish the new dataset before the job reports success
+                job.result = (self.on_success(job.csv_path) if self.on_success else {}) or {}
+                job.status = "succeeded"
+            except Exception as e:
+                job.status, job.error = "failed", f"Publishing {job.csv_path} failed: {e}"
+        else:
+            job.status, job.error = "failed", outcome[1]
+        job.finished = datetime.now()
+        SCRAPE_JOBS.inc(status=job.status)
+        print(f"Scrape job {job.id} {job.status} after {job.elapsed_seconds}s"
+              f"{': ' + job.error if job.error else ''}")
+        self._save_state(job)
+        with self._lock:
+            self._running = None
+            self._run_lock.release()
+
+    def _save_state(self, job: ScrapeJob):
+        try:
+            self.state.save(job)
+        except OSError as e:
+            print(f"Could not save scrape job {job.id} to {self.state.path}: {e}")
+
+    def _wait_for_shared_running(self, timeout: float = 2.0) -> Optional[ScrapeJob]:
+        """The job another worker is running; it saves its record right after taking the run lock."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.state.running()
+            if job is not None or time.monotonic() > deadline:
+                return job
+            time.sleep(0.05)
+
+    def get(self, job_id: str) -> Optional[ScrapeJob]:
+        """A job by id: this worker's live copy, else the shared record."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self.state.get(job_id)
+
+    def jobs(self) -> List[ScrapeJob]:
+        """Recent jobs of every worker, newest first."""
+        with self._lock:
+            local = dict(self._jobs)
+        jobs = [local.pop(r["job_id"], None) or ScrapeJob.from_dict(r) for r in self.state.records()]
+        jobs.extend(local.values())
+        return sorted(jobs, key=lambda job: job.started, reverse=True)
+
+    @property
+    def running(self) -> Optional[ScrapeJob]:
+        """The running job, whichever worker supervises it."""
+        if self._running is not None:
+            return self._running
+        if not is_locked(self._run_lock.path):
+            return None
+        return self.state.running()
+
+    def start_scheduler(self, expression: str):
+        """Run scheduled jobs from a background thread, in the one worker holding the schedule lock."""
+        self.schedule = CronSchedule(expression)
+        self._scheduler = threading.Thread(target=self._run_schedule, name="scrape-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def _run_schedule(self):
+        # Another worker owns the schedule; take over if it exits
+        while not self._schedule_lock.acquire(blocking=False):
+            if self._stop.wait(60):
+                return
+        print(f"Scrape schedule '{self.schedule.expression}' active in process {os.getpid()}")
+        while not self._stop.is_set():
+            self.next_run = self.schedule.next_after(datetime.now())
+            if self._stop.wait((self.next_run - datetime.now()).total_seconds()):
+                return
+            job, started = self.start(trigger="schedule")
+            if not started:
+                print(f"Scheduled scrape skipped - job {job.id} is still running")
+
+    def close(self, grace: float = 5.0):
+        """Ask the worker to exit after its current job, stopping it if that takes over `grace` seconds."""
+        self._stop.set()
+        with self._lock:
+            process, commands = self._process, self._commands
+        if process is not None and process.is_alive():
+            commands.put(None)
+            process.join(grace)
+            self._stop_worker(process)
+        if self._schedule_lock.held:
+            self._schedule_lock.release()
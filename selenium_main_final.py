@@ -1,37 +1,58 @@
-from fastapi import FastAPI, Request, Form, HTTPException, Response
-from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi import FastAPI, Request, Form, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 import os
-import io
+import json
 import glob
 from datetime import datetime, date, timedelta
 import csv
-import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import requests
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
 import time
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-import tempfile
 from dotenv import load_dotenv
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+from listings_store import LISTINGS_SNAPSHOT_FILES, listings_store, normalize_sale_date, write_snapshot_file
+from listings_db import get_repository
+from vector_filter import NUMPY_AVAILABLE, vector_index
+from csv_streaming import stream_csv_file, stream_csv_rows
+from query_cache import filter_cache, filter_cache_key
+from email_delivery import get_email_queue, close_email_queue
+from executors import run_blocking, executor_stats, shutdown_executors
+from scrape_jobs import ScrapeJobManager, report_progress
+from dataset_versions import DatasetVersions, write_csv_atomic
+from parse_pipeline import ParsePipeline
+from listing_dedup import ListingDeduper
+from metrics import (
+    METRICS_DIR, REGISTRY, RequestLatencyMiddleware, SCRAPE_STEP_SECONDS, SCRAPE_PAGES, SCRAPE_PAGE_LISTINGS,
+    clear_shared_metrics,
+)
+from page_listings import parse_page_listings
+from http_scraper import CLEARRECON_URL, create_session, fetch_listing_pages
+from async_fetcher import HTTPX_AVAILABLE, scrape_pages_concurrently
+from driver_pool import get_driver_pool, close_driver_pool
+from incremental import IncrementalTracker, apply_changes
+from selenium_waits import (
+    ReadinessPolicy, StepTimer, wait_for_table, wait_for_settled_table, wait_for_page_change,
+    wait_for_clickable, wait_for_disclaimer_dismissed,
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = FastAPI(title="ClearRecon CA Scraper - Enhanced Selenium Version")
+app.add_middleware(RequestLatencyMiddleware, paths=("/filter",))
 
 # Ensure directories exist
 os.makedirs("static", exist_ok=True)
@@ -41,51 +62,212 @@ os.makedirs("debug", exist_ok=True)
 
 templates = Jinja2Templates(directory="templates")
 
-# Global variables for caching - Use the successful CSV with 654 results
+@app.on_event("shutdown")
+def shutdown_email_queue():
+    """Let queued emails go out and close the SMTP connections."""
+    close_email_queue()
+
+@app.on_event("shutdown")
+def shutdown_blocking_pools():
+    shutdown_executors()
+
+@app.on_event("startup")
+def start_scrape_schedule():
+    """Run scheduled scrapes when SCRAPE_SCHEDULE holds a cron expression."""
+    schedule = os.environ.get("SCRAPE_SCHEDULE", "").strip()
+    if schedule:
+        scrape_jobs.start_scheduler(schedule)
+
+@app.on_event("startup")
+def load_current_dataset():
+    """Memory backend: map the current dataset's column file before the first request."""
+    if LISTINGS_BACKEND != "sqlite":
+        listings_store.get(dataset_versions.current_csv_path())
+
+@app.on_event("shutdown")
+def stop_scrape_jobs():
+    scrape_jobs.close()
+
+@app.on_event("startup")
+def share_metrics():
+    """With several workers, write this worker's metrics to METRICS_DIR for /metrics on any worker."""
+    if METRICS_DIR:
+        REGISTRY.share(METRICS_DIR)
+
+@app.on_event("shutdown")
+def unshare_metrics():
+    REGISTRY.unshare()
+
+# Bundled dataset (the successful CSV with 654 results): seeds the version
+# manifest and the listings database on first run
 latest_csv_path = "csv_data/clearrecon_listings_enhanced_20250811_020245.csv"
-all_cities = []
+
+# Manifest of published dataset versions and the current-version pointer
+dataset_versions = DatasetVersions(seed_csv=latest_csv_path)
+
+# Where queries are served from: "sqlite" (indexed listings database, seeded
+# from latest_csv_path on first use) or "memory" (columnar snapshot of the
+# current dataset version's CSV)
+LISTINGS_BACKEND = os.environ.get("LISTINGS_BACKEND", "sqlite").lower()
+
+# Large /filter payloads are serialized with orjson when it is installed
+FastJSONResponse = ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+
+# Fields /filter returns by default: raw_data repeats details, and the
+# row/table/page indexes are only useful when debugging the scraper
+FILTER_DEFAULT_FIELDS = ["ts_number", "address", "city", "county", "date", "sale_date", "price", "details", "status"]
+FILTER_PAGE_SIZE = int(os.environ.get("FILTER_PAGE_SIZE", "100"))
+FILTER_MAX_LIMIT = int(os.environ.get("FILTER_MAX_LIMIT", "1000"))
+
+def get_listings_repository():
+    """The SQLite listings repository, seeded from the bundled CSV if empty."""
+    return get_repository(seed_csv=latest_csv_path)
+
+def current_db_dataset():
+    """The database dataset of the manifest's current version, or None."""
+    current = dataset_versions.current()
+    if current is None:
+        return None
+    return get_listings_repository().dataset_for_version(current)
+
+def dataset_summary() -> Optional[Dict]:
+    """csv_path, row_count and cities of the dataset being served, or None."""
+    if LISTINGS_BACKEND == "sqlite":
+        repository = get_listings_repository()
+        dataset = current_db_dataset()
+        if dataset is None:
+            return None
+        return {
+            "csv_path": dataset["csv_path"],
+            "row_count": dataset["row_count"],
+            "cities": repository.cities(dataset["id"]),
+        }
+    
+    snapshot = listings_store.get(dataset_versions.current_csv_path())
+    if snapshot is None:
+        return None
+    return {"csv_path": snapshot.csv_path, "row_count": len(snapshot), "cities": snapshot.cities}
+
+def query_listings(city: str, start_dt: date, end_dt: date, offset: int = 0,
+                   limit: Optional[int] = None, fields: Optional[List[str]] = None,
+                   min_price: Optional[float] = None, max_price: Optional[float] = None,
+                   county: str = ""):
+    """Page of a filter: (results, count, undated results, undated count, total listings).
+    
+    offset/limit page the dated and undated matches separately and rows are
+    projected to `fields` when given. min_price/max_price and county narrow
+    both lists. Pages are cached per dataset version. Returns None without data.
+    """
+    if LISTINGS_BACKEND == "sqlite":
+        repository = get_listings_repository()
+        dataset = current_db_dataset()
+        if dataset is None:
+            return None
+        version = ("sqlite", dataset["id"])
+    else:
+        snapshot = listings_store.get(dataset_versions.current_csv_path())
+        if snapshot is None:
+            return None
+        version = ("memory", snapshot.csv_path, snapshot.signature)
+    
+    key = filter_cache_key(city, start_dt, end_dt, version, offset, limit, fields, min_price, max_price, county)
+    cached = filter_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    if LISTINGS_BACKEND == "sqlite":
+        # Indexed SQL: sale_date range plus city IN (cities matching the query)
+        results, count, undated_results, undated_count = repository.filter(
+            dataset, city, start_dt.isoformat(), end_dt.isoformat(), offset, limit, fields,
+            min_price, max_price, county)
+        queried = (results, count, undated_results, undated_count, dataset["row_count"])
+    else:
+        # Filter the in-memory columns: boolean masks over the whole columns
+        # with NumPy, else the sorted date index and the city index
+        engine = vector_index(snapshot) if NUMPY_AVAILABLE else snapshot
+        row_ids, undated_ids = engine.filter(city, start_dt.toordinal(), end_dt.toordinal(),
+                                             min_price, max_price, county)
+        page = slice(offset, None if limit is None else offset + limit)
+        queried = (snapshot.rows(row_ids[page], fields), len(row_ids),
+                   snapshot.rows(undated_ids[page], fields), len(undated_ids), len(snapshot))
+    
+    filter_cache.put(key, queried)
+    return queried
+
+def list_cities(q: str = "", limit: int = 20) -> Optional[List[str]]:
+    """All cities, or up to `limit` starting with q; None without data."""
+    if LISTINGS_BACKEND == "sqlite":
+        repository = get_listings_repository()
+        dataset = current_db_dataset()
+        if dataset is None:
+            return None
+        return repository.cities(dataset["id"], q, limit) if q else repository.cities(dataset["id"])
+    
+    snapshot = listings_store.get(dataset_versions.current_csv_path())
+    if snapshot is None:
+        return None
+    return snapshot.city_index.complete(q, limit) if q else snapshot.cities
+
+def publish_scraped_dataset(csv_path: str) -> Dict:
+    """Switch this process to a finished scrape's dataset version.
+    
+    The job's worker already published the version (manifest pointer and
+    database). Here the API picks up the new pointer and, for the memory
+    backend, loads the snapshot right away instead of on the next request.
+    Returns the summary /scrape_all reports.
+    """
+    current = dataset_versions.refresh()
+    if not current or current["csv_path"] != csv_path:
+        raise RuntimeError(f"scrape finished but {csv_path} was not published as the current dataset")
+    if LISTINGS_BACKEND != "sqlite":
+        listings_store.get(csv_path)
+    filter_cache.clear()
+    
+    summary = dataset_summary() or {"row_count": 0, "cities": []}
+    return {
+        "message": f"Successfully scraped {summary['row_count']} listings",
+        "cities_found": len(summary["cities"]),
+        "cities": summary["cities"][:10],
+    }
+
+scrape_jobs = ScrapeJobManager(
+    on_success=publish_scraped_dataset,
+    timeout=float(os.environ.get("SCRAPE_JOB_TIMEOUT", "3600")),
+)
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     """Main page with filtering interface - uses existing CSV with 654 results."""
-    global all_cities, latest_csv_path
-    
-    # Initialize cities from the existing CSV on startup
-    if not all_cities and latest_csv_path and os.path.exists(latest_csv_path):
-        all_cities = extract_cities_from_csv(latest_csv_path)
+    summary = await run_blocking(dataset_summary)
     
     return templates.TemplateResponse("index_full.html", {
         "request": request,
         "default_start": date.today().strftime("%Y-%m-%d"),
         "default_end": (date.today() + timedelta(days=30)).strftime("%Y-%m-%d"),
-        "cities_available": len(all_cities),
-        "total_listings": get_csv_row_count()
+        "cities_available": len(summary["cities"]) if summary else 0,
+        "total_listings": summary["row_count"] if summary else 0
     })
 
 @app.get("/data_info")
 async def get_data_info():
     """Get information about the existing CSV data with 654 results."""
-    global latest_csv_path, all_cities
+    summary = await run_blocking(dataset_summary)
     
-    if not latest_csv_path or not os.path.exists(latest_csv_path):
+    if summary is None:
         return JSONResponse({
             "success": False,
             "error": "CSV data file not found"
         })
     
-    # Initialize cities if not already loaded
-    if not all_cities:
-        all_cities = extract_cities_from_csv(latest_csv_path)
-    
-    # Get row count
-    row_count = get_csv_row_count()
+    cities = summary["cities"]
+    row_count = summary["row_count"]
     
     return JSONResponse({
         "success": True,
         "message": f"Using existing CSV with {row_count} listings",
-        "csv_path": latest_csv_path,
-        "cities_found": len(all_cities),
-        "cities": sorted(all_cities),  # Return all cities sorted
+        "csv_path": summary["csv_path"],
+        "cities_found": len(cities),
+        "cities": cities,  # Return all cities sorted
         "total_listings": row_count,
         "data_source": "Pre-scraped data from 2025-08-11"
     })
@@ -95,85 +277,78 @@ async def filter_listings(
     city: str = Form("all"),
     start_date: str = Form(...),
     end_date: str = Form(...),
-    email: str = Form("")
+    email: str = Form(""),
+    limit: int = Form(FILTER_PAGE_SIZE),
+    offset: int = Form(0),
+    fields: str = Form(""),
+    min_price: str = Form(""),
+    max_price: str = Form(""),
+    county: str = Form("")
 ):
-    """Filter listings from the existing CSV with 654 results by city and date range."""
+    """Filter listings from the existing CSV with 654 results by city and date range.
+    
+    Results are paged with limit/offset (count is the total number of
+    matches) and projected to a comma-separated `fields` list, FILTER_DEFAULT_FIELDS
+    by default or every column with fields=all. Optional min_price/max_price
+    bounds and a county (substring, like city) narrow the matches.
+    """
     try:
-        global latest_csv_path
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+        limit = max(1, min(limit, FILTER_MAX_LIMIT))
+        offset = max(0, offset)
+        if fields.strip().lower() == "all":
+            projection = None
+        else:
+            projection = [f.strip() for f in fields.split(",") if f.strip()] or FILTER_DEFAULT_FIELDS
+        predicates = {
+            "min_price": float(min_price.replace("$", "").replace(",", "")) if min_price.strip() else None,
+            "max_price": float(max_price.replace("$", "").replace(",", "")) if max_price.strip() else None,
+            "county": county.strip(),
+        }
         
-        if not latest_csv_path or not os.path.exists(latest_csv_path):
+        queried = await run_blocking(query_listings, city, start_dt, end_dt, offset, limit, projection, **predicates)
+        if queried is None:
             return JSONResponse({
                 "success": False,
                 "error": "CSV data file not found. The application uses pre-scraped data with 654 listings."
             })
+        results, count, undated_results, undated_count, total_count = queried
         
-        # Load and filter CSV data using basic CSV handling
-        results = []
-        total_count = 0
-        
-        with open(latest_csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-            
-            for row in reader:
-                total_count += 1
-                
-                # Filter by city (case insensitive, exact match or substring)
-                if city and city != "all":
-                    row_city = row.get('city', '').strip()
-                    if not row_city:
-                        continue
-                    
-                    # Normalize both cities for comparison
-                    normalized_filter_city = city.lower().title()
-                    normalized_row_city = row_city.lower().title()
-                    
-                    # Try exact match first, then substring match
-                    if (normalized_filter_city != normalized_row_city and 
-                        normalized_filter_city.lower() not in normalized_row_city.lower()):
-                        continue
-                
-                # Filter by date range if date exists
-                if row.get('date'):
-                    try:
-                        # Try to parse various date formats
-                        date_str = row['date']
-                        row_date = None
-                        
-                        # Try different date formats
-                        for fmt in ['%m/%d/%Y', '%Y-%m-%d', '%m-%d-%Y', '%d/%m/%Y']:
-                            try:
-                                row_date = datetime.strptime(date_str, fmt).date()
-                                break
-                            except ValueError:
-                                continue
-                        
-                        if row_date and (row_date < start_dt or row_date > end_dt):
-                            continue
-                    except:
-                        pass  # Include if date parsing fails
-                
-                results.append(row)
-        
-        # Send email if email address is provided
-        email_sent = False
-        if email and email.strip() and results:
+        # Send email if email address is provided (once, with every match, on the first page)
+        recipient = email.strip() if email else ""
+        email_delivery_id = None
+        email_message = ""
+        if recipient and offset > 0:
+            email_message = "Results are only emailed with the first page"
+        elif recipient and not count:
+            email_message = "No matching listings to email"
+        elif recipient:
             filter_info = {
                 "city": city if city != "all" else "All Cities",
                 "start_date": start_date,
                 "end_date": end_date
             }
-            email_sent = send_filtered_results_email(email.strip(), results, filter_info)
+            all_results = (await run_blocking(query_listings, city, start_dt, end_dt, **predicates))[0]
+            # Queuing records the delivery in the shared SQLite log: keep it off the event loop
+            email_delivery_id = await run_blocking(send_filtered_results_email, recipient, all_results, filter_info)
+            email_message = ("Filtered results are being sent to your email!" if email_delivery_id
+                             else "Email not sent - check configuration")
         
-        return JSONResponse({
+        more = offset + limit < max(count, undated_count)
+        return FastJSONResponse({
             "success": True,
             "results": results,
-            "count": len(results),
+            "count": count,
             "total_available": total_count,
-            "email_sent": email_sent,
-            "email_message": "Filtered results sent to your email!" if email_sent else ("Email not sent - check configuration" if email and email.strip() else "")
+            "undated_results": undated_results,
+            "undated_count": undated_count,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if more else None,
+            "email_sent": email_delivery_id is not None,
+            "email_delivery_id": email_delivery_id,
+            "email_message": email_message
         })
         
     except Exception as e:
@@ -183,62 +358,151 @@ async def filter_listings(
         })
 
 @app.get("/csv")
-async def view_csv():
+async def view_csv(request: Request):
     """View the latest CSV file as plain text."""
     try:
-        latest_csv = get_latest_csv_path()
-        if not latest_csv:
-            return {"status": "error", "message": "No CSV file found. Please run a scrape first."}
-        
-        with open(latest_csv, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        return Response(content=content, media_type="text/plain")
+        return await run_blocking(stream_current_csv, request, "text/plain")
     except Exception as e:
         return {"status": "error", "message": f"Error reading CSV: {str(e)}"}
 
 @app.get("/csvdata")
-async def download_csv():
+async def download_csv(request: Request):
     """Download the latest CSV file."""
     try:
-        latest_csv = get_latest_csv_path()
-        if not latest_csv:
-            return {"status": "error", "message": "No CSV file found. Please run a scrape first."}
-        
-        # Read the file content
-        with open(latest_csv, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Create a file-like object in memory
-        file_like = io.StringIO(content)
-        
-        # Return as a downloadable file
-        return StreamingResponse(
-            iter([file_like.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=foreclosure_listings_{datetime.now().strftime('%Y%m%d')}.csv"}
-        )
+        return await run_blocking(stream_current_csv, request, "text/csv", {
+            "Content-Disposition": f"attachment; filename=foreclosure_listings_{datetime.now().strftime('%Y%m%d')}.csv"
+        })
     except Exception as e:
         return {"status": "error", "message": f"Error preparing CSV for download: {str(e)}"}
 
+def stream_current_csv(request: Request, media_type: str, headers: Optional[Dict[str, str]] = None):
+    """Stream the served dataset's CSV in chunks, falling back to an export from the database."""
+    dataset = current_db_dataset() if LISTINGS_BACKEND == "sqlite" else None
+    if dataset is not None:
+        if os.path.exists(dataset["csv_path"]):
+            return stream_csv_file(request, dataset["csv_path"], media_type, headers)
+        return stream_csv_rows(
+            request, json.loads(dataset["fieldnames"]), get_listings_repository().listings(dataset),
+            str(dataset["id"]), dataset["created_at"], media_type, headers,
+        )
+    
+    latest_csv = get_latest_csv_path()
+    if not latest_csv:
+        return {"status": "error", "message": "No CSV file found. Please run a scrape first."}
+    return stream_csv_file(request, latest_csv, media_type, headers)
+
 @app.get("/cities")
-async def get_cities():
-    """Get all available cities from the existing CSV with 654 results."""
-    global latest_csv_path, all_cities
+async def get_cities(q: str = "", limit: int = 20):
+    """Get all available cities, or autocomplete suggestions when q is given."""
+    # Served from an index (SQLite or the in-memory city index) - no per-request scan
+    cities = await run_blocking(list_cities, q, limit)
     
-    if not latest_csv_path or not os.path.exists(latest_csv_path):
+    if cities is None:
         return JSONResponse({"cities": [], "error": "CSV data not found"})
-    
-    # Initialize cities if not already loaded
-    if not all_cities:
-        all_cities = extract_cities_from_csv(latest_csv_path)
-    
     return JSONResponse({
-        "cities": sorted(all_cities),
-        "count": len(all_cities),
+        "cities": cities,
+        "count": len(cities),
         "data_source": "Pre-scraped data with 654 listings"
     })
 
+@app.post("/scrape_all")
+async def scrape_all():
+    """Start a background scrape job (or report the one already running)."""
+    job, started = await run_blocking(scrape_jobs.start)
+    return JSONResponse({
+        "success": True,
+        "started": started,
+        "message": "Scrape job started" if started else "A scrape job is already running",
+        **job.to_dict(),
+    }, status_code=202)
+
+@app.get("/scrape_jobs")
+async def list_scrape_jobs():
+    """Recent scrape jobs, newest first, plus the schedule."""
+    return JSONResponse({
+        "running": scrape_jobs.running.id if scrape_jobs.running else None,
+        "schedule": scrape_jobs.schedule.expression if scrape_jobs.schedule else None,
+        "next_run": scrape_jobs.next_run.isoformat(timespec="seconds") if scrape_jobs.next_run else None,
+        "jobs": [job.to_dict() for job in scrape_jobs.jobs()],
+    })
+
+@app.get("/scrape_jobs/{job_id}")
+async def get_scrape_job(job_id: str):
+    """Status and progress (pages done, listings found, elapsed time) of a scrape job."""
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"success": False, "error": "Unknown job id"}, status_code=404)
+    return JSONResponse({"success": True, **job.to_dict()})
+
+@app.get("/datasets")
+async def list_datasets():
+    """Published dataset versions and the current-version pointer."""
+    versions = await run_blocking(dataset_versions.versions)
+    current = dataset_versions.current()
+    return JSONResponse({
+        "current": current["version"] if current else None,
+        "retention": dataset_versions.retention,
+        "versions": versions,
+    })
+
+@app.get("/email_status/{delivery_id}")
+async def email_status(delivery_id: str):
+    """Status of a queued filtered-results email, whichever worker queued it."""
+    delivery = await run_blocking(get_email_queue().get, delivery_id)
+    if delivery is None:
+        return JSONResponse({"success": False, "error": "Unknown delivery id"}, status_code=404)
+    return JSONResponse({"success": True, **delivery})
+
+@app.get("/email_status")
+async def email_queue_status():
+    """This worker's queue depth and SMTP connections, and every worker's deliveries by status."""
+    return JSONResponse(await run_blocking(get_email_queue().stats))
+
+@app.get("/executor_stats")
+async def get_executor_stats():
+    """Queue depth, active threads and wait times of the blocking-work pools."""
+    return JSONResponse(executor_stats())
+
+@app.get("/cache_stats")
+async def cache_stats():
+    """Hit/miss counters for the /filter result cache."""
+    return JSONResponse({"filter_cache": filter_cache.stats()})
+
+@app.get("/metrics")
+async def metrics():
+    """Scrape spans, page and job counters, /filter latency and pool/cache/email stats for Prometheus.
+    
+    With METRICS_DIR set, counters and histograms are totals over all workers
+    and per-worker stats carry a pid label.
+    """
+    return PlainTextResponse(await run_blocking(REGISTRY.render), media_type="text/plain; version=0.0.4")
+
+def collect_worker_stats():
+    """Gauges and counters for the stats this worker keeps, rendered on /metrics with its pid."""
+    cache = filter_cache.stats()
+    yield ("clearrecon_filter_cache_entries", "gauge", "Entries in the /filter result cache", [({}, cache["entries"])])
+    yield ("clearrecon_filter_cache_lookups_total", "counter", "/filter result cache lookups",
+           [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])])
+    pools = executor_stats()
+    yield ("clearrecon_executor_queue_depth", "gauge", "Blocking calls waiting for a pool thread",
+           [({"pool": name}, stats["queue_depth"]) for name, stats in pools.items()])
+    yield ("clearrecon_executor_active", "gauge", "Pool threads running a blocking call",
+           [({"pool": name}, stats["active"]) for name, stats in pools.items()])
+    yield ("clearrecon_executor_completed_total", "counter", "Blocking calls finished",
+           [({"pool": name}, stats["completed"]) for name, stats in pools.items()])
+    emails = get_email_queue().stats()
+    yield ("clearrecon_email_queue_depth", "gauge", "Results emails waiting to be sent", [({}, emails["queue_depth"])])
+
+def collect_api_stats():
+    """Gauges for state shared by all workers, rendered on /metrics."""
+    yield ("clearrecon_email_deliveries", "gauge", "Tracked results emails by status",
+           [({"status": status}, count) for status, count in get_email_queue().log.counts().items()])
+    yield ("clearrecon_scrape_job_running", "gauge", "1 while a scrape job is running",
+           [({}, 1 if scrape_jobs.running else 0)])
+
+REGISTRY.add_collector(collect_worker_stats, per_worker=True)
+REGISTRY.add_collector(collect_api_stats)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -246,7 +510,7 @@ async def health_check():
         "status": "healthy",
         "scraper_type": "enhanced_selenium",
         "csv_files": len(glob.glob("csv_data/*.csv")),
-        "latest_csv": get_latest_csv_path() is not None
+        "latest_csv": await run_blocking(get_latest_csv_path) is not None
     })
 
 @app.get("/diagnostics")
@@ -257,7 +521,8 @@ async def run_diagnostics():
         from azure_diagnostics import AzureDiagnostics
         
         diagnostics = AzureDiagnostics()
-        results = diagnostics.run_all_tests()
+        # Launches Chrome and probes the network: run it on the dedicated slow pool
+        results = await run_blocking(diagnostics.run_all_tests, pool="slow")
         
         # Calculate summary
         total_tests = len(results)
@@ -283,119 +548,29 @@ async def run_diagnostics():
             "recommendation": "Check server logs for detailed error information"
         })
 
-def scrape_clearrecon_selenium_enhanced() -> str:
+def scrape_clearrecon_selenium_enhanced(incremental: bool = False) -> str:
     """Enhanced Selenium scraper with comprehensive pagination handling for all 666+ listings."""
     
-    # Configure Chrome options for Azure deployment
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Run in headless mode
-    chrome_options.add_argument("--no-sandbox")  # Required for Azure
-    chrome_options.add_argument("--disable-dev-shm-usage")  # Required for Azure
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
+    tracker = IncrementalTracker()
+    driver_pool = get_driver_pool()
+    lease = None
     driver = None
+    pipeline = None
+    page_count = 0
+    scrape_failed = True
+    policy = ReadinessPolicy()
+    timer = StepTimer()
     
     try:
-        print("Step 1: Initializing Chrome WebDriver...")
-        
-        # Try webdriver-manager first, but with improved path resolution
-        try:
-            print("Attempting webdriver-manager approach...")
-            
-            # Solution 2: Clear webdriver-manager cache if THIRD_PARTY_NOTICES issue persists
-            import shutil
-            wdm_cache_dir = os.path.expanduser("~/.wdm")
-            if os.path.exists(wdm_cache_dir):
-                print(f"Clearing webdriver-manager cache at: {wdm_cache_dir}")
-                try:
-                    shutil.rmtree(wdm_cache_dir)
-                    print("✅ Cache cleared successfully")
-                except Exception as cache_error:
-                    print(f"⚠️ Could not clear cache: {cache_error}")
-            
-            chromedriver_path = ChromeDriverManager().install()
-            print(f"ChromeDriver downloaded to: {chromedriver_path}")
-            
-            # Fix the common webdriver-manager bug where it returns the wrong file
-            if chromedriver_path.endswith('THIRD_PARTY_NOTICES.chromedriver'):
-                print("Got THIRD_PARTY_NOTICES file - finding actual ChromeDriver binary...")
-                # Get the directory and look for the actual chromedriver binary
-                driver_dir = os.path.dirname(chromedriver_path)
-                possible_names = ['chromedriver', 'chromedriver.exe', 'chromedriver-linux64']
-                
-                actual_driver_path = None
-                for name in possible_names:
-                    test_path = os.path.join(driver_dir, name)
-                    if os.path.exists(test_path) and os.access(test_path, os.X_OK):
-                        actual_driver_path = test_path
-                        break
-                
-                if actual_driver_path:
-                    chromedriver_path = actual_driver_path
-                    print(f"Found actual ChromeDriver at: {chromedriver_path}")
-                else:
-                    print("Could not find actual ChromeDriver binary - switching to system ChromeDriver...")
-                    raise Exception("webdriver-manager returned non-executable file and no binary found")
-            
-            # Ensure the file is executable
-            import stat
-            if os.path.exists(chromedriver_path):
-                os.chmod(chromedriver_path, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
-                service = Service(chromedriver_path)
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                print("✅ webdriver-manager ChromeDriver successful")
-            else:
-                raise Exception(f"ChromeDriver path does not exist: {chromedriver_path}")
-            
-        except Exception as wdm_error:
-            print(f"webdriver-manager failed: {wdm_error}")
-            print("Falling back to system ChromeDriver (no service path)...")
-            
-            # Fallback: Let Selenium find ChromeDriver automatically
-            # This works if ChromeDriver is in PATH or if Chrome can find it
-            try:
-                driver = webdriver.Chrome(options=chrome_options)
-                print("✅ System ChromeDriver successful")
-            except Exception as system_error:
-                print(f"System ChromeDriver also failed: {system_error}")
-                
-                # Solution 3: Manual ChromeDriver paths - try common system locations
-                print("Trying manual ChromeDriver paths...")
-                common_paths = [
-                    '/usr/bin/chromedriver',
-                    '/usr/local/bin/chromedriver',
-                    '/opt/google/chrome/chromedriver',
-                    '/snap/bin/chromium.chromedriver',
-                    '/usr/lib/chromium-browser/chromedriver',
-                    # Azure-specific paths
-                    '/home/site/wwwroot/chromedriver',
-                    '/tmp/chromedriver'
-                ]
-                
-                driver_found = False
-                for path in common_paths:
-                    if os.path.exists(path):
-                        print(f"Trying common path: {path}")
-                        try:
-                            os.chmod(path, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
-                            service = Service(path)
-                            driver = webdriver.Chrome(service=service, options=chrome_options)
-                            print(f"✅ ChromeDriver successful at: {path}")
-                            driver_found = True
-                            break
-                        except Exception as path_error:
-                            print(f"Failed with {path}: {path_error}")
-                            continue
-                
-                if not driver_found:
-                    raise Exception(f"All ChromeDriver initialization methods failed. webdriver-manager: {wdm_error}, system: {system_error}")
-        
-        driver.set_page_load_timeout(30)
+        print("Step 1: Leasing a warm Chrome WebDriver from the pool...")
+        init_start = time.perf_counter()
+        lease = driver_pool.acquire()
+        driver = lease.driver
+        timer.record("driver_init", time.perf_counter() - init_start)
         
         print("Step 2: Navigating to ClearRecon...")
-        driver.get("https://clearrecon-ca.com/california-listings/")
+        with timer.step("navigation", CLEARRECON_URL):
+            driver.get(CLEARRECON_URL)
         
         print("Step 3: Checking for disclaimer...")
         # Enhanced disclaimer handling
@@ -409,69 +584,92 @@ def scrape_clearrecon_selenium_enhanced() -> str:
         ]
         
         disclaimer_accepted = False
-        for selector in disclaimer_selectors:
+        with timer.step("disclaimer"):
             try:
-                element = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, selector))
+                # One wait for any disclaimer control instead of 5 s per selector
+                policy.wait(driver, 5).until(
+                    EC.presence_of_element_located((By.XPATH, " | ".join(disclaimer_selectors)))
                 )
+            except TimeoutException:
+                pass
+            
+            for selector in disclaimer_selectors:
+                elements = driver.find_elements(By.XPATH, selector)
+                if not elements:
+                    continue
+                element = elements[0]
                 print(f"Found disclaimer element: {selector}")
                 
-                # Scroll element into view
-                driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                time.sleep(1)
-                
-                # Try multiple click strategies
                 try:
-                    element.click()
-                except:
+                    # Scroll element into view and wait until it can be clicked
+                    driver.execute_script("arguments[0].scrollIntoView(true);", element)
+                    wait_for_clickable(driver, element, policy)
+                    
+                    # Try multiple click strategies
                     try:
-                        driver.execute_script("arguments[0].click();", element)
+                        element.click()
                     except:
-                        from selenium.webdriver.common.action_chains import ActionChains
-                        ActionChains(driver).move_to_element(element).click().perform()
-                
-                print("Disclaimer accepted!")
-                disclaimer_accepted = True
-                
-                # Wait for page to reload after accepting disclaimer
-                time.sleep(5)
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                break
-                
-            except (TimeoutException, NoSuchElementException) as e:
-                print(f"Could not handle disclaimer with selector {selector}: {e}")
-                continue
+                        try:
+                            driver.execute_script("arguments[0].click();", element)
+                        except:
+                            from selenium.webdriver.common.action_chains import ActionChains
+                            ActionChains(driver).move_to_element(element).click().perform()
+                    
+                    print("Disclaimer accepted!")
+                    disclaimer_accepted = True
+                    
+                    # Wait for the listings to replace the disclaimer
+                    wait_for_disclaimer_dismissed(driver, element, policy)
+                    break
+                    
+                except (TimeoutException, NoSuchElementException) as e:
+                    print(f"Could not handle disclaimer with selector {selector}: {e}")
+                    continue
         
         if not disclaimer_accepted:
             print("No disclaimer found or already accepted")
         
         print("Step 4: Enhanced pagination handling to get ALL listings...")
-        all_listings = []
+        save_page_html = os.environ.get("SAVE_PAGE_HTML", "").lower() in ("1", "true", "yes")
+        # Pages are parsed on a process pool while the browser moves on
+        pipeline = ParsePipeline(parse_page_listings)
+        unique_listings = ListingDeduper()
         page_count = 1
         max_pages = 50  # Safety limit to get all ~666 listings
         
         while page_count <= max_pages:
             print(f"Processing page {page_count}...")
             
-            # Wait for page to load completely
-            time.sleep(3)
+            # Wait for the listings table to have data rows
+            with timer.step("page_ready", f"page {page_count}"):
+                try:
+                    wait_for_table(driver, policy)
+                except TimeoutException:
+                    print(f"No listings table appeared on page {page_count} within {policy.timeout:.0f}s")
             
-            # Scroll to load all content
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
+            # Scroll to load all content, then wait for the row count to settle
+            with timer.step("scroll_settle", f"page {page_count}"):
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                signature = wait_for_settled_table(driver, policy)
             
-            # Extract listings from current page
-            page_source = driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            page_listings = extract_all_listings_selenium(soup, driver, page_count)
+            # Hand the current page to the parsers
+            with timer.step("page_source", f"page {page_count}"):
+                page_source = driver.page_source
+                if save_page_html:
+                    # Keep raw pages as fixtures for `python benchmark.py html`
+                    with open(f"debug/clearrecon_page_{page_count:03d}.html", 'w', encoding='utf-8') as f:
+                        f.write(page_source)
+                pipeline.submit(page_source, page_count)
             
-            print(f"Page {page_count}: Found {len(page_listings)} listings")
-            all_listings.extend(page_listings)
+            # Incremental mode needs this page parsed to decide whether to go on
+            if not record_parsed_pages(pipeline, unique_listings, tracker, wait_all=incremental) and incremental:
+                print(f"Stopping early at page {page_count} - remaining pages unchanged")
+                tracker.stop()
+                break
             
             # Look for next page
             next_found = False
+            page_stalled = False
             next_selectors = [
                 "//a[contains(text(), 'Next')]",
                 "//button[contains(text(), 'Next')]",
@@ -490,9 +688,10 @@ def scrape_clearrecon_selenium_enhanced() -> str:
                         if next_element.is_displayed() and next_element.is_enabled():
                             print(f"Found next page button: {next_selector}")
                             
-                            # Scroll element into view
-                            driver.execute_script("arguments[0].scrollIntoView(true);", next_element)
-                            time.sleep(1)
+                            # Scroll element into view and wait until it can be clicked
+                            with timer.step("next_ready", f"page {page_count}"):
+                                driver.execute_script("arguments[0].scrollIntoView(true);", next_element)
+                                wait_for_clickable(driver, next_element, policy)
                             
                             # Try multiple click strategies
                             try:
@@ -504,8 +703,16 @@ def scrape_clearrecon_selenium_enhanced() -> str:
                                     from selenium.webdriver.common.action_chains import ActionChains
                                     ActionChains(driver).move_to_element(next_element).click().perform()
                             
+                            # Wait for the table's row count or first TS number to change
+                            with timer.step("page_change", f"page {page_count + 1}"):
+                                try:
+                                    wait_for_page_change(driver, signature, policy)
+                                except TimeoutException:
+                                    print(f"Table did not change within {policy.timeout:.0f}s after clicking Next")
+                                    page_stalled = True
+                                    break
+                            
                             print(f"Successfully navigated to page {page_count + 1}")
-                            time.sleep(5)  # Wait for page to load
                             page_count += 1
                             next_found = True
                             break
@@ -513,390 +720,273 @@ def scrape_clearrecon_selenium_enhanced() -> str:
                 except (NoSuchElementException, TimeoutException):
                     continue
                 
-                if next_found:
+                if next_found or page_stalled:
                     break
             
             if not next_found:
                 print(f"No more pages found after page {page_count}")
                 break
         
-        print(f"Total listings extracted from {page_count} pages: {len(all_listings)}")
-        
-        # Deduplicate listings by TS Number (case-insensitive)
-        unique_listings = {}
-        for listing in all_listings:
-            ts_num = listing.get("ts_number", "").strip()
-            if ts_num:  # Only keep listings with a TS Number
-                # Use lowercase for case-insensitive comparison
-                unique_listings[ts_num.lower()] = listing
-        
-        print(f"Found {len(all_listings)} total listings, {len(unique_listings)} unique by TS Number")
-        
-        # Save to CSV
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        csv_path = f"csv_data/clearrecon_listings_enhanced_{timestamp}.csv"
-        
-        save_to_csv(list(unique_listings.values()), csv_path)
-        print(f"Saved {len(unique_listings)} unique listings to {csv_path}")
-        
-        return csv_path
+        with timer.step("parse_drain"):
+            record_parsed_pages(pipeline, unique_listings, tracker, wait_all=True)
+        print(timer.summary(page_count))
+        scrape_failed = False
+        return save_scraped_listings(unique_listings, page_count, tracker, incremental)
         
     except Exception as e:
         print(f"Enhanced Selenium scraping error: {e}")
         return None
         
     finally:
-        if driver:
-            driver.quit()
+        if pipeline:
+            pipeline.close()
+        if lease:
+            # Keep the browser warm for the next scrape; discard it after an error
+            driver_pool.release(lease, pages=page_count, discard=scrape_failed)
 
-def extract_all_listings_selenium(soup: BeautifulSoup, driver, page_num: int) -> List[Dict]:
-    """Extract all listings from the Selenium-loaded page."""
-    listings = []
+def scrape_clearrecon_http(incremental: bool = False) -> str:
+    """HTTP-only scraper: disclaimer and pagination over a pooled requests.Session."""
+    session = create_session()
+    tracker = IncrementalTracker()
+    unique_listings = ListingDeduper()
+    page_count = 0
     
-    try:
-        # Strategy 1: Table-based extraction
-        tables = soup.find_all('table')
-        print(f"Found {len(tables)} tables on page {page_num}")
-        
-        for table_index, table in enumerate(tables):
-            rows = table.find_all('tr')
-            if len(rows) > 1:  # Has header and data rows
-                headers = [th.get_text(strip=True) for th in rows[0].find_all(['th', 'td'])]
-                print(f"Table {table_index + 1}: {len(rows)} rows, Headers: {headers}")
+    with ParsePipeline(parse_page_listings) as pipeline:
+        try:
+            print(f"Step 1: Fetching {CLEARRECON_URL} over HTTP...")
+            pages = SCRAPE_STEP_SECONDS.time_iter(fetch_listing_pages(session, CLEARRECON_URL), step="fetch")
+            for page_count, page_url, page_source in pages:
+                print(f"Processing page {page_count} ({page_url})...")
+                pipeline.submit(page_source, page_count)
                 
-                for row_index, row in enumerate(rows[1:], 1):  # Skip header
-                    cells = row.find_all(['td', 'th'])
-                    cell_data = [cell.get_text(strip=True) for cell in cells]
-                    
-                    if any(cell_data):  # Skip empty rows
-                        listing = parse_listing_data_enhanced(cell_data, headers)
-                        listing["row_index"] = row_index
-                        listing["table_index"] = table_index + 1
-                        listing["page_number"] = page_num
-                        listings.append(listing)
-        
-        # Strategy 2: Div-based extraction if no tables
-        if not listings:
-            print(f"No table data found on page {page_num}, trying div extraction...")
-            divs = soup.find_all('div', class_=re.compile(r'listing|property|auction|item'))
-            
-            for div_index, div in enumerate(divs):
-                text = div.get_text(strip=True)
-                if len(text) > 50:  # Meaningful content
-                    listing = parse_listing_data_enhanced([text], [])
-                    listing["row_index"] = div_index + 1
-                    listing["table_index"] = 0
-                    listing["page_number"] = page_num
-                    listing["source"] = "div extraction"
-                    listings.append(listing)
-        
-        print(f"Page {page_num}: Extracted {len(listings)} listings")
-        return listings
-        
-    except Exception as e:
-        print(f"Extraction error on page {page_num}: {e}")
-        return []
-
-def parse_listing_data_enhanced(cell_data: List[str], headers: List[str]) -> Dict:
-    """Enhanced parsing with comprehensive city extraction and CSV structure."""
-    listing = {
-        "ts_number": "",  # Add TS Number field
-        "address": "",
-        "city": "",
-        "county": "",
-        "date": "",
-        "price": "",
-        "details": "",
-        "status": "",
-        "raw_data": "",
-        "row_index": "",
-        "table_index": "",
-        "page_number": ""
-    }
+                # Incremental mode: stop once we reach pages unchanged since the last run
+                if not record_parsed_pages(pipeline, unique_listings, tracker, wait_all=incremental) and incremental:
+                    print(f"Stopping early at page {page_count} - remaining pages unchanged")
+                    tracker.stop()
+                    break
+        finally:
+            session.close()
+        record_parsed_pages(pipeline, unique_listings, tracker, wait_all=True)
     
-    # Combine all cell data for analysis
-    combined_text = " ".join(cell_data).strip()
-    listing["raw_data"] = combined_text
+    return save_scraped_listings(unique_listings, page_count, tracker, incremental)
+
+def record_parsed_pages(pipeline: ParsePipeline, unique_listings: ListingDeduper,
+                        tracker: IncrementalTracker, wait_all: bool = False) -> bool:
+    """Consume parsed pages in order into the deduplicated result.
     
-    # Enhanced city extraction with comprehensive CA city patterns
-    city_patterns = [
-        # Major CA cities (comprehensive list)
-        r'\b(Los Angeles|San Francisco|San Diego|Sacramento|Oakland|Fresno|Long Beach|Bakersfield|Anaheim|Riverside|Santa Ana|Stockton|Irvine|Chula Vista|Fremont|San Bernardino|Modesto|Fontana|Oxnard|Moreno Valley|Huntington Beach|Glendale|Santa Clarita|Garden Grove|Oceanside|Rancho Cucamonga|Santa Rosa|Ontario|Lancaster|Elk Grove|Corona|Palmdale|Salinas|Pomona|Hayward|Escondido|Torrance|Sunnyvale|Orange|Fullerton|Pasadena|Thousand Oaks|Visalia|Simi Valley|Concord|Roseville|Rocklin|Victorville|Santa Clara|Vallejo|Berkeley|El Monte|Downey|Costa Mesa|Inglewood|Carlsbad|San Buenaventura|Fairfield|West Covina|Murrieta|Richmond|Norwalk|Antioch|Temecula|Burbank|Daly City|Rialto|Santa Maria|El Cajon|San Mateo|Clovis|Compton|Jurupa Valley|Vista|South Gate|Mission Viejo|Vacaville|Carson|Hesperia|Santa Monica|Westminster|Redding|Santa Barbara|Chico|Newport Beach|San Leandro|San Marcos|Whittier|Hawthorne|Citrus Heights|Tracy|Alhambra|Livermore|Buena Park|Lakewood|Merced|Hemet|Chino|Menifee|Lake Forest|Napa|Redwood City|Bellflower|Indio|Tustin|Baldwin Park|Chino Hills|Mountain View|Alameda|Upland|Folsom|San Ramon|Pleasanton|Union City|Perris|Manteca|Lynwood|Apple Valley|Redlands|Turlock|Milpitas|Redondo Beach|Rancho Cordova|Yorba Linda|Palo Alto|Davis|Camarillo|Walnut Creek|Pittsburg|South San Francisco|Yuba City|San Clemente|Laguna Niguel|Pico Rivera|Montebello|Lodi|Madera|Santa Cruz|La Habra|Encinitas|Monterey Park|Tulare|Cupertino|Gardena|National City|Petaluma|Huntington Park|San Rafael|Porterville|Hanford|Waterford|Delano|Diamond Bar|Glendora|Cerritos|Azusa|Rancho Palos Verdes|Fountain Valley|Placentia|Monrovia|Santee|Eastvale|Rosemead|San Gabriel|Gilroy|Stanton|Paramount|Brea|Covina|San Bruno|Arcadia|Culver City|Benicia|Colton|Beaumont|Morgan Hill|San Luis Obispo|Los Altos|Brentwood|Aliso Viejo|La Mesa|West Sacramento|Agoura Hills|La Mirada|Rowland Heights|Cypress|Newark|Desert Hot Springs|Duarte|Lomita|Barstow|Adelanto|Twentynine Palms|Yucca Valley|Joshua Tree|Ridgecrest|California City|Tehachapi|Mojave)\b',
-        
-        # Pattern: City, CA or City, California
-        r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*),?\s+CA\b',
-        r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*),?\s+California\b',
-        
-        # Pattern: Address in City format
-        r'(?:in|at|located in)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-        
-        # Pattern: City name before zip code
-        r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+\d{5}(?:-\d{4})?\b'
-    ]
-    
-    for pattern in city_patterns:
-        match = re.search(pattern, combined_text, re.IGNORECASE)
-        if match:
-            city_name = match.group(1).strip()
-            # Clean up city name
-            city_name = re.sub(r'[,\.]$', '', city_name)  # Remove trailing comma/period
-            listing["city"] = city_name.title()  # Proper case
-            break
-    
-    # Enhanced address extraction
-    address_patterns = [
-        r'\d+\s+[A-Za-z\s]+(Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Boulevard|Blvd|Way|Lane|Ln|Circle|Cir|Court|Ct|Place|Pl)\b',
-        r'\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Boulevard|Blvd|Way|Lane|Ln|Circle|Cir|Court|Ct|Place|Pl)',
-        r'\d+\s+[A-Za-z0-9\s\-]+(?=,|\s+[A-Z][a-z]+,?\s+CA)'
-    ]
-    
-    for pattern in address_patterns:
-        address_match = re.search(pattern, combined_text, re.IGNORECASE)
-        if address_match:
-            listing["address"] = address_match.group().strip()
-            break
-    
-    # Extract price
-    price_pattern = r'\$[\d,]+(?:\.\d{2})?'
-    price_match = re.search(price_pattern, combined_text)
-    if price_match:
-        listing["price"] = price_match.group().strip()
-    
-    # Extract date with multiple formats
-    date_patterns = [
-        r'\b\d{1,2}/\d{1,2}/\d{4}\b',
-        r'\b\d{4}-\d{1,2}-\d{1,2}\b',
-        r'\b\d{1,2}-\d{1,2}-\d{4}\b'
-    ]
-    
-    for pattern in date_patterns:
-        date_match = re.search(pattern, combined_text)
-        if date_match:
-            listing["date"] = date_match.group().strip()
-            break
-    
-    # Extract TS Number (Trustee Sale Number)
-    # First, look for the TS Number pattern in the beginning of the text
-    ts_patterns = [
-        # Format: 123456-CA
-        r'^\s*(\d{5,}-[A-Z]{2})\b',
-        # Format: TS# 12345 or TS 12345-CA
-        r'TS[#\s]*\s*([A-Z0-9-]{5,})',
-        # Format: TRUSTEE SALE #12345 or TRUSTEE'S SALE #12345-CA
-        r'TRUSTEE[\'S]*\s*SALE[\s-]*#?[\s-]*([A-Z0-9-]{5,})',
-        # Format: Sale #12345 or Sale #12345-CA
-        r'Sale[\s-]*#?[\s-]*([A-Z0-9-]{5,})',
-        # Look for any 5+ digit number followed by -CA or -AZ
-        r'\b(\d{5,}-[A-Z]{2})\b',
-        # Look for any 5+ digit number that might be a TS Number
-        r'\b(\d{5,})\b'
-    ]
-    
-    # First try to find TS Number in the raw data
-    for pattern in ts_patterns:
-        ts_match = re.search(pattern, combined_text, re.IGNORECASE)
-        if ts_match:
-            # Get the first non-None group
-            ts_num = next((g for g in ts_match.groups() if g), '').strip().upper()
-            # Clean up the TS Number
-            ts_num = re.sub(r'[^A-Z0-9-]', '', ts_num)  # Remove any non-alphanumeric characters except hyphens
-            # Ensure TS Number is at least 5 characters (e.g., 12345 or 123-CA)
-            if len(ts_num) >= 5:
-                # If it's just numbers, add -CA suffix if not present
-                if ts_num.isdigit() and len(ts_num) >= 5 and not ts_num.endswith(('-CA', '-AZ')):
-                    ts_num = f"{ts_num}-CA"
-                listing["ts_number"] = ts_num
-                print(f"Extracted TS Number: {ts_num} from text")
-                break
+    Returns False if any consumed page is unchanged since the last run.
+    """
+    changed = True
+    for page_num, page_listings in pipeline.ready(wait_all):
+        print(f"Page {page_num}: Found {len(page_listings)} listings")
+        SCRAPE_PAGES.inc()
+        SCRAPE_PAGE_LISTINGS.observe(len(page_listings))
+        unique_listings.add(page_listings)
+        report_progress(page_num, unique_listings.seen)
+        changed = tracker.observe(page_num, page_listings) and changed
+    return changed
+
+def scrape_clearrecon_async(incremental: bool = False) -> str:
+    """Concurrent HTTP scraper: pages download in parallel while earlier ones are parsed."""
+    if incremental:
+        print("The async engine fetches all pages concurrently - incremental early stop is not applied")
+    print(f"Step 1: Fetching {CLEARRECON_URL} concurrently over HTTP...")
+    with ParsePipeline(parse_page_listings) as pipeline:
+        page_results = [
+            (page_num, pipeline.collect(result)) for page_num, result in
+            scrape_pages_concurrently(pipeline.parse_func, CLEARRECON_URL, executor=pipeline.executor)
+        ]
     
-    # If still no TS Number, try to extract from the raw data field if it exists
-    if "ts_number" not in listing and "raw_data" in listing and listing["raw_data"]:
-        for pattern in ts_patterns:
-            ts_match = re.search(pattern, listing["raw_data"], re.IGNORECASE)
-            if ts_match:
-                ts_num = next((g for g in ts_match.groups() if g), '').strip().upper()
-                ts_num = re.sub(r'[^A-Z0-9-]', '', ts_num)
-                if len(ts_num) >= 5:
-                    if ts_num.isdigit() and len(ts_num) >= 5 and not ts_num.endswith(('-CA', '-AZ')):
-                        ts_num = f"{ts_num}-CA"
-                    listing["ts_number"] = ts_num
-                    print(f"Extracted TS Number from raw_data: {ts_num}")
-                    break
+    tracker = IncrementalTracker()
+    unique_listings = ListingDeduper()
+    for page_num, page_listings in page_results:
+        print(f"Page {page_num}: Found {len(page_listings)} listings")
+        SCRAPE_PAGES.inc()
+        SCRAPE_PAGE_LISTINGS.observe(len(page_listings))
+        unique_listings.add(page_listings)
+        report_progress(page_num, unique_listings.seen)
+        tracker.observe(page_num, page_listings)
     
-    # Use remaining text as details
-    listing["details"] = combined_text[:1000]  # Increased limit for more details
+    return save_scraped_listings(unique_listings, len(page_results), tracker)
+
+def scrape_clearrecon(engine: Optional[str] = None, incremental: Optional[bool] = None) -> str:
+    """Scrape all listings with the configured engine and return the CSV path.
+    
+    SCRAPER_ENGINE selects "async", "http", "selenium" or "auto" (default):
+    the concurrent HTTP engine when httpx is installed, otherwise the
+    sequential HTTP engine, falling back to Selenium when the site needs a
+    browser.
+    
+    SCRAPE_INCREMENTAL=1 (or incremental=True) stops at pages unchanged since
+    the last run and merges the changes into the current dataset. Pages are
+    then walked in order, so "auto" uses the sequential HTTP engine.
+    """
+    engine = (engine or os.environ.get("SCRAPER_ENGINE", "auto")).lower()
+    if incremental is None:
+        incremental = os.environ.get("SCRAPE_INCREMENTAL", "").lower() in ("1", "true", "yes")
     
-    return listing
+    if engine == "auto":
+        http_engine = scrape_clearrecon_async if HTTPX_AVAILABLE and not incremental else scrape_clearrecon_http
+    else:
+        http_engine = {"async": scrape_clearrecon_async, "http": scrape_clearrecon_http}.get(engine)
+    
+    if http_engine is not None:
+        try:
+            return http_engine(incremental)
+        except Exception as e:
+            if engine != "auto":
+                print(f"HTTP scraping error: {e}")
+                return None
+            print(f"HTTP engine unavailable ({e}) - falling back to Selenium")
+    
+    return scrape_clearrecon_selenium_enhanced(incremental)
 
-async def save_to_csv(listings: List[Dict], csv_path: str):
-    """Save listings to CSV file with proper structure and deduplication by TS Number."""
+def save_scraped_listings(unique_listings: ListingDeduper, page_count: int,
+                          tracker: Optional[IncrementalTracker] = None, incremental: bool = False) -> str:
+    """Save the listings the scrape's dedup stage kept to a new CSV.
+    
+    In incremental mode the fetched pages are merged into the current
+    dataset instead of replacing it, and only the new, changed and removed
+    listings are applied to the database. When there are none, nothing is
+    published and the current dataset's CSV path is returned.
+    """
+    print(f"Total listings extracted from {page_count} pages: {unique_listings.seen}")
+    print(f"Found {unique_listings.summary()}")
+    listings = unique_listings.listings()
+    delta = None
+    
+    if incremental and tracker is not None:
+        existing = []
+        current_csv = get_latest_csv_path()
+        dataset = current_db_dataset() if LISTINGS_BACKEND == "sqlite" else None
+        if dataset is not None:
+            current_csv = dataset["csv_path"]
+            existing = list(get_listings_repository().listings(dataset))
+        elif current_csv:
+            with open(current_csv, 'r', encoding='utf-8', newline='') as f:
+                existing = list(csv.DictReader(f))
+        # The merge is keyed by the same TS Number key, so the result stays unique
+        upserts, replaced, stats = tracker.changes(existing, listings)
+        print(f"Incremental merge into {current_csv}: {stats['new']} new, {stats['changed']} changed, "
+              f"{stats['removed']} removed, {stats['unchanged']} unchanged (pages changed: {tracker.changed_pages})")
+        if current_csv and not (stats["new"] or stats["changed"] or stats["removed"]):
+            print("No new, changed or removed listings - keeping the current dataset")
+            tracker.save_state()
+            return current_csv
+        listings = apply_changes(existing, upserts, replaced)
+        if dataset is not None:
+            delta = (dataset, upserts, replaced)
+    
     if not listings:
-        return
+        print("No listings with a TS Number - nothing to save")
+        return None
     
-    # Deduplicate listings by TS Number (case-insensitive)
-    unique_listings = {}
-    for listing in listings:
-        ts_num = listing.get("ts_number", "").strip().upper()
-        if ts_num:  # Only keep listings with a TS Number
-            unique_listings[ts_num] = listing
+    # Save to CSV
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_path = f"csv_data/clearrecon_listings_enhanced_{timestamp}.csv"
+    
+    with SCRAPE_STEP_SECONDS.time(step="save"):
+        save_to_csv(listings, csv_path, delta)
+    print(f"Saved {len(listings)} unique listings to {csv_path}")
+    
+    if tracker is not None:
+        tracker.save_state()
     
-    print(f"Saving {len(unique_listings)} unique listings (from {len(listings)} total)")
+    return csv_path
+
+def save_to_csv(listings: List[Dict], csv_path: str, delta: Optional[Tuple] = None):
+    """Save listings, already unique by TS Number (see listing_dedup.py), to a CSV file with proper structure.
     
-    # Ensure all listings have the same keys
-    all_keys = set()
-    for listing in unique_listings.values():
+    delta is (base dataset, new and changed listings, replaced TS keys) when
+    listings is an incremental merge into a stored dataset, which is then
+    stored by applying just those changes to the base.
+    """
+    if not listings:
+        return
+    
+    print(f"Saving {len(listings)} unique listings")
+    
+    # Ensure all listings have the same keys and a normalized ISO sale date
+    all_keys = {"sale_date"}
+    for listing in listings:
         all_keys.update(listing.keys())
+        if not listing.get("sale_date"):
+            listing["sale_date"] = normalize_sale_date(listing.get("date", ""))
     
     # Ensure consistent field order
-    field_order = ["ts_number", "address", "city", "county", "date", "price", "details", "status"]
+    field_order = ["ts_number", "address", "city", "county", "date", "sale_date", "price", "details", "status"]
     fieldnames = [f for f in field_order if f in all_keys]
     fieldnames.extend(sorted(f for f in all_keys if f not in field_order))
     
-    with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-        writer.writeheader()
-        
-        for listing in unique_listings.values():
-            # Ensure all fields are present and properly formatted
-            row = {key: str(listing.get(key, '')).strip() for key in fieldnames}
-            writer.writerow(row)
-
-def send_filtered_results_email(email_address: str, filtered_results: List[Dict], filter_info: Dict) -> bool:
-    """Send filtered results as CSV attachment via email (Azure compatible)."""
+    # Written to a temp file and renamed, so readers never see a partial CSV;
+    # all fields present and properly formatted
+    write_csv_atomic(csv_path, fieldnames, (
+        {key: str(listing.get(key, '')).strip() for key in fieldnames}
+        for listing in listings
+    ))
+    
+    # Column file next to the CSV, so memory-backend API processes map the new
+    # dataset instead of parsing the CSV (the sqlite backend never reads it)
+    if LISTINGS_BACKEND == "memory" and LISTINGS_SNAPSHOT_FILES:
+        write_snapshot_file(csv_path)
+    
+    # The listings database is the system of record; the CSV above is its export
+    repository = get_listings_repository()
+    if delta is not None:
+        dataset_id = repository.save_delta(*delta, csv_path, fieldnames)
+    else:
+        dataset_id = repository.save_dataset(listings, csv_path, fieldnames)
+    # Point the manifest at the new version; versions pruned past
+    # DATASET_RETENTION take their database datasets with them
     try:
-        # Email configuration (use environment variables for Azure)
-        smtp_server = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
-        smtp_port = int(os.environ.get("SMTP_PORT", "587"))
-        sender_email = os.environ.get("SENDER_EMAIL", "")
-        sender_password = os.environ.get("SENDER_PASSWORD", "")
-        
-        if not sender_email or not sender_password:
-            print("Email configuration missing. Set SENDER_EMAIL and SENDER_PASSWORD environment variables.")
-            return False
-        
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = email_address
-        msg['Subject'] = f"ClearRecon Filtered Listings - {len(filtered_results)} Results"
-        
-        # Email body
-        body = f"""
-Hello,
-
-Your filtered ClearRecon California foreclosure listings are attached.
+        dataset_versions.publish(csv_path, len(listings), dataset_id, on_pruned=delete_pruned_datasets)
+    except Exception:
+        # Never published, so never served: don't leave it in the database
+        repository.delete_datasets([dataset_id])
+        raise
+    # Cached /filter pages belong to the previous dataset
+    filter_cache.clear()
 
-Filter Details:
-- City: {filter_info.get('city', 'All Cities')}
-- Date Range: {filter_info.get('start_date', 'N/A')} to {filter_info.get('end_date', 'N/A')}
-- Results Found: {len(filtered_results)} listings
+def delete_pruned_datasets(pruned: List[Dict]):
+    """Delete the database datasets of versions the manifest just pruned."""
+    repository = get_listings_repository()
+    datasets = (repository.dataset_for_version(version) for version in pruned)
+    repository.delete_datasets(dataset["id"] for dataset in datasets if dataset is not None)
 
-The results are attached as a CSV file for easy viewing in Excel or other spreadsheet applications.
-
-Best regards,
-ClearRecon Scraper System
-        """
-        
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Create CSV attachment
-        if filtered_results:
-            # Create temporary CSV file
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', newline='', encoding='utf-8') as temp_file:
-                fieldnames = filtered_results[0].keys()
-                writer = csv.DictWriter(temp_file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(filtered_results)
-                temp_filename = temp_file.name
-            
-            # Attach CSV file
-            with open(temp_filename, "rb") as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-            
-            encoders.encode_base64(part)
-            
-            # Generate filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"clearrecon_filtered_{timestamp}.csv"
-            
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename= {filename}',
-            )
-            
-            msg.attach(part)
-            
-            # Clean up temp file
-            os.unlink(temp_filename)
-        
-        # Send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, email_address, text)
-        server.quit()
-        
-        print(f"Email sent successfully to {email_address}")
-        return True
-        
-    except Exception as e:
-        print(f"Failed to send email: {str(e)}")
-        return False
+def send_filtered_results_email(email_address: str, filtered_results: List[Dict], filter_info: Dict) -> Optional[str]:
+    """Queue filtered results to be emailed as a CSV attachment; returns the delivery id.
+    
+    Delivery happens on a background worker (see email_delivery.py), so
+    this returns immediately. Returns None when email isn't configured.
+    """
+    delivery = get_email_queue().submit(email_address, filtered_results, filter_info)
+    if delivery is None:
+        return None
+    print(f"Queued email {delivery.id} to {email_address} with {len(filtered_results)} results")
+    return delivery.id
 
 def get_latest_csv_path():
-    """Get the path to the most recent CSV file."""
-    global latest_csv_path
-    # Always return the predefined successful CSV path
-    if latest_csv_path and os.path.exists(latest_csv_path):
-        return latest_csv_path
-    
-    # Fallback to searching for CSV files
-    csv_files = glob.glob("csv_data/clearrecon_listings_*.csv")
-    if csv_files:
-        return max(csv_files, key=os.path.getctime)
+    """Get the path to the current dataset version's CSV."""
+    csv_path = dataset_versions.current_csv_path()
+    if csv_path and os.path.exists(csv_path):
+        return csv_path
     return None
 
 def get_csv_row_count():
     """Get the number of rows in the current CSV file."""
-    global latest_csv_path
-    
-    if not latest_csv_path or not os.path.exists(latest_csv_path):
-        return 0
-    
-    try:
-        with open(latest_csv_path, 'r', encoding='utf-8') as f:
-            return sum(1 for line in csv.DictReader(f))
-    except Exception as e:
-        print(f"Error counting CSV rows: {e}")
-        return 0
+    summary = dataset_summary()
+    return summary["row_count"] if summary else 0
 
 def extract_cities_from_csv(csv_path: str) -> List[str]:
     """Extract all unique cities from the CSV file with proper capitalization."""
-    try:
-        cities = set()
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                city = row.get('city', '').strip()
-                if city and len(city) > 0:
-                    # Normalize city name: lowercase first, then title case
-                    normalized_city = city.lower().title()
-                    cities.add(normalized_city)
-        
-        city_list = sorted(list(cities))
-        print(f"Extracted {len(city_list)} unique cities from CSV")
-        return city_list
-    except Exception as e:
-        print(f"Error extracting cities: {e}")
-        return []
+    snapshot = listings_store.get(csv_path)
+    return snapshot.cities if snapshot else []
 
 def run_test_scraper():
     """Run the scraper in test mode."""
     print("Starting test scraper...")
     try:
-        result = scrape_clearrecon_selenium_enhanced()
+        result = scrape_clearrecon()
         if result and "listings" in result:
             print(f"\nSuccessfully scraped {len(result['listings'])} listings")
             print(f"CSV saved to: {result.get('csv_path', 'Unknown')}")
@@ -914,6 +1004,9 @@ def run_test_scraper():
         import traceback
         traceback.print_exc()
         return None
+    finally:
+        # Quit the Selenium engine's pooled browser before exiting
+        close_driver_pool()
 
 def quick_test():
     """Run a quick test of the scraper directly with detailed error reporting."""
@@ -1002,10 +1095,20 @@ if __name__ == "__main__":
     import sys
     
     if "--test" in sys.argv:
+        if "--incremental" in sys.argv:
+            os.environ["SCRAPE_INCREMENTAL"] = "1"
         run_test_scraper()
     elif "--quick" in sys.argv:
         quick_test()
     else:
         import uvicorn
         port = int(os.environ.get("PORT", 8089))
-        uvicorn.run(app, host="0.0.0.0", port=port)
+        workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+        if workers > 1:
+            # Worker processes import the app by name and share their metrics
+            # through METRICS_DIR, emptied of the previous run's files
+            os.environ.setdefault("METRICS_DIR", "csv_data/metrics")
+            clear_shared_metrics(os.environ["METRICS_DIR"])
+            uvicorn.run("selenium_main_final:app", host="0.0.0.0", port=port, workers=workers)
+        else:
+            uvicorn.run(app, host="0.0.0.0", port=port)
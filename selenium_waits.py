@@ -0,0 +1,152 @@
+"""
+Condition-based waits for the Selenium scraper engine.
+
+These replace fixed time.sleep() calls with WebDriverWait conditions on the
+listings table: its row count and the first data row (which starts with the
+TS number). StepTimer logs how long each step actually took, so a run shows
+how much of the old fixed ~11 s/page budget was saved, and records each step
+in the clearrecon_scrape_step_seconds metric.
+"""
+
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from metrics import SCRAPE_STEP_SECONDS
+
+# Fixed sleeps the Selenium engine used per page before condition waits:
+# 3 s page load + 2 s scroll + 1 s before Next + 5 s after Next
+FIXED_SLEEP_PER_PAGE = 11.0
+
+TABLE_SIGNATURE_JS = """
+var rows = document.querySelectorAll('table tr');
+var first = rows.length > 1 ? (rows[1].innerText || rows[1].textContent || '') : '';
+return [rows.length, first.slice(0, 200)];
+"""
+
+# (row count, first data row text) for the listings table
+TableSignature = Tuple[int, str]
+
+
+class ReadinessPolicy:
+    """How long to wait, and how often to poll, for each scraper step.
+
+    Defaults can be overridden with SELENIUM_WAIT_TIMEOUT (seconds, per step)
+    and SELENIUM_POLL_INTERVAL (seconds).
+    """
+
+    def __init__(self, timeout: Optional[float] = None, poll_interval: Optional[float] = None,
+                 settle_polls: int = 2):
+        self.timeout = timeout if timeout is not None else float(os.environ.get("SELENIUM_WAIT_TIMEOUT", "15"))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.environ.get("SELENIUM_POLL_INTERVAL", "0.25"))
+        # A table counts as fully loaded once its signature is unchanged for this many polls
+        self.settle_polls = settle_polls
+
+    def wait(self, driver, timeout: Optional[float] = None) -> WebDriverWait:
+        return WebDriverWait(driver, timeout or self.timeout, poll_frequency=self.poll_interval,
+                             ignored_exceptions=(StaleElementReferenceException,))
+
+
+class StepTimer:
+    """Accumulates and logs wall-clock time per scraper step."""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def step(self, name: str, detail: str = ""):
+        return _TimedStep(self, name, detail)
+
+    def record(self, name: str, elapsed: float):
+        SCRAPE_STEP_SECONDS.observe(elapsed, step=name)
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def summary(self, pages: int) -> str:
+        lines = ["Step timings:"]
+        for name, total in self.totals.items():
+            lines.append(f"  {name:<14} {total:7.2f} s over {self.counts[name]} call(s)")
+        waited = sum(self.totals.get(name, 0.0) for name in ("page_ready", "scroll_settle", "next_ready", "page_change"))
+        fixed = FIXED_SLEEP_PER_PAGE * pages
+        lines.append(f"  Waiting took {waited:.2f} s vs {fixed:.0f} s of fixed sleeps for {pages} page(s) "
+                     f"- saved {fixed - waited:.2f} s")
+        return "\n".join(lines)
+
+
+class _TimedStep:
+    def __init__(self, timer: StepTimer, name: str, detail: str):
+        self.timer = timer
+        self.name = name
+        self.detail = detail
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.timer.record(self.name, elapsed)
+        status = "" if exc_type is None else f" ({exc_type.__name__})"
+        print(f"⏱ {self.name}{' ' + self.detail if self.detail else ''}: {elapsed:.2f}s{status}")
+        return False
+
+
+def table_signature(driver) -> TableSignature:
+    row_count, first_row = driver.execute_script(TABLE_SIGNATURE_JS)
+    return int(row_count), first_row or ""
+
+
+def wait_for_table(driver, policy: ReadinessPolicy, timeout: Optional[float] = None) -> TableSignature:
+    """Wait until a table with a header and at least one data row is present."""
+    def has_rows(d):
+        signature = table_signature(d)
+        return signature if signature[0] > 1 else False
+    return policy.wait(driver, timeout).until(has_rows)
+
+
+def wait_for_settled_table(driver, policy: ReadinessPolicy) -> TableSignature:
+    """Wait until the table stops growing (e.g. lazy-loaded rows after a scroll)."""
+    state = {"signature": None, "stable": 0}
+
+    def settled(d):
+        signature = table_signature(d)
+        if signature == state["signature"] and signature[0] > 1:
+            state["stable"] += 1
+        else:
+            state["signature"], state["stable"] = signature, 0
+        return signature if state["stable"] >= policy.settle_polls else False
+
+    try:
+        return policy.wait(driver).until(settled)
+    except TimeoutException:
+        # Still changing at the timeout: extract whatever is loaded
+        return state["signature"] or table_signature(driver)
+
+
+def wait_for_page_change(driver, previous: TableSignature, policy: ReadinessPolicy) -> TableSignature:
+    """Wait until the table's row count or first row differs from `previous`."""
+    def changed(d):
+        signature = table_signature(d)
+        return signature if signature != previous and signature[0] > 1 else False
+    return policy.wait(driver).until(changed)
+
+
+def wait_for_clickable(driver, element, policy: ReadinessPolicy):
+    """Wait until an element is visible and enabled."""
+    return policy.wait(driver).until(EC.element_to_be_clickable(element))
+
+
+def wait_for_disclaimer_dismissed(driver, element, policy: ReadinessPolicy):
+    """After accepting the disclaimer, wait for the listings table or for the button to go away."""
+    def dismissed(d):
+        try:
+            if table_signature(d)[0] > 1:
+                return True
+            return not element.is_displayed()
+        except StaleElementReferenceException:
+            return True  # Page navigated away from the disclaimer
+    return policy.wait(driver).until(dismissed)
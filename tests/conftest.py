@@ -0,0 +1,46 @@
+import os
+import sys
+import shutil
+import tempfile
+import importlib
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Modules read their state paths from the environment at import time, so they
+# point at a temp directory before any test module imports them
+DATA_DIR = tempfile.mkdtemp(prefix="clearrecon-tests-")
+os.environ.update({
+    "LISTINGS_DB_PATH": os.path.join(DATA_DIR, "listings.db"),
+    "DATASET_MANIFEST_PATH": os.path.join(DATA_DIR, "manifest.json"),
+    "SCRAPE_JOBS_PATH": os.path.join(DATA_DIR, "scrape_jobs.json"),
+    "EMAIL_DELIVERIES_PATH": os.path.join(DATA_DIR, "email_deliveries.db"),
+    "LISTINGS_BACKEND": "sqlite",
+})
+os.environ.pop("METRICS_DIR", None)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+def listing(ts_number, **fields):
+    """A scraped listing row with a TS number and optional extra fields."""
+    return {"ts_number": ts_number, "raw_data": fields.pop("raw_data", f"row {ts_number}"), **fields}
+
+
+@pytest.fixture(scope="session")
+def api_module():
+    """selenium_main_final imported from the repo root (it opens its templates and seed CSV by relative path)."""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(ROOT)
+        yield importlib.import_module("selenium_main_final")
+
+
+@pytest.fixture(scope="session")
+def api_client(api_module):
+    from fastapi.testclient import TestClient
+    with TestClient(api_module.app) as client:
+        yield client
@@ -0,0 +1,45 @@
+from array import array
+
+from columnar_file import map_columns, write_columns
+from listings_store import load_snapshot, parse_snapshot, snapshot_path, write_snapshot_file
+from dataset_versions import write_csv_atomic
+
+
+def test_round_trip_arrays_strings_and_nulls(tmp_path):
+    path = str(tmp_path / "data.cols")
+    arrays = {"ints": array("i", [3, -1, 7]), "prices": array("d", [1.5, float("inf")]), "empty": array("q")}
+    strings = {"city": ["Corona", None, "", "San José"]}
+    write_columns(path, {"rows": 3}, arrays, strings)
+
+    mapped = map_columns(path)
+    assert mapped.meta == {"rows": 3}
+    assert list(mapped.arrays["ints"]) == [3, -1, 7]
+    assert list(mapped.arrays["prices"]) == [1.5, float("inf")]
+    assert len(mapped.arrays["empty"]) == 0
+    assert list(mapped.strings["city"]) == ["Corona", None, "", "San José"]
+    assert mapped.strings["city"][-1] == "San José"
+
+
+def test_missing_or_foreign_file_is_not_mapped(tmp_path):
+    assert map_columns(str(tmp_path / "missing.cols")) is None
+    foreign = tmp_path / "foreign.cols"
+    foreign.write_bytes(b"not a column file")
+    assert map_columns(str(foreign)) is None
+
+
+def test_snapshot_mapped_from_column_file_matches_parsed_csv(tmp_path):
+    csv_path = str(tmp_path / "listings.csv")
+    fieldnames = ["ts_number", "city", "date", "price", "details", "raw_data"]
+    rows = [
+        {"ts_number": "A", "city": "corona", "date": "12/17/2025", "price": "$100", "details": "", "raw_data": "A row"},
+        {"ts_number": "B", "city": "Beaumont", "date": "", "price": "", "details": "B details", "raw_data": "B row"},
+    ]
+    write_csv_atomic(csv_path, fieldnames, rows)
+    assert write_snapshot_file(csv_path) == snapshot_path(csv_path)
+
+    parsed = parse_snapshot(csv_path)
+    mapped = load_snapshot(csv_path)
+    assert list(mapped.date_ordinals) == list(parsed.date_ordinals)
+    assert mapped.cities == parsed.cities == ["Beaumont", "Corona"]
+    assert [mapped.row(i) for i in range(2)] == [parsed.row(i) for i in range(2)]
+    assert mapped.row(0, ["ts_number", "sale_date"]) == {"ts_number": "A", "sale_date": "2025-12-17"}
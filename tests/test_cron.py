@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import pytest
+
+from scrape_jobs import CronSchedule
+
+
+def test_matches_lists_ranges_and_steps():
+    schedule = CronSchedule("*/30 6-18 * * 1-5")
+    assert schedule.matches(datetime(2025, 12, 15, 6, 30))  # Monday
+    assert not schedule.matches(datetime(2025, 12, 15, 6, 15))
+    assert not schedule.matches(datetime(2025, 12, 15, 19, 0))
+    assert not schedule.matches(datetime(2025, 12, 14, 12, 0))  # Sunday
+
+
+def test_restricted_day_fields_match_either():
+    schedule = CronSchedule("0 0 1 * 0")
+    assert schedule.matches(datetime(2025, 12, 1, 0, 0))  # the 1st, a Monday
+    assert schedule.matches(datetime(2025, 12, 7, 0, 0))  # a Sunday
+    assert not schedule.matches(datetime(2025, 12, 2, 0, 0))
+    assert CronSchedule("0 0 * * 7").matches(datetime(2025, 12, 7, 0, 0))
+
+
+def test_next_after_skips_to_next_match():
+    schedule = CronSchedule("15 2 * * *")
+    assert schedule.next_after(datetime(2025, 12, 15, 2, 15, 30)) == datetime(2025, 12, 16, 2, 15)
+    assert schedule.next_after(datetime(2025, 12, 15, 1, 0)) == datetime(2025, 12, 15, 2, 15)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 5-2 * * *", "0 0 31 2 *"])
+def test_invalid_expressions_raise(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression).next_after(datetime(2025, 1, 1))
@@ -0,0 +1,74 @@
+import gzip
+
+import pytest
+
+from csv_streaming import parse_range
+
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-4", "bytes=-0", "bytes=a-b"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+
+def test_full_response_has_validators(api_client, api_module):
+    response = api_client.get("/csv", headers=IDENTITY)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["accept-ranges"] == "bytes"
+    assert int(response.headers["content-length"]) == len(response.content)
+    with open(api_module.dataset_versions.current_csv_path(), "rb") as f:
+        assert response.content == f.read()
+
+
+def test_if_none_match_returns_304(api_client):
+    etag = api_client.get("/csv", headers=IDENTITY).headers["etag"]
+    response = api_client.get("/csv", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_range_returns_206_with_content_range(api_client):
+    full = api_client.get("/csv", headers=IDENTITY).content
+    response = api_client.get("/csv", headers={"Range": "bytes=0-99", **IDENTITY})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 0-99/{len(full)}"
+    assert response.content == full[:100]
+
+    tail = api_client.get("/csv", headers={"Range": "bytes=-10", **IDENTITY})
+    assert tail.content == full[-10:]
+
+
+def test_unsatisfiable_range_returns_416(api_client):
+    size = len(api_client.get("/csv", headers=IDENTITY).content)
+    response = api_client.get("/csv", headers={"Range": f"bytes={size}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+
+def test_gzip_variant_has_its_own_etag(api_client):
+    plain = api_client.get("/csv", headers=IDENTITY)
+    response = api_client.get("/csv", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    # httpx decodes the body transparently
+    assert response.content == plain.content
+    assert api_client.get("/csv", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
@@ -0,0 +1,64 @@
+import csv
+import json
+
+from dataset_versions import DatasetVersions, write_csv_atomic
+
+
+def write_dataset(path, rows=1):
+    write_csv_atomic(str(path), ["ts_number"], ({"ts_number": f"TS-{i}"} for i in range(rows)))
+    return str(path)
+
+
+def make_versions(tmp_path, retention=3):
+    seed = write_dataset(tmp_path / "seed.csv")
+    return DatasetVersions(str(tmp_path / "manifest.json"), seed_csv=seed, retention=retention), seed
+
+
+def test_seed_csv_becomes_pinned_version_one(tmp_path):
+    versions, seed = make_versions(tmp_path)
+    current = versions.current()
+    assert current["version"] == 1
+    assert current["csv_path"] == seed
+    assert current["pinned"] is True
+
+
+def test_publish_points_current_at_new_version(tmp_path):
+    versions, _ = make_versions(tmp_path)
+    path = write_dataset(tmp_path / "v2.csv", rows=3)
+    entry = versions.publish(path, 3, dataset_id=7)
+    assert entry["version"] == 2
+    assert versions.current() == entry
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert manifest["current"] == 2
+    assert manifest["versions"][-1]["dataset_id"] == 7
+
+
+def test_prune_keeps_retention_and_pinned_seed(tmp_path):
+    versions, seed = make_versions(tmp_path, retention=2)
+    pruned = []
+    paths = [write_dataset(tmp_path / f"v{i}.csv") for i in range(2, 6)]
+    for dataset_id, path in enumerate(paths, start=2):
+        versions.publish(path, 1, dataset_id=dataset_id, on_pruned=pruned.extend)
+
+    assert [v["version"] for v in versions.versions()] == [1, 4, 5]
+    assert [v["dataset_id"] for v in pruned] == [2, 3]
+    assert not (tmp_path / "v2.csv").exists()
+    assert not (tmp_path / "v3.csv").exists()
+    assert (tmp_path / "v5.csv").exists()
+    assert versions.current_csv_path() == paths[-1]
+    assert (tmp_path / "seed.csv").exists() and seed in [v["csv_path"] for v in versions.versions()]
+
+
+def test_refresh_sees_another_processes_publish(tmp_path):
+    reader, _ = make_versions(tmp_path)
+    writer = DatasetVersions(reader.manifest_path, seed_csv=reader.seed_csv)
+    assert reader.current()["version"] == 1
+    writer.publish(write_dataset(tmp_path / "v2.csv"))
+    assert reader.current()["version"] == 2
+
+
+def test_write_csv_atomic_leaves_no_temp_file(tmp_path):
+    path = write_dataset(tmp_path / "out.csv", rows=2)
+    with open(path, newline="", encoding="utf-8") as f:
+        assert [row["ts_number"] for row in csv.DictReader(f)] == ["TS-0", "TS-1"]
+    assert [p.name for p in tmp_path.iterdir()] == ["out.csv"]
@@ -0,0 +1,117 @@
+import csv
+import io
+import time
+import socket
+from email import message_from_bytes
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from email_delivery import DeliveryLog, EmailDeliveryQueue, SmtpSettings
+
+RESULTS = [{"ts_number": "A", "city": "Corona"}, {"ts_number": "B", "city": "Norco"}]
+FILTER_INFO = {"city": "All Cities", "start_date": "2025-12-01", "end_date": "2025-12-31"}
+
+
+class Inbox:
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    inbox = Inbox()
+    port = free_port()
+    controller = aiosmtpd_controller.Controller(inbox, hostname="127.0.0.1", port=port)
+    controller.start()
+    monkeypatch.setenv("SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(port))
+    monkeypatch.setenv("SMTP_STARTTLS", "0")
+    monkeypatch.setenv("SENDER_EMAIL", "scraper@example.com")
+    monkeypatch.delenv("SENDER_PASSWORD", raising=False)
+    yield inbox
+    controller.stop()
+
+
+def wait_for_status(email_queue, delivery_id, statuses=("sent", "failed"), timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = email_queue.get(delivery_id)
+        if record["status"] in statuses:
+            return record
+        time.sleep(0.05)
+    raise AssertionError(f"delivery {delivery_id} still {record['status']}")
+
+
+def test_results_are_delivered_with_csv_attachment(smtp_server, tmp_path):
+    email_queue = EmailDeliveryQueue(SmtpSettings(), log=DeliveryLog(str(tmp_path / "deliveries.db")))
+    try:
+        first = email_queue.submit("buyer@example.com", RESULTS, FILTER_INFO)
+        second = email_queue.submit("other@example.com", RESULTS[:1], FILTER_INFO)
+        assert wait_for_status(email_queue, first.id)["status"] == "sent"
+        record = wait_for_status(email_queue, second.id)
+        assert (record["status"], record["attempts"], record["result_count"]) == ("sent", 1, 1)
+        # Both emails went over one kept-open connection
+        assert email_queue.stats()["smtp_connects"] == 1
+        assert email_queue.log.counts() == {"sent": 2}
+    finally:
+        email_queue.close()
+
+    envelope = smtp_server.envelopes[0]
+    assert envelope.mail_from == "scraper@example.com"
+    assert envelope.rcpt_tos == ["buyer@example.com"]
+    message = message_from_bytes(envelope.content)
+    assert message["Subject"] == "ClearRecon Filtered Listings - 2 Results"
+    attachment = [part for part in message.walk() if part.get_filename()][0]
+    assert attachment.get_filename().endswith(".csv")
+    rows = list(csv.DictReader(io.StringIO(attachment.get_payload(decode=True).decode("utf-8"))))
+    assert rows == RESULTS
+
+
+def test_unreachable_server_fails_after_retries(monkeypatch, tmp_path):
+    monkeypatch.setenv("SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(free_port()))
+    monkeypatch.setenv("SMTP_STARTTLS", "0")
+    monkeypatch.setenv("SENDER_EMAIL", "scraper@example.com")
+    email_queue = EmailDeliveryQueue(SmtpSettings(), max_attempts=2, retry_backoff=0.01,
+                                     log=DeliveryLog(str(tmp_path / "deliveries.db")))
+    try:
+        delivery = email_queue.submit("buyer@example.com", RESULTS, FILTER_INFO)
+        record = wait_for_status(email_queue, delivery.id)
+        assert (record["status"], record["attempts"]) == ("failed", 2)
+        assert record["error"]
+    finally:
+        email_queue.close()
+
+
+def test_submit_without_configuration_returns_none(monkeypatch, tmp_path):
+    monkeypatch.delenv("SENDER_EMAIL", raising=False)
+    email_queue = EmailDeliveryQueue(SmtpSettings(), log=DeliveryLog(str(tmp_path / "deliveries.db")))
+    try:
+        assert email_queue.submit("buyer@example.com", RESULTS, FILTER_INFO) is None
+        assert email_queue.log.counts() == {}
+    finally:
+        email_queue.close()
+
+
+@pytest.mark.parametrize("offset, start_date, message", [
+    (10, "2000-01-01", "Results are only emailed with the first page"),
+    (0, "2099-01-01", "No matching listings to email"),
+])
+def test_filter_explains_why_no_email_was_sent(api_client, offset, start_date, message):
+    response = api_client.post("/filter", data={
+        "start_date": start_date, "end_date": "2099-12-31", "email": "buyer@example.com", "offset": offset,
+    }).json()
+    assert response["success"]
+    assert (response["email_sent"], response["email_message"]) == (False, message)
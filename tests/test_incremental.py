@@ -0,0 +1,91 @@
+import json
+
+from conftest import listing
+from incremental import IncrementalTracker, ScrapeState, apply_changes
+
+
+def page(number, size=2):
+    return [listing(f"{number}-{i}") for i in range(size)]
+
+
+def tracked_run(state, pages, stop=False):
+    """Observe pages like a scraper does; returns the tracker and the fetched listings."""
+    tracker = IncrementalTracker(state, stop_after=2)
+    fetched = []
+    for number, rows in pages:
+        fetched.extend(rows)
+        if not tracker.observe(number, rows) and stop:
+            tracker.stop()
+            break
+    return tracker, fetched
+
+
+def previous_run(numbers=(1, 2, 3, 4)):
+    tracker, fetched = tracked_run(ScrapeState(), [(n, page(n)) for n in numbers])
+    return tracker.state, fetched
+
+
+def test_counts_new_changed_removed_and_unchanged():
+    state, existing = previous_run((1, 2))
+    changed = listing("1-0", raw_data="new text")
+    pages = [(1, [changed, listing("NEW")]), (2, [page(2)[0]])]
+    tracker, fetched = tracked_run(state, pages)
+
+    upserts, replaced, stats = tracker.changes(existing, fetched)
+    assert stats == {"new": 1, "changed": 1, "removed": 2, "unchanged": 1}
+    assert [l["ts_number"] for l in upserts] == ["1-0", "NEW"]
+    assert replaced == {"1-0", "1-1", "2-1"}
+
+
+def test_early_stop_keeps_listings_of_pages_not_refetched():
+    state, existing = previous_run()
+    new = listing("NEW")
+    tracker, fetched = tracked_run(state, [(1, [new] + page(1)), (2, page(2)), (3, page(3)), (4, page(4))],
+                                   stop=True)
+    assert tracker.stopped_early
+    assert 4 not in tracker.fetched_pages
+
+    upserts, replaced, stats = tracker.changes(existing, fetched)
+    assert upserts == [new]
+    assert replaced == set()
+    assert stats["removed"] == 0
+
+
+def test_full_walk_ending_on_unchanged_pages_removes_pages_past_the_end(tmp_path):
+    state, existing = previous_run()
+    # The last two pages fetched are unchanged, but page 4 no longer exists
+    tracker, fetched = tracked_run(state, [(1, [listing("NEW")] + page(1)), (2, page(2)), (3, page(3))])
+    assert not tracker.stopped_early
+
+    _, replaced, stats = tracker.changes(existing, fetched)
+    assert replaced == {"4-0", "4-1"}
+    assert stats["removed"] == 2
+
+    path = tmp_path / "state.json"
+    tracker.save_state(str(path))
+    assert sorted(json.loads(path.read_text())["pages"]) == ["1", "2", "3"]
+
+
+def test_observe_stops_after_unchanged_streak():
+    state, _ = previous_run()
+    tracker = IncrementalTracker(state, stop_after=2)
+    assert tracker.observe(1, page(1))
+    assert not tracker.observe(2, page(2))
+    assert tracker.changed_pages == []
+
+
+def test_apply_changes_keeps_order_then_appends_upserts():
+    existing = [listing("A"), listing("B"), listing("C")]
+    merged = apply_changes(existing, [listing("B", raw_data="changed"), listing("D")], {"B", "C"})
+    assert [(l["ts_number"], l["raw_data"]) for l in merged] == [
+        ("A", "row A"), ("B", "changed"), ("D", "row D")]
+
+
+def test_scrape_state_round_trip(tmp_path):
+    path = str(tmp_path / "state.json")
+    state, _ = previous_run((1,))
+    state.save(path)
+    loaded = ScrapeState.load(path)
+    assert loaded.pages == state.pages
+    assert loaded.updated_at
+    assert ScrapeState.load(str(tmp_path / "missing.json")).pages == {}
@@ -0,0 +1,48 @@
+import pytest
+
+from conftest import listing
+from listing_dedup import ListingDeduper, listing_key
+
+
+def test_listing_key_normalizes_ts_number():
+    assert listing_key({"ts_number": " 131521-ca "}) == "131521-CA"
+    assert listing_key({"ts_number": "1315 21-CA"}) == "131521-CA"
+    assert listing_key({"ts_number": None}) == ""
+    assert listing_key({}) == ""
+
+
+def test_duplicates_and_rows_without_key_are_counted():
+    deduper = ListingDeduper("last")
+    assert deduper.add([listing("A"), listing("a "), listing(""), listing("B")]) == 2
+    assert len(deduper) == 2
+    assert (deduper.seen, deduper.duplicates, deduper.without_key) == (4, 1, 1)
+
+
+def test_last_policy_keeps_last_copy():
+    deduper = ListingDeduper("last")
+    deduper.add([listing("A", city="First")])
+    deduper.add([listing("A", city="Second")])
+    assert deduper.listings()[0]["city"] == "Second"
+
+
+def test_complete_policy_keeps_copy_with_most_fields():
+    deduper = ListingDeduper("complete")
+    deduper.add([listing("A", city="Corona", price="$1"), listing("A", city="Corona")])
+    assert deduper.listings()[0]["price"] == "$1"
+    # Position fields don't count, and ties go to the later copy
+    deduper.add([listing("A", city="Corona", price="$2", page_number="9")])
+    assert deduper.listings()[0]["price"] == "$2"
+
+
+def test_newest_page_policy_keeps_highest_page():
+    deduper = ListingDeduper("newest_page")
+    deduper.add([listing("A", city="Page 3", page_number="3")])
+    deduper.add([listing("A", city="Page 2", page_number="2")])
+    assert deduper.listings()[0]["city"] == "Page 3"
+
+
+def test_policy_from_environment_and_unknown_policy(monkeypatch):
+    monkeypatch.setenv("DEDUP_POLICY", "Complete")
+    assert ListingDeduper().policy == "complete"
+    with pytest.raises(ValueError):
+        ListingDeduper("oldest")
@@ -0,0 +1,61 @@
+from conftest import listing
+from incremental import apply_changes
+from listings_db import ListingsRepository
+
+FIELDS = ["ts_number", "city", "date", "price", "raw_data", "notes"]
+
+
+def rows():
+    return [
+        listing("A", city="Corona", date="12/17/2025", price="$100", notes="first"),
+        listing("B", city="Beaumont", date="12/18/2025", price=""),
+        listing("C", city="corona ", date="", price="$300"),
+    ]
+
+
+def test_save_delta_matches_full_save(tmp_path):
+    repo = ListingsRepository(str(tmp_path / "listings.db"))
+    base = repo.dataset_for_version({"dataset_id": repo.save_dataset(rows(), "v1.csv", FIELDS)})
+
+    upserts = [listing("B", city="Beaumont", date="12/19/2025", price="$200"), listing("D", city="Norco")]
+    replaced = {"B", "C"}
+    delta = repo.dataset_for_version({"dataset_id": repo.save_delta(base, upserts, replaced, "v2.csv", FIELDS)})
+    full = repo.dataset_for_version({"dataset_id": repo.save_dataset(
+        apply_changes(rows(), upserts, replaced), "v2-full.csv", FIELDS)})
+
+    assert list(repo.listings(delta)) == list(repo.listings(full))
+    assert delta["row_count"] == full["row_count"] == 3
+    assert repo.cities(delta["id"]) == repo.cities(full["id"]) == ["Beaumont", "Corona", "Norco"]
+
+
+def test_rows_keep_extra_fields_and_derived_sale_date(tmp_path):
+    repo = ListingsRepository(str(tmp_path / "listings.db"))
+    dataset = repo.dataset_for_version({"dataset_id": repo.save_dataset(rows(), "v1.csv", FIELDS)})
+    first = next(iter(repo.listings(dataset)))
+    assert first == {"ts_number": "A", "city": "Corona", "date": "12/17/2025", "price": "$100",
+                     "raw_data": "row A", "notes": "first"}
+    dated, dated_total, undated, undated_total = repo.filter(
+        dataset, "corona", "2025-12-01", "2025-12-31", fields=["ts_number", "sale_date"])
+    assert (dated, dated_total) == ([{"ts_number": "A", "sale_date": "2025-12-17"}], 1)
+    assert (undated, undated_total) == ([{"ts_number": "C", "sale_date": ""}], 1)
+
+
+def test_dataset_for_version_by_id_or_csv_path(tmp_path):
+    repo = ListingsRepository(str(tmp_path / "listings.db"))
+    first = repo.save_dataset(rows(), "same.csv", FIELDS)
+    second = repo.save_dataset(rows()[:1], "same.csv", FIELDS)
+    assert repo.dataset_for_version({"dataset_id": first, "csv_path": "same.csv"})["id"] == first
+    assert repo.dataset_for_version({"dataset_id": None, "csv_path": "same.csv"})["id"] == second
+    assert repo.dataset_for_version({"csv_path": "other.csv"}) is None
+
+
+def test_delete_datasets_removes_their_listings(tmp_path):
+    repo = ListingsRepository(str(tmp_path / "listings.db"))
+    kept = repo.save_dataset(rows(), "v1.csv", FIELDS)
+    dropped = repo.save_dataset(rows(), "v2.csv", FIELDS)
+    assert repo.delete_datasets([dropped, 999]) == 1
+    assert repo.delete_datasets([]) == 0
+    conn = repo._connection()
+    assert conn.execute("SELECT COUNT(*) FROM listings WHERE dataset_id = ?", (dropped,)).fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM dataset_cities WHERE dataset_id = ?", (dropped,)).fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM listings WHERE dataset_id = ?", (kept,)).fetchone()[0] == 3
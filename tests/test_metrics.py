@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import subprocess
+
+from conftest import ROOT
+from metrics import Registry, clear_shared_metrics
+
+
+def make_registry():
+    registry = Registry()
+    pages = registry.counter("pages_total", "Pages scraped", ["engine"])
+    step = registry.histogram("step_seconds", "Step time", ["step"], buckets=(0.1, 1.0))
+    return registry, pages, step
+
+
+def samples(text):
+    """Sample lines of an exposition as {name-with-labels: value}."""
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_counter_exposition_and_label_escaping():
+    registry, pages, _ = make_registry()
+    pages.inc(engine="selenium")
+    pages.inc(2.5, engine='say "hi"\\\n')
+    text = registry.render()
+    assert "# HELP pages_total Pages scraped\n# TYPE pages_total counter\n" in text
+    assert samples(text)['pages_total{engine="selenium"}'] == "1"
+    assert samples(text)['pages_total{engine="say \\"hi\\"\\\\\\n"}'] == "2.5"
+
+
+def test_histogram_buckets_are_cumulative_with_inf_sum_and_count():
+    registry, _, step = make_registry()
+    for value in (0.05, 0.1, 0.5, 3.0):
+        step.observe(value, step="parse")
+    text = registry.render()
+    assert "# TYPE step_seconds histogram\n" in text
+    lines = [line for line in text.splitlines() if line.startswith("step_seconds")]
+    assert lines == [
+        'step_seconds_bucket{step="parse",le="0.1"} 2',
+        'step_seconds_bucket{step="parse",le="1"} 3',
+        'step_seconds_bucket{step="parse",le="+Inf"} 4',
+        'step_seconds_sum{step="parse"} 3.65',
+        'step_seconds_count{step="parse"} 4',
+    ]
+    assert text.endswith("\n")
+
+
+def test_drain_and_merge_move_metrics_between_registries():
+    api, api_pages, api_step = make_registry()
+    worker, worker_pages, worker_step = make_registry()
+    api_pages.inc(engine="selenium")
+    worker_pages.inc(3, engine="selenium")
+    worker_step.observe(0.5, step="parse")
+
+    snapshot = worker.drain()
+    assert worker_pages.value(engine="selenium") == 0 and worker_step.count(step="parse") == 0
+    api.merge(None)
+    api.merge({"unknown_total": {("x",): 1}})
+    api.merge(snapshot)
+    assert api_pages.value(engine="selenium") == 4
+    assert api_step.count(step="parse") == 1
+
+
+def test_per_worker_collectors_get_pid_label_and_register_once():
+    registry, _, _ = make_registry()
+
+    def cache_stats():
+        return [("cache_entries", "gauge", "Cached queries", [({}, 3)])]
+
+    def scrape_running():
+        return [("scrape_running", "gauge", "Whether a scrape runs", [({"kind": "manual"}, 0)])]
+
+    registry.add_collector(cache_stats, per_worker=True)
+    registry.add_collector(cache_stats, per_worker=True)
+    registry.add_collector(scrape_running)
+    text = registry.render()
+    assert text.count("# TYPE cache_entries gauge") == 1
+    assert samples(text) == {f'cache_entries{{pid="{os.getpid()}"}}': "3",
+                             'scrape_running{kind="manual"}': "0"}
+
+
+WORKER = """
+import sys
+from metrics import Registry
+registry = Registry()
+registry.counter("pages_total", "Pages scraped", ["engine"]).inc(5, engine="selenium")
+registry.histogram("step_seconds", "Step time", ["step"], buckets=(0.1, 1.0)).observe(0.2, step="parse")
+registry.add_collector(lambda: [("cache_entries", "gauge", "Cached queries", [({}, 7)])], per_worker=True)
+registry.shared_dir = sys.argv[1]
+registry.flush()
+"""
+
+
+def test_shared_directory_sums_workers_and_drops_stats_of_exited_ones(tmp_path):
+    directory = str(tmp_path / "metrics")
+    registry, pages, step = make_registry()
+
+    def cache_stats():
+        return [("cache_entries", "gauge", "Cached queries", [({}, 3)])]
+
+    registry.add_collector(cache_stats, per_worker=True)
+    pages.inc(engine="selenium")
+    registry.share(directory, interval=3600)
+
+    # Another worker that flushed its metrics and has since exited
+    subprocess.run([sys.executable, "-c", WORKER, directory], cwd=ROOT, check=True,
+                   env=dict(os.environ, PYTHONPATH=ROOT))
+    # A live worker (the parent process stands in for it)
+    live = {"pid": os.getppid(), "metrics": {"pages_total": [[["selenium"], 2]]},
+            "collected": [["cache_entries", "gauge", "Cached queries", [[{"pid": str(os.getppid())}, 11]]]]}
+    with open(os.path.join(directory, f"metrics-{os.getppid()}.json"), "w") as f:
+        json.dump(live, f)
+
+    text = registry.render()
+    values = samples(text)
+    assert values['pages_total{engine="selenium"}'] == "8"
+    assert values['step_seconds_count{step="parse"}'] == "1"
+    assert values['step_seconds_bucket{step="parse",le="1"}'] == "1"
+    cache_lines = {k: v for k, v in values.items() if k.startswith("cache_entries")}
+    assert cache_lines == {f'cache_entries{{pid="{os.getpid()}"}}': "3",
+                           f'cache_entries{{pid="{os.getppid()}"}}': "11"}
+    assert text.count("# HELP cache_entries") == 1
+    # Merging other workers' files leaves this worker's own counts alone
+    assert pages.value(engine="selenium") == 1
+
+    registry.unshare()
+    own_file = os.path.join(directory, f"metrics-{os.getpid()}.json")
+    with open(own_file) as f:
+        assert json.load(f)["metrics"]["pages_total"] == [[["selenium"], 1.0]]
+
+    (tmp_path / "metrics" / "notes.txt").write_text("kept")
+    clear_shared_metrics(directory)
+    assert os.listdir(directory) == ["notes.txt"]
+    clear_shared_metrics(str(tmp_path / "missing"))
@@ -0,0 +1,47 @@
+from datetime import date
+
+from query_cache import QueryCache, filter_cache_key
+
+START, END = date(2025, 12, 1), date(2025, 12, 31)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = QueryCache(maxsize=2, ttl=60)
+    cache.put(("a",), 1)
+    cache.put(("b",), 2)
+    assert cache.get(("a",)) == 1
+    cache.put(("c",), 3)
+    assert cache.get(("b",)) is None
+    assert (cache.get(("a",)), cache.get(("c",))) == (1, 3)
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 3, 1, 1)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("query_cache.time.monotonic", lambda: clock[0])
+    cache = QueryCache(maxsize=4, ttl=10)
+    cache.put(("a",), 1)
+    clock[0] += 10
+    assert cache.get(("a",)) == 1
+    clock[0] += 0.5
+    assert cache.get(("a",)) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_zero_size_disables_cache_and_clear_empties_it():
+    disabled = QueryCache(maxsize=0)
+    disabled.put(("a",), 1)
+    assert disabled.get(("a",)) is None
+    cache = QueryCache()
+    cache.put(("a",), 1)
+    cache.clear()
+    assert cache.get(("a",)) is None
+
+
+def test_filter_cache_key_normalizes_city_and_county():
+    assert filter_cache_key("", START, END, 1) == filter_cache_key("all", START, END, 1)
+    assert filter_cache_key(" corona", START, END, 1, county="all") == filter_cache_key("CORONA", START, END, 1)
+    assert filter_cache_key("Corona", START, END, 1) != filter_cache_key("Corona", START, END, 2)
+    assert filter_cache_key("Corona", START, END, 1, fields=["city"]) != filter_cache_key("Corona", START, END, 1)
@@ -0,0 +1,98 @@
+"""
+Vectorized /filter engine over a listings snapshot, using NumPy.
+
+The snapshot's typed columns are wrapped as NumPy arrays without copying
+(they may be memoryviews of a mapped column file). A query combines
+boolean masks over every row:
+
+    dates    integer comparisons on the sale date ordinals
+    city     the city codes matching the query (the same exact or
+             substring match as CityIndex.lookup), as a categorical mask
+    county   the same case-insensitive exact or substring match on county codes
+    price    min/max comparisons; rows without a price are excluded when a
+             price bound is given
+
+Without NumPy, ListingsSnapshot.filter answers the same queries from its
+date and city indexes.
+"""
+
+import threading
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from listings_store import NO_DATE, ListingsSnapshot, normalize_city
+
+_build_lock = threading.Lock()
+
+
+class VectorIndex:
+    """NumPy views of one snapshot's columns plus its county categories."""
+
+    def __init__(self, snapshot: ListingsSnapshot):
+        self.snapshot = snapshot
+        self.dates = np.frombuffer(snapshot.date_ordinals, dtype=np.int32)
+        self.city_codes = np.frombuffer(snapshot.city_codes, dtype=np.int32)
+        self.prices = np.frombuffer(snapshot.prices, dtype=np.float64)
+        self.undated = self.dates == NO_DATE
+        self._county_names: Optional[List[str]] = None
+        self._county_codes = None
+
+    def _counties(self):
+        """County categories, built on the first county query."""
+        if self._county_codes is None:
+            column = self.snapshot.columns.get("county") or [""] * len(self.dates)
+            # normalized county -> code, in first-seen order; -1 for rows without one
+            lookup = {}
+            codes = [lookup.setdefault(name, len(lookup)) if name else -1
+                     for name in map(normalize_city, column)]
+            self._county_names = list(lookup)
+            self._county_codes = np.array(codes, dtype=np.int32)
+        return self._county_names, self._county_codes
+
+    def county_mask(self, wanted: str):
+        """Rows whose normalized county contains `wanted` (lowercase), case-insensitively."""
+        names, codes = self._counties()
+        matches = [code for code, name in enumerate(names) if wanted in name.lower()]
+        return np.isin(codes, np.array(matches, dtype=np.int32))
+
+    def filter(self, city: str, start_ordinal: int, end_ordinal: int,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               county: str = "") -> Tuple["np.ndarray", "np.ndarray"]:
+        """Row ids in the date window and row ids without a date, both in file order."""
+        mask = None
+        if city and city != "all":
+            codes = np.fromiter(self.snapshot.city_index.lookup(city), dtype=np.int32)
+            mask = np.isin(self.city_codes, codes)
+        wanted_county = normalize_city(county).lower() if county != "all" else ""
+        if wanted_county:
+            county_mask = self.county_mask(wanted_county)
+            mask = county_mask if mask is None else mask & county_mask
+        if min_price is not None:
+            price_mask = self.prices >= min_price
+            mask = price_mask if mask is None else mask & price_mask
+        if max_price is not None:
+            price_mask = self.prices <= max_price
+            mask = price_mask if mask is None else mask & price_mask
+
+        in_window = (self.dates >= start_ordinal) & (self.dates <= end_ordinal)
+        undated = self.undated
+        if mask is not None:
+            in_window &= mask
+            undated = undated & mask
+        return np.flatnonzero(in_window), np.flatnonzero(undated)
+
+
+def vector_index(snapshot: ListingsSnapshot) -> VectorIndex:
+    """The snapshot's VectorIndex, built once and kept on the snapshot."""
+    index = getattr(snapshot, "_vector_index", None)
+    if index is None:
+        with _build_lock:
+            index = getattr(snapshot, "_vector_index", None)
+            if index is None:
+                index = snapshot._vector_index = VectorIndex(snapshot)
+    return index